@@ -23,521 +23,1729 @@
 # |BAI     | Beck Anxiety Scale   |
 # |BIS     | 巴瑞特冲动量表
 
+# # 量表注册表
+# * 每个量表只在这里定义一次：题目、反向计分满分、常数偏移、分量表构成
+# * 分量表题号为负数表示该题在此分量表中反向计分，即 (reverse_max - 原始分)
+# * 计分统一由 score_scale 完成：量表题目取成一个矩阵，与编译好的权重矩阵做一次矩阵乘法
+
+# In[ ]:
+
+
+import functools
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+class Cutoff(object):
+    """分界表：把 source 分数按升序分界点 edges 分箱，各箱对应数值编码 codes 与文本标签 labels。
+    right=True 时各箱为 (e[i-1], e[i]]，right=False 时为 [e[i-1], e[i])"""
+
+    def __init__(self, name, source, edges, codes, labels=None, text_name=None, right=True):
+        self.name = name
+        self.source = source
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.codes = np.asarray(codes, dtype=np.float64)
+        self.labels = labels
+        self.text_name = text_name
+        self.side = 'left' if right else 'right'
+
+    def bins(self, values):
+        """每个分数所在箱的序号，分数缺失时为 -1"""
+        values = np.asarray(values, dtype=np.float64)
+        bins = np.searchsorted(self.edges, values, side=self.side)
+        bins[np.isnan(values)] = -1
+        return bins
+
+    def numeric(self, values):
+        """数值编码（float64，与是否有缺失无关）；分数缺失时为 NaN"""
+        bins = self.bins(values)
+        if (bins < 0).any():
+            return np.where(bins < 0, np.nan, self.codes[bins])
+        return self.codes[bins]
+
+    def text(self, values):
+        """文本标签，以有序 Categorical 返回"""
+        return pd.Categorical.from_codes(self.bins(values), categories=self.labels, ordered=True)
+
+
+def _lookup(func, low, high):
+    """把逐题转换函数预先算成查找表：表中第 i 项为原始分 low + i 的转换结果"""
+    return low, np.array([func(a) for a in range(low, high + 1)], dtype=np.float64)
+
+
+def _apply_lookup(values, low, table):
+    """用查找表转换一列原始分（一次 np.take）；缺失或超出表范围的原始分转换为 NaN"""
+    codes = values - low
+    valid = (codes >= 0) & (codes < len(table)) & (codes == np.floor(codes))
+    result = np.take(table, np.where(valid, codes, 0).astype(np.intp))
+    if not valid.all():
+        result[~valid] = np.nan
+    return result
+
+
+class Scale(object):
+    """量表定义。
+    subscales：[(分量表名, [题号, ...]), ...]，负题号为反向计分；
+    也可写作 (分量表名, [题号, ...], 系数) 为该分量表单独指定 sub_factor；以下划线开头的分量表为中间结果，不输出
+    sub_offset/sub_factor：分量表分数 = (原始分 + sub_offset) * sub_factor
+    total：总分列名；total_items 未给出时总分为各分量表之和（无分量表时为全部题目之和）
+    offset/factor：总分 = (原始总分 + offset) * factor
+    cutoffs：基于分量表或总分的分界表
+    recode：{题号: (low, 查找表)}，计分前先按查找表转换该题原始分（见 _lookup）
+    responses：(最低, 最高) 选项分值，用于校验并压缩题目列（见 compact_items）；None 表示不校验
+    prorate：各分量表与总分最多允许缺失的题数，缺失不超过该数时按有效题目的均分折算满分；
+    None 表示任何题目缺失时该分数即为 NaN；score_all / score_scale 的 prorate 参数可按次覆盖
+    post：线性计分之后对输出的修正，接收 {列名: 数组} 并就地修改
+    merged：post 中并入其他输出的中间结果，{中间结果名: (输出名, 系数)}；该输出的缺失题数包括中间结果的缺失题，
+    是否折算按合计判断；reliability 据此把中间结果的题目算入该输出
+    columns：题目列名，缺省为 prefix + 题号
+    kernel：非线性计分的量表（如PSQI、YFAS）不用权重矩阵，由 kernel(df) 返回各输出列的 DataFrame；
+    此时 subscales 只列出输出名（题号列表留空），cutoffs 照常基于 kernel 的输出"""
+
+    def __init__(self, name, prefix, n_items, subscales=(), reverse_max=None,
+                 sub_offset=0, sub_factor=1, total=None, total_items=None,
+                 offset=0, factor=1, cutoffs=(), recode=None, responses=None, prorate=None, post=None,
+                 merged=None, columns=None, kernel=None):
+        self.name = name
+        self.prefix = prefix
+        self.n_items = n_items
+        self.subscales = list(subscales)
+        self.reverse_max = reverse_max
+        self.sub_offset = sub_offset
+        self.sub_factor = sub_factor
+        self.total = total
+        self.total_items = total_items
+        self.offset = offset
+        self.factor = factor
+        self.cutoffs = list(cutoffs)
+        self.recode = dict(recode or {})
+        self.responses = responses
+        self.prorate = prorate
+        self.post = post
+        self.merged = dict(merged or {})
+        self.columns = None if columns is None else list(columns)
+        self.kernel = kernel
+        self._compiled = None
+
+    @property
+    def items(self):
+        """量表全部题目的列名"""
+        if self.columns is not None:
+            return list(self.columns)
+        return [self.prefix + str(i) for i in range(1, self.n_items + 1)]
+
+    @property
+    def subscale_names(self):
+        """各分量表的输出列名（不含以下划线开头的中间结果），即 get_*_subscales 返回的列"""
+        return [subscale[0] for subscale in self.subscales if not subscale[0].startswith('_')]
+
+    @property
+    def outputs(self):
+        """量表输出的列名：各分量表在前，总分在后"""
+        names = [subscale[0] for subscale in self.subscales]
+        if self.total is not None:
+            names.append(self.total)
+        return names
+
+    def cutoff(self, name):
+        """按数值编码列名取分界表"""
+        for cutoff in self.cutoffs:
+            if cutoff.name == name:
+                return cutoff
+        raise KeyError(name)
+
+    def _form(self, numbers, offset, factor):
+        """把一组（带符号的）题号转成线性形式：各题权重、各题常数项（反向计分的满分）与总常数项"""
+        weights = np.zeros(self.n_items)
+        item_const = np.zeros(self.n_items)
+        for number in numbers:
+            if number < 0:
+                weights[-number - 1] -= 1
+                item_const[-number - 1] += self.reverse_max
+            else:
+                weights[number - 1] += 1
+        return weights * factor, item_const * factor, (offset + item_const.sum()) * factor
+
+    def compile(self):
+        """编译为 (计分题目列名, 权重矩阵 W, 常数项 b, {列名: 查找表}, 各题常数项 C)，
+        分数 = 转换后的 X @ W + b；b 中已包含 C 的列和"""
+        if self._compiled is None and self.kernel is not None:
+            # 非线性量表不参与矩阵乘法：只登记题目列（用于按列读取、缓存指纹等），输出由 kernel 计算
+            n = len(self.items)
+            self._compiled = (self.items, np.zeros((n, 0)), np.zeros(0), {}, np.zeros((n, 0)))
+        if self._compiled is None:
+            forms = [self._form(subscale[1], self.sub_offset, subscale[2] if len(subscale) > 2 else self.sub_factor)
+                     for subscale in self.subscales]
+            if self.total is not None:
+                if self.total_items is not None:
+                    weights, item_const, const = self._form(self.total_items, 0, 1)
+                elif forms:
+                    weights = sum(w for w, _, _ in forms)
+                    item_const = sum(c for _, c, _ in forms)
+                    const = sum(c for _, _, c in forms)
+                else:
+                    weights, item_const, const = np.ones(self.n_items), np.zeros(self.n_items), 0
+                forms.append((weights * self.factor, item_const * self.factor, (const + self.offset) * self.factor))
+            W = np.column_stack([w for w, _, _ in forms])
+            C = np.column_stack([c for _, c, _ in forms])
+            b = np.array([c for _, _, c in forms], dtype=np.float64)
+            # 只保留计分用到的题目（如CTQ效度题、BAS填充题不参与计分）
+            used = np.flatnonzero(np.any(W != 0, axis=1))
+            columns = [self.items[i] for i in used]
+            W = np.ascontiguousarray(W[used])
+            C = np.ascontiguousarray(C[used])
+            recodes = {self.prefix + str(number): lookup for number, lookup in self.recode.items()}
+            self._compiled = (columns, W, b, recodes, C)
+        return self._compiled
+
+
+def _register(*scales):
+    for scale in scales:
+        SCALES[scale.name] = scale
+    _PLANS.clear()
+
+
+def _ssi_post(outputs):
+    """无自杀意念者不计算自杀危险"""
+    outputs['suicide_risk'] = np.where(outputs['suicide_ideation_screen'] > 2, outputs['suicide_risk'], np.nan)
+
+
+def _edi_transfer(a):
+    """EDI逐题转换：0~2 记0分，3及以上减2"""
+    if a <= 2:
+        b = 0
+    else:
+        b = a - 2
+    return b
+
+
+# EDI 中并入分量表的题组：(分量表, 题组中间结果, 分量表的题数)
+EDI_GROUPS = [('ineffectiveness', '_ineffectiveness_group', 10),
+              ('asceticism_subscale', '_asceticism_group', 8),
+              ('impulse_regulation_subscale', '_impulse_regulation_group', 11)]
+
+
+def _edi_post(outputs):
+    """保持原有计分：ineffectiveness、asceticism、impulse_regulation 末尾括号内的几题先相加，再整体转换一次"""
+    for name, group, n in EDI_GROUPS:
+        outputs[name] = outputs[name] + np.maximum(outputs.pop(group) - 2, 0) / n
+
+
+SCALES = {}
+_PLANS = {}
+_CACHE = {}
+
+_register(
+    Scale('BDI', 'BDI', 21, responses=(1, 4), total='BDI', offset=-21,
+          cutoffs=[Cutoff('whether_numeric_depression', 'BDI', [4], [0, 1],
+                          ['Not Depressive', 'Depressive'], 'whether_text_depression'),
+                   Cutoff('numeric_level_BDI', 'BDI', [4, 7, 15], [0, 1, 2, 3],
+                          ['Not Depressive', 'Mild Depressive', 'Moderate Depressive', 'Sever Depressive'], 'text_level_BDI')]),
+    Scale('BAI', 'BAI', 21, responses=(1, 4), total='BAI', offset=-21,
+          cutoffs=[Cutoff('numeric_level_BAI', 'BAI', [21, 35], [0, 1, 2],
+                          ['Not Anxious', 'Mild Anxious', 'Sever Anxious'], 'text_level_BAI')]),
+    Scale('BIS', 'BIS', 30, responses=(1, 5), reverse_max=6, sub_offset=-10, sub_factor=100 / 40,
+          subscales=[('nonplan_impulsivity', [-1, -4, -7, -10, -13, -16, -19, -22, -25, -28]),
+                     ('motor_impulsivity', [2, 5, 8, 11, 14, 17, 20, 23, 26, 29]),
+                     ('attention_impulsivity', [-3, -6, -9, -12, -15, -18, -21, -24, -27, -30])],
+          total='BIS', factor=1 / 3),
+    Scale('UPPS_P', 'UPPS_P', 20, responses=(1, 4), reverse_max=5,
+          subscales=[('negative_urgency', [6, 8, 13, 15]),
+                     ('positive_urgency', [3, 10, 17, 20]),
+                     ('lack_of_persistence', [-1, -4, -7, 11]),
+                     ('lack_of_plan', [2, -5, -12, 19]),
+                     ('sensation_seeking', [9, 14, 16, 18])]),
+    Scale('BIS_BAS', 'BAS', 24, responses=(1, 4),
+          subscales=[('BASR', [4, 5, 7, 14, 18, 23]),
+                     ('BASD', [3, 9, 12, 21]),
+                     ('BASF', [10, 15, 16, 20]),
+                     ('BIS', [8, 13, 16, 19, 24])]),
+    Scale('Mini_K', 'mini', 19, responses=(1, 7), total='life_strategy', factor=1 / 19),
+    Scale('LPQ', 'LPQ', 22, responses=(1, 5),
+          subscales=[('event_load', list(range(1, 11))),
+                     ('individual_vulnerability', list(range(11, 23)))]),
+    Scale('TAS', 'TAS', 20, responses=(1, 5),
+          subscales=[('difficult_to_recognize_feeling', [1, 3, 6, 7, 9, 13, 14]),
+                     ('difficult_to_describe_feeling', [2, 4, 11, 12, 17]),
+                     ('extraversion_thought', [5, 8, 10, 15, 16, 18, 19, 20])],
+          total='TAS'),
+    Scale('ERQ', 'ERQ', 10, responses=(1, 7),
+          subscales=[('cognitive_reappraisal', [1, 3, 4, 5, 7, 8]),
+                     ('expression_inhibition', [2, 4, 6, 9])]),
+    # 中文22题修订版
+    Scale('BPAQ', 'BPAQ', 22, responses=(1, 5),
+          subscales=[('hostility', [18, 15, 4, 21, 11, 16, 7, 19]),
+                     ('physical_aggression', [17, 13, 12, 22, 9]),
+                     ('impulsivity', [10, 6, 14, 8, 2, 3]),
+                     ('anger', [1, 20, 5])]),
+    Scale('CTQ', 'CTQ', 28, responses=(1, 5), reverse_max=6,
+          subscales=[('emotional_abuse', [3, 8, 14, 18, 25]),
+                     ('physical_abuse', [9, 11, 12, 15, 17]),
+                     ('sexual_abuse', [20, 21, 23, 24, 27]),
+                     ('emotional_neglect', [-5, -7, -12, -15, -17]),
+                     ('physical_neglect', [1, -2, 4, 6, -26])],
+          total='CTQ',
+          cutoffs=[Cutoff('whether_emotional_abuse', 'emotional_abuse', [13], [0, 1], right=False),
+                   Cutoff('whether_physical_abuse', 'physical_abuse', [10], [0, 1], right=False),
+                   Cutoff('whether_sexual_abuse', 'sexual_abuse', [8], [0, 1], right=False),
+                   Cutoff('whether_emotional_neglect', 'emotional_neglect', [15], [0, 1], right=False),
+                   Cutoff('whether_physical_neglect', 'physical_neglect', [15], [0, 1], right=False)]),
+    Scale('SSQ', 'SSQ', 12,
+          subscales=[('SSQ_1', [1, 3, 5, 7, 9, 11]),
+                     ('SSQ_2', [2, 4, 6, 8, 10, 12])],
+          total='SSQ'),
+    Scale('FTND', 'FTND', 6, responses=(1, 4), total='FTND', offset=-6,
+          cutoffs=[Cutoff('FTND_whether', 'FTND', [6], [0, 1], right=False)]),
+    # SSI6、7、11、13、19 原始分减1，其余题目原样相加，再减9后换算为百分制
+    Scale('SSI', 'SSI', 19, responses=(1, 3),
+          subscales=[('suicide_ideation', [1, 2, 3, 4, 5]),
+                     ('suicide_ideation_screen', [4, 5])],
+          total='suicide_risk', total_items=list(range(6, 20)), offset=-14, factor=100 / 33,
+          cutoffs=[Cutoff('whether_suicide_ideation_numeric', 'suicide_ideation_screen', [2], [0, 1],
+                          ['No Suicid Ideation', 'Suicide Ideation'], 'whether_suicide_ideation_text')],
+          post=_ssi_post),
+)
+
+
+def _eq_forward(a):
+    if a >= 3:
+        b = a - 2
+    else:
+        b = 0
+    return b
+
+
+def _eq_reverse(a):
+    if a >= 3:
+        b = 0
+    elif a == 2:
+        b = 1
+    else:
+        b = 2
+    return b
+
+
+def _audit_transfer(a):
+    """AUDIT第9、10题：1及以下记0分，4及以上记3分"""
+    if a <= 1:
+        b = 0
+    elif a >= 4:
+        b = 3
+    else:
+        b = a
+    return b
+
+
+EQ_FORWARD = [1, 6, 19, 22, 25, 26, 35, 36, 37, 38, 41, 42, 43, 44, 52, 54, 55, 57, 58, 59, 60]
+EQ_REVERSE = [4, 8, 10, 11, 12, 14, 15, 18, 21, 27, 28, 29, 32, 34, 39, 46, 48, 49, 50]
+
+# EDI 原始分 1~6，先减1再转换（_edi_transfer）；分量表中负题号为 3 - 转换分；各分量表取题目均分
+_EDI_TRANSFER = _lookup(lambda a: _edi_transfer(a - 1), 1, 6)
+_EDI_RECODE = dict((number, _EDI_TRANSFER) for number in range(1, 92))
+_EDI_RECODE.update({
+    45: _lookup(lambda a: _edi_transfer(_edi_transfer(a - 1)), 1, 6),
+    55: _lookup(lambda a: _edi_transfer(abs(3 - (a - 1))), 1, 6),
+    # 以下三题在括号内以原始分减1参与求和
+    41: _lookup(lambda a: a - 1, 1, 6),
+    79: _lookup(lambda a: a - 1, 1, 6),
+    86: _lookup(lambda a: a - 1, 1, 6),
+})
+
+_register(
+    Scale('EQ', 'EQ', 60, responses=(1, 4),
+          subscales=[('empathy_forward', EQ_FORWARD),
+                     ('empathy_reverse', EQ_REVERSE)],
+          total='empathy',
+          recode=dict([(number, _lookup(_eq_forward, 1, 4)) for number in EQ_FORWARD]
+                      + [(number, _lookup(_eq_reverse, 1, 4)) for number in EQ_REVERSE])),
+    Scale('AUDIT', 'AUDIT', 10, total='AUDIT', offset=-8,
+          recode={9: _lookup(_audit_transfer, 0, 10), 10: _lookup(_audit_transfer, 0, 10)}),
+    Scale('EDI', 'EDI', 91, responses=(1, 6), reverse_max=3, recode=_EDI_RECODE, post=_edi_post,
+          merged=dict((group, (name, 1 / n)) for name, group, n in EDI_GROUPS),
+          subscales=[('drive_for_thinness', [1, 7, 11, 16, 25, 32, 49], 1 / 7),
+                     ('bulimia', [4, 5, 28, 38, 46, 53, 61], 1 / 7),
+                     ('body_dissatisfaction', [2, 9, -12, -19, -31, 45, 55, 59, -62], 1 / 9),
+                     ('ineffectiveness', [10, 18, -20, 24, 27, -37], 1 / 10),
+                     ('perfectionism', [13, 29, 36, 43, 52, 63], 1 / 6),
+                     ('interpersonal_distrust', [-15, -17, -23, -30, 34, 54, -57], 1 / 7),
+                     ('interoceptive_awareness', [8, 21, -26, 33, 40, 44, 47, 51, 60, 64], 1 / 10),
+                     ('maturity_fears', [3, 6, 14, -22, 35, -39, 48, -58], 1 / 8),
+                     ('asceticism_subscale', [66, 68, -71, 75, 78, 82], 1 / 8),
+                     ('impulse_regulation_subscale', [65, 67, 70, 72, 74, 77], 1 / 11),
+                     ('social_insecurity_subscale', [-69, -73, -76, -80, 84, 87, -89, -91], 1 / 8),
+                     ('social_insecurity_subscale_false', [69, 73, 76, 80, 84, 87, 89], 1 / 7),
+                     ('_ineffectiveness_group', [41, 42, -50, 56], 1),
+                     ('_asceticism_group', [86, 88], 1),
+                     ('_impulse_regulation_group', [79, 81, 83, 85, 90], 1)]),
+)
+
+
+def _response_bounds(names, columns):
+    """题目列 columns 的选项分值下限与上限，取 names 中第一个用到该列并声明了范围的量表；
+    未声明范围的列为 (-inf, inf)，不做检查"""
+    bounds = {}
+    for name in names:
+        scale = SCALES[name]
+        if scale.responses is not None:
+            for col in scale.compile()[0]:
+                bounds.setdefault(col, scale.responses)
+    low = np.array([bounds.get(col, (-np.inf, np.inf))[0] for col in columns], dtype=np.float64)
+    high = np.array([bounds.get(col, (-np.inf, np.inf))[1] for col in columns], dtype=np.float64)
+    return low, high
+
+
+def _range_violations(block, low, high, integral):
+    """返回题目矩阵中不是整数或超出范围的作答的 (行号, 列号)，按行排列；缺失不算违规。
+    先按列取最小、最大值（忽略缺失），只有越界的列与非整数类型的列（integral 为 False）才逐个元素比较"""
+    suspect = ~integral & np.isfinite(low)
+    if len(block):
+        suspect |= (np.fmin.reduce(block, axis=0) < low) | (np.fmax.reduce(block, axis=0) > high)
+    positions = np.flatnonzero(suspect)
+    sub = block[:, positions]
+    ok = (sub >= low[positions]) & (sub <= high[positions]) & (sub == np.floor(sub))
+    ok |= np.isnan(sub)
+    rows, cols = np.nonzero(~ok)
+    return rows, positions[cols]
+
+
+def _violation_report(index, columns, block, rows, cols):
+    """违规作答的稀疏报告：row（行索引）、item（题目列名）、value（作答值）"""
+    return pd.DataFrame({'row': index[rows],
+                         'item': np.asarray(columns, dtype=object)[cols],
+                         'value': block[rows, cols]})
+
+
+def validate_items(df, scales=None):
+    """按各量表声明的选项分值范围（Scale.responses）一次检查全部题目列，
+    返回违规作答（不是整数或超出范围，如 1~4 计分题中的 0 或表示拒答的 9）的稀疏报告：
+    每条违规一行，列为 row（df 的行索引）、item（题目列名）、value（作答值），全部合法时为空表。
+    缺失值不算违规；df 中没有的题目列、未声明范围的量表跳过"""
+    names = list(SCALES) if scales is None else list(scales)
+    columns = _plan(names)[0]
+    low, high = _response_bounds(names, columns)
+    keep = [j for j, col in enumerate(columns) if np.isfinite(low[j]) and col in df.columns]
+    columns = [columns[j] for j in keep]
+    block, integral = _item_block(df, columns)
+    rows, cols = _range_violations(block, low[keep], high[keep], integral)
+    return _violation_report(df.index, columns, block, rows, cols)
+
+
+def compact_items(df, scales=None, nullable=False):
+    """按各量表声明的选项分值范围（Scale.responses）校验题目列，并压缩为 int8；
+    有缺失或 nullable=True 时为可空的 Int8。不修改 df，返回题目列已压缩的新 DataFrame，
+    其他列（以及未声明范围的量表）保持不变。有题目不是整数或超出范围时抛出 ValueError"""
+    names = list(SCALES) if scales is None else list(scales)
+    report = validate_items(df, names)
+    if len(report):
+        raise ValueError('题目分值不是整数或超出量表范围：%s' % ', '.join(pd.unique(report['item'])))
+    data = {}
+    for name in names:
+        scale = SCALES[name]
+        if scale.responses is None:
+            continue
+        for col in scale.compile()[0]:
+            if col in data or col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col])
+            if nullable or values.isna().any():
+                data[col] = values.astype('Int8')
+            else:
+                data[col] = values.astype(np.int8)
+    # 压缩后的列一次拼回，保持原列序
+    compact = pd.concat([df.drop(columns=list(data)), pd.DataFrame(data, index=df.index)], axis=1)
+    return compact[df.columns]
+
+
+def _item_block(df, columns):
+    """把题目列一次性取成一个连续的 float64 矩阵，并返回各列是否为整数类型。
+    矩阵总是新分配的、不与 df 共享内存，调用方可以就地修改（如题目转换），无需再复制"""
+    frame = df[columns]
+    integral = np.array([pd.api.types.is_integer_dtype(dtype) for dtype in frame.dtypes], dtype=bool)
+    block = np.ascontiguousarray(frame.to_numpy(dtype=np.float64, na_value=np.nan))
+    # 只有单个 float64 块且已是行优先（如只有一列）时，to_numpy 才会返回 df 数据的视图
+    if not block.flags.owndata:
+        block = block.copy()
+    return block, integral
+
+
+def _linear_scores(block, W, b, C=None, prorate=None, merged=()):
+    """X @ W + b，返回 (分数, 各输出缺失的题数)；没有缺失时缺失题数为 None。
+    某一输出用到的题目缺失时该输出为 NaN，不影响其他输出；
+    prorate 给出各输出最多允许缺失的题数，缺失不超过该数时按有效题目折算：
+    有效题目的得分（含其常数项 C）按 全部题目权重 / 有效题目权重 放大，再加上与题目无关的常数项。
+    merged 为 [(中间结果列号, 输出列号), ...]（见 Scale.merged）：两者的缺失题数都记为合计，按合计判断是否为 NaN、是否折算"""
+    missing = np.isnan(block)
+    if not missing.any():
+        return block @ W + b, None
+    block = np.where(missing, 0, block)
+    scores = block @ W + b
+    # 整数矩阵乘法不走 BLAS，按 float64 计算再取整
+    n_missing = (missing.astype(np.float64) @ (W != 0).astype(np.float64)).astype(np.int64)
+    if merged:
+        for group, output in merged:
+            n_missing[:, output] += n_missing[:, group]
+        for group, output in merged:
+            n_missing[:, group] = n_missing[:, output]
+    dropped = n_missing > 0
+    if prorate is not None and C is not None:
+        limit = np.asarray(prorate)
+        partial = dropped & (n_missing <= limit)
+        if partial.any():
+            weight = np.abs(W)
+            valid_weight = (~missing) @ weight
+            # 题目全部缺失的输出（如并入的题组整组缺失）无法折算
+            partial &= valid_weight > 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scale = weight.sum(axis=0) / valid_weight
+            # 有效题目的得分 = 分数 - b + 有效题目的常数项
+            free = b - C.sum(axis=0)
+            valid_sum = scores - b + (~missing) @ C
+            scores = np.where(partial, valid_sum * np.where(partial, scale, 1) + free, scores)
+            dropped = dropped & ~partial
+    scores[dropped] = np.nan
+    return scores, n_missing
+
+
+def _plan(names):
+    """把若干量表的权重矩阵按题目并集拼成一个融合矩阵，按量表组合缓存"""
+    key = tuple(names)
+    if key not in _PLANS:
+        columns, position, parts, recodes = [], {}, [], {}
+        for name in key:
+            cols, W, b, scale_recodes, C = SCALES[name].compile()
+            recodes.update(scale_recodes)
+            for col in cols:
+                if col not in position:
+                    position[col] = len(columns)
+                    columns.append(col)
+            parts.append((cols, W, b, C))
+        n_outputs = sum(W.shape[1] for _, W, _, _ in parts)
+        fused = np.zeros((len(columns), n_outputs))
+        constants = np.zeros((len(columns), n_outputs))
+        bias = np.empty(n_outputs)
+        slices, start = [], 0
+        recodes = [(position[col], low, table) for col, (low, table) in recodes.items() if col in position]
+        for cols, W, b, C in parts:
+            stop = start + W.shape[1]
+            fused[[position[col] for col in cols], start:stop] = W
+            constants[[position[col] for col in cols], start:stop] = C
+            bias[start:stop] = b
+            slices.append(slice(start, stop))
+            start = stop
+        _PLANS[key] = (columns, fused, bias, slices, recodes, constants)
+    return _PLANS[key]
+
+
+def _prorate_limit(name, prorate=None):
+    """量表 name 本次计分允许缺失的题数：prorate 为 None 时取 Scale.prorate；
+    为整数时对所有量表生效；为 {量表名: 题数} 时只覆盖其中列出的量表"""
+    if prorate is None:
+        return SCALES[name].prorate
+    if isinstance(prorate, dict):
+        return prorate.get(name, SCALES[name].prorate)
+    return prorate
+
+
+def _fused_scores(df, names, missing=False, validate=None, prorate=None):
+    """对 names 中的量表只取一次题目矩阵、做一次矩阵乘法，返回各量表的 {输出列名: 数组}；
+    missing=True 时另给出各输出缺失的题数（列名加后缀 _n_missing）。validate、prorate 见 score_all"""
+    columns, W, b, slices, recodes, C = _plan(names)
+    block, integral_items = _item_block(df, columns)
+    if validate is not None:
+        if validate not in ('raise', 'missing'):
+            raise ValueError("validate 只能是 None、'raise' 或 'missing'：%r" % (validate,))
+        rows, cols = _range_violations(block, *_response_bounds(names, columns), integral_items)
+        if len(rows) and validate == 'raise':
+            report = _violation_report(df.index, columns, block, rows[:10], cols[:10])
+            raise ValueError('有 %d 个作答不是整数或超出量表范围，前几个为：\n%s' % (len(rows), report.to_string(index=False)))
+        # 违规作答按缺失计分
+        block[rows, cols] = np.nan
+    if recodes:
+        for j, low, table in recodes:
+            block[:, j] = _apply_lookup(block[:, j], low, table)
+    limits = np.zeros(W.shape[1], dtype=np.int64)
+    merged = []
+    for name, part in zip(names, slices):
+        limits[part] = _prorate_limit(name, prorate) or 0
+        outputs = SCALES[name].outputs
+        merged.extend((part.start + outputs.index(group), part.start + outputs.index(target))
+                      for group, (target, _) in SCALES[name].merged.items())
+    scores, n_missing = _linear_scores(block, W, b, C, limits if limits.any() else None, merged)
+    results = []
+    position = dict((col, j) for j, col in enumerate(columns))
+    for name, part in zip(names, slices):
+        if SCALES[name].kernel is not None:
+            flags = np.isnan(block[:, [position[col] for col in SCALES[name].items]]) if missing else None
+            results.append(_kernel_scores(df, SCALES[name], flags))
+            continue
+        outputs = {}
+        for j, col in zip(range(part.start, part.stop), SCALES[name].outputs):
+            outputs[col] = scores[:, j]
+        if SCALES[name].post is not None:
+            SCALES[name].post(outputs)
+        outputs = dict((col, values) for col, values in outputs.items() if not col.startswith('_'))
+        if missing:
+            for j, col in zip(range(part.start, part.stop), SCALES[name].outputs):
+                if not col.startswith('_'):
+                    outputs[col + '_n_missing'] = np.zeros(len(block), dtype=np.int64) if n_missing is None else n_missing[:, j]
+        results.append(outputs)
+    return results
+
+
+def _kernel_scores(df, scale, missing=None):
+    """非线性量表的 {输出列名: 数组}；给出各题是否缺失的矩阵 missing 时，另给出各输出缺失的题数（该量表全部题目中的缺失数）"""
+    frame = scale.kernel(df)
+    outputs = dict((col, frame[col].to_numpy()) for col in scale.outputs)
+    if missing is not None:
+        counts = missing.sum(axis=1)
+        for col in scale.outputs:
+            outputs[col + '_n_missing'] = counts
+    return outputs
+
+
+def score_scale(df, name, prorate=None):
+    """按注册表计算量表 name 的全部分量表与总分，返回与 df 同索引的 DataFrame；prorate 见 score_all。
+    同一 df 上的结果按量表与题目列缓存，分数、分级、是否等方法共用一次计算"""
+    limit = _prorate_limit(name, prorate)
+    def compute():
+        return pd.DataFrame(_fused_scores(df, [name], prorate={name: limit})[0], copy=False)
+    return _memoize_frame(df, ('score', name, limit), SCALES[name].compile()[0], compute)
+
+
+def score_all(df, scales=None, missing=False, validate=None, prorate=None):
+    """一次性计算多个量表的分量表、总分与分界结果。
+    所需题目列只取一次，拼成一个矩阵，与所有量表的融合权重矩阵做一次乘法；
+    不修改 df，返回与 df 同索引的新 DataFrame。scales 缺省为注册表中的全部量表。
+    不同量表输出同名时（如BIS总分与BIS/BAS的BIS分量表），后出现的列名前加上量表名。
+    各列类型固定，与数据中是否有缺失无关：分数与分界的数值编码为 float64，文本标签为有序 Categorical，缺失题数为 int64。
+    missing=True 时为每个分数另加一列“<列名>_n_missing”，给出该分数缺失的题数。
+    validate 在计分前按各量表声明的选项分值范围检查题目矩阵（见 validate_items）：
+    None 不检查；'raise' 有违规作答时抛出 ValueError；'missing' 把违规作答当作缺失计分（可配合 prorate）。
+    prorate 为本次计分各分数最多允许缺失的题数（见 Scale.prorate），不修改注册表：
+    None 使用各量表的 Scale.prorate；整数对全部量表生效；{量表名: 题数} 只覆盖列出的量表"""
+    names = list(SCALES) if scales is None else list(scales)
+    data = {}
+    for name, outputs in zip(names, _fused_scores(df, names, missing, validate, prorate)):
+        scale = SCALES[name]
+        for cutoff in scale.cutoffs:
+            values = outputs[cutoff.source]
+            outputs[cutoff.name] = cutoff.numeric(values)
+            if cutoff.labels is not None:
+                outputs[cutoff.text_name] = cutoff.text(values)
+        for col, values in outputs.items():
+            data[name + '_' + col if col in data else col] = values
+    return pd.DataFrame(data, index=df.index)
+
+
+def _excel_chunks(path, usecols, chunksize, sheet_name=0):
+    """以只读模式逐行读取 Excel 文件，每 chunksize 行产出一个只含 usecols 列的 DataFrame"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = list(next(rows))
+        missing = [col for col in usecols if col not in header]
+        if missing:
+            raise KeyError('%s not in %s' % (missing, path))
+        positions = [header.index(col) for col in usecols]
+        chunk = []
+        for row in rows:
+            chunk.append([row[i] if i < len(row) else None for i in positions])
+            if len(chunk) == chunksize:
+                yield pd.DataFrame(chunk, columns=usecols).infer_objects()
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=usecols).infer_objects()
+    finally:
+        workbook.close()
+
+
+def score_file(path, output, scales=None, keep=(), chunksize=100000, validate=None, **read_kwargs):
+    """流式计分：按 chunksize 行分块读取问卷导出文件（CSV，或 .xlsx/.xlsm），只读取所选量表需要的题目列
+    以及 keep 中的列（如被试编号），每块用 score_all 计分（validate 同 score_all）后追加写入 CSV 文件 output。
+    峰值内存只与 chunksize 有关，与文件行数无关。read_kwargs 传给 pd.read_csv（如 sep、encoding）。
+    返回写出的总行数"""
+    names = list(SCALES) if scales is None else list(scales)
+    keep = list(keep)
+    usecols = keep + [col for col in _plan(names)[0] if col not in keep]
+    if str(path).lower().endswith(('.xlsx', '.xlsm')):
+        chunks = _excel_chunks(path, usecols, chunksize, read_kwargs.pop('sheet_name', 0))
+    else:
+        chunks = pd.read_csv(path, usecols=usecols, chunksize=chunksize, **read_kwargs)
+    n_rows = 0
+    for chunk in chunks:
+        scores = _score_all(chunk, names, validate=validate)
+        if keep:
+            scores = pd.concat([chunk[keep], scores], axis=1)
+        scores.to_csv(output, mode='w' if n_rows == 0 else 'a', header=n_rows == 0, index=False)
+        n_rows += len(chunk)
+    return n_rows
+
+
+def write_scores(scores, path, partition_cols=None, format='parquet'):
+    """把计分结果写成列式文件，供下游按列、按内存映射读取（见 read_scores）。
+    format：'parquet'，或 'arrow'（Arrow IPC，即 Feather v2）；
+    partition_cols：按这些列（如队列、测评批次）分区，写成 path/列=值/ 的目录结构。
+    行索引不写出，需要对齐原始数据时请把被试编号放在列中（见 score_file 的 keep）"""
+    if format == 'parquet':
+        scores.to_parquet(path, engine='pyarrow', partition_cols=partition_cols, index=False)
+    elif format == 'arrow':
+        from pyarrow import feather
+        if not partition_cols:
+            feather.write_feather(scores.reset_index(drop=True), path)
+            return
+        for keys, part in scores.groupby(partition_cols, observed=True, sort=False):
+            keys = keys if isinstance(keys, tuple) else (keys,)
+            directory = os.path.join(path, *['%s=%s' % (col, key) for col, key in zip(partition_cols, keys)])
+            os.makedirs(directory, exist_ok=True)
+            feather.write_feather(part.drop(columns=partition_cols).reset_index(drop=True),
+                                  os.path.join(directory, 'part-0.arrow'))
+    else:
+        raise ValueError("format 只能是 'parquet' 或 'arrow'：%r" % (format,))
+
+
+def read_scores(path, columns=None, filter=None, format='parquet'):
+    """读取 write_scores 写出的文件或分区目录，只读取 columns 中的列；
+    文件经内存映射读取，分区列（如队列、批次）作为普通列返回，可用 filter（pyarrow 表达式）筛选"""
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+    dataset = ds.dataset(path, format='ipc' if format == 'arrow' else format, partitioning='hive',
+                         filesystem=LocalFileSystem(use_mmap=True))
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+
+def _score_shard(args):
+    """并行计分的工作函数（须在模块顶层，以便进程池序列化）"""
+    shard, names = args
+    return _score_all(shard, names)
+
+
+def score_parallel(df, scales=None, workers=None, shard_size=50000, threads=False):
+    """并行版 score_all：按 shard_size 行把被试切成若干片，分发到 workers 个进程（threads=True 时为线程，
+    矩阵乘法期间 NumPy 会释放 GIL）分别计分，再按原行序拼接；结果与 score_all(df, scales) 相同。
+    workers 缺省为 CPU 核数；数据不足两片或 workers 为 1 时直接串行计算"""
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    names = list(SCALES) if scales is None else list(scales)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(df) <= shard_size:
+        return _score_all(df, names)
+    # 只把计分用到的题目列发给子进程，减少序列化的数据量
+    items = df[_plan(names)[0]]
+    shards = [(items.iloc[start:start + shard_size], names) for start in range(0, len(df), shard_size)]
+    executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor(max_workers=min(workers, len(shards))) as pool:
+        parts = list(pool.map(_score_shard, shards))
+    return pd.concat(parts)
+
+
+def _row_hashes(df, columns):
+    """各行题目取值的内容哈希（uint64）；题目按数值比较，1 与 1.0 哈希相同"""
+    block, _ = _item_block(df, columns)
+    return pd.util.hash_pandas_object(pd.DataFrame(block), index=False).to_numpy()
+
+
+def _store_parts(store):
+    return sorted(name for name in os.listdir(store) if name.startswith('part-') and name.endswith('.parquet'))
+
+
+def read_store(store, keys, columns=None):
+    """读取 score_incremental 的计分库：按文件顺序拼接各批次，同一 keys 只保留最新的一行。
+    columns 给出时只读取这些列（keys 总会读取）"""
+    import pyarrow.parquet as pq
+    if columns is not None:
+        columns = list(keys) + [col for col in columns if col not in keys]
+    parts = [pq.read_table(os.path.join(store, name), columns=columns).to_pandas() for name in _store_parts(store)]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True).drop_duplicates(list(keys), keep='last').reset_index(drop=True)
+
+
+def score_incremental(df, store, keys, scales=None):
+    """增量计分：keys 为被试编号、测评批次等唯一标识一行作答的列。
+    按题目内容哈希与计分库 store（目录）中各 keys 的最新记录比较，只对新增或题目有改动的行计分，
+    结果（keys、哈希与 score_all 的输出）作为一个新批次追加到 store。
+    每次只读取库中的 keys 与哈希列，计分和写出的量与新行数成正比。返回本次计分的行数"""
+    names = list(SCALES) if scales is None else list(scales)
+    keys = list(keys)
+    hashes = _row_hashes(df, _plan(names)[0])
+    current = df[keys].reset_index(drop=True)
+    current['_item_hash'] = hashes
+    parts = _store_parts(store) if os.path.isdir(store) else []
+    if parts:
+        seen = read_store(store, keys, ['_item_hash'])
+        merged = current.merge(seen, on=keys + ['_item_hash'], how='left', indicator=True)
+        changed = (merged['_merge'] == 'left_only').to_numpy()
+    else:
+        changed = np.ones(len(df), dtype=bool)
+    if not changed.any():
+        return 0
+    scores = _score_all(df[changed], names).reset_index(drop=True)
+    batch = pd.concat([current[changed].reset_index(drop=True), scores], axis=1)
+    os.makedirs(store, exist_ok=True)
+    number = int(parts[-1][5:-8]) + 1 if parts else 0
+    batch.to_parquet(os.path.join(store, 'part-%06d.parquet' % number), engine='pyarrow', index=False)
+    return int(changed.sum())
+
+
+def compact_store(store, keys):
+    """把计分库合并为一个批次文件，只保留每个 keys 的最新记录"""
+    latest = read_store(store, keys)
+    parts = _store_parts(store)
+    number = int(parts[-1][5:-8]) + 1 if parts else 0
+    latest.to_parquet(os.path.join(store, 'part-%06d.parquet' % number), engine='pyarrow', index=False)
+    for name in parts:
+        os.remove(os.path.join(store, name))
+
+
+def _copy_on_write():
+    """pandas 是否启用写时复制（pandas 3 起始终启用）"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+
+def _fingerprint(df, columns):
+    """题目列的指纹：各列底层数组的地址、形状与类型。
+    缓存同时持有这些列的引用：写时复制下对源列的任何修改都会产生新数组，指纹随之改变；
+    未启用写时复制的旧版 pandas 无法察觉原地修改，因此再附上各列内容的哈希"""
+    refs = [df[col] for col in columns]
+    tokens = []
+    for series in refs:
+        values = series.array
+        data = getattr(values, '_data', None)
+        if not isinstance(data, np.ndarray):
+            data = series.to_numpy()
+        tokens.append((data.__array_interface__['data'][0], data.shape, data.strides, str(series.dtype)))
+    if not _copy_on_write():
+        tokens.extend(int(pd.util.hash_pandas_object(series, index=False).sum()) for series in refs)
+    return tuple(tokens), refs
+
+
+def _memoize(df, key, columns, compute):
+    """按 (key, 题目列指纹) 为每个 DataFrame 缓存 compute() 的结果；题目列改变后重新计算"""
+    frame_id = id(df)
+    entries = _CACHE.get(frame_id)
+    if entries is None:
+        entries = _CACHE[frame_id] = {}
+        weakref.finalize(df, _CACHE.pop, frame_id, None)
+    fingerprint, refs = _fingerprint(df, columns)
+    entry = entries.get(key)
+    if entry is not None and entry[0] == fingerprint:
+        return entry[2]
+    value = compute()
+    entries[key] = (fingerprint, refs, value)
+    return value
+
+
+def _memoize_frame(df, key, columns, compute):
+    """_memoize 缓存 DataFrame 结果时的取用方式：返回缓存的副本，行索引换成 df 当前的索引
+    （指纹只含题目列，df.index 改变后缓存仍然命中）"""
+    scores = _memoize(df, key, columns, compute)
+    # 写时复制下浅复制即可与缓存共用数组，调用方写入时由 pandas 复制；否则返回深复制，保护缓存
+    scores = scores.copy(deep=not _copy_on_write())
+    scores.index = df.index
+    return scores
+
+
+def _attach(df, data):
+    """用一次 concat 把 data 的各列附加到 df 之后，返回新的 DataFrame（df 本身不变，同名的旧列被替换）。
+    逐列赋值（df[col] = ...，包括 df[列表] = data）每列各插入一个块，会造成碎片化；
+    data 先复制一次（只复制结果列），把逐列构造的结果合并为每种类型一个块"""
+    return pd.concat([df.drop(columns=[col for col in data.columns if col in df.columns]), data.copy()], axis=1)
+
+
+def _result(df, data, returns, attach):
+    """方法的统一出口：默认只返回 returns 指定的列；
+    attach=True 时返回附加了 data 中全部结果（包括中间列）的 df 副本，见 _attach。两种情况都不修改 df"""
+    if attach:
+        return _attach(df, data)
+    return data[returns]
+
+
+EDUCATION_STAGES = ['primary_school', 'middle_school', 'high_school', 'college', 'postgradulate']
+GENDER_LABELS = ['Male', 'Female']
+
+
+def _date_formats(sample):
+    """按一个日期字符串推断候选格式：月、日位置有歧义时（如 03/04/2021）月在前的格式在先，日在前的在后"""
+    from pandas.tseries.api import guess_datetime_format
+    formats = []
+    for dayfirst in (False, True):
+        with warnings.catch_warnings():
+            # 年在前的写法（如 2021-08-27）不受 dayfirst 影响，pandas 对此的提示无需显示
+            warnings.simplefilter('ignore', UserWarning)
+            format = guess_datetime_format(sample, dayfirst=dayfirst)
+        if format is not None and format not in formats:
+            formats.append(format)
+    return formats
+
+
+def _parse_dates(values, format=None, unit='s'):
+    """把日期列转成 datetime64 数组。已是日期类型时直接使用；整数或浮点数按 unit 解释为 Unix 时间戳；
+    字符串按 format 解析。未给出 format 时按本列第一个非空值推断候选格式，取第一个能解析整列的格式，
+    因此 13/04/1990 这样的日在前写法不会被当作月在前；整列都有歧义（日都不超过 12）时按月在前解析，
+    此时请明确给出 format。推断的格式只用于本列，不在列与列、调用与调用之间共用"""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values.dt.tz_localize(None).to_numpy() if values.dt.tz is not None else values.to_numpy()
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return pd.to_datetime(values, unit=unit).to_numpy()
+    if format is None:
+        sample = values.dropna()
+        for candidate in _date_formats(str(sample.iloc[0])) if len(sample) else []:
+            try:
+                return pd.to_datetime(values, format=candidate).to_numpy()
+            except ValueError:
+                continue
+    return pd.to_datetime(values, format=format).to_numpy()
+
+
+def _civil_date(days):
+    """1970-01-01 起的天数换算为 (年, 月, 日) 整数数组；纯整数运算，比 datetime64 的单位转换快得多"""
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    # 以三月为一年之始，二月（含闰日）排在最后
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = np.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+
+def _calendar_age(birthday, at):
+    """按日历计算的周岁：年份差，当年生日未到时减一；日期缺失时为 NaN"""
+    missing = np.isnat(birthday) | np.isnat(at)
+    (year1, month1, day1), (year2, month2, day2) = [
+        _civil_date(dates.astype('datetime64[D]').view(np.int64)) for dates in (birthday, at)]
+    age = year2 - year1 - (month2 * 32 + day2 < month1 * 32 + day1)
+    if missing.any():
+        return np.where(missing, np.nan, age)
+    return age
+
+
+def score_demographics(df, outputs=None, date_format=None, unit='s'):
+    """一次计算人口学信息：age（填写问卷时 sub_time 的周岁，出生日期 birthday）、gender_text（1 = Male；2 = Female）、
+    education_years（各教育阶段年数相加）、BMI（身高 cm，体重 kg）。
+    outputs 缺省为 df 中具备所需列的全部结果；日期列的解析见 _parse_dates。不修改 df，返回与 df 同索引的 DataFrame"""
+    sources = {'age': ['sub_time', 'birthday'], 'gender_text': ['gender_number'],
+               'education_years': EDUCATION_STAGES, 'BMI': ['height', 'weight']}
+    if outputs is None:
+        outputs = [name for name, cols in sources.items() if all(col in df.columns for col in cols)]
+    data = {}
+    if 'age' in outputs:
+        data['age'] = _calendar_age(_parse_dates(df['birthday'], date_format, unit),
+                                    _parse_dates(df['sub_time'], date_format, unit))
+    if 'gender_text' in outputs:
+        gender = df['gender_number'].to_numpy(dtype=np.float64, na_value=np.nan)
+        codes = np.where((gender == 1) | (gender == 2), gender - 1, -1).astype(np.int8)
+        data['gender_text'] = pd.Categorical.from_codes(codes, categories=GENDER_LABELS)
+    if 'education_years' in outputs:
+        data['education_years'] = df[EDUCATION_STAGES].to_numpy(dtype=np.float64, na_value=np.nan).sum(axis=1)
+        if all(pd.api.types.is_integer_dtype(dtype) for dtype in df[EDUCATION_STAGES].dtypes):
+            data['education_years'] = data['education_years'].astype(np.int64)
+    if 'BMI' in outputs:
+        height = df['height'].to_numpy(dtype=np.float64, na_value=np.nan) / 100
+        data['BMI'] = df['weight'].to_numpy(dtype=np.float64, na_value=np.nan) / (height * height)
+    return pd.DataFrame(data, index=df.index, columns=list(outputs))
+
+
+class NormTable(object):
+    """分层常模表：把原始分列 score（如 'BDI'、'TAS'）换算为标准分（如 T 分、百分位）。
+    table 每行给出某一层中一个原始分对应的标准分，列为：raw（原始分）；可选的 gender（性别编码，同 gender_number）、
+    age_min 与 age_max（年龄段，含两端）；其余数值列（如 T、percentile）为标准分。
+    原始分落在表中两个原始分之间时取不超过它的最大一行，低于该层最低原始分时取最低一行"""
+
+    def __init__(self, score, table):
+        self.score = score
+        self.table = pd.DataFrame(table)
+        self.by_gender = 'gender' in self.table.columns
+        self.by_age = 'age_min' in self.table.columns
+        self.outputs = [col for col in self.table.columns if col not in ('raw', 'gender', 'age_min', 'age_max')]
+        self._compiled = None
+
+    def compile(self):
+        """编译为排好序的数组：(性别取值, 年龄段, 最低原始分, 每层的键跨度, 键, 标准分矩阵)。
+        键 = 层号 × 跨度 + (原始分 - 最低原始分)，全部层排成一个有序数组，整列查找只需一次 searchsorted"""
+        if self._compiled is None:
+            table = self.table
+            n = len(table)
+            gender = table['gender'].to_numpy(dtype=np.float64) if self.by_gender else np.zeros(n)
+            if self.by_age:
+                ages = table[['age_min', 'age_max']].to_numpy(dtype=np.float64)
+            else:
+                ages = np.tile([-np.inf, np.inf], (n, 1))
+            genders = np.unique(gender)
+            bands = np.unique(ages, axis=0)
+            if (bands[1:, 0] <= bands[:-1, 1]).any():
+                raise ValueError('%s 的常模表年龄段有重叠' % self.score)
+            stratum = np.searchsorted(genders, gender) * len(bands) + np.searchsorted(bands[:, 0], ages[:, 0])
+            raw = table['raw'].to_numpy(dtype=np.float64)
+            low = raw.min()
+            span = raw.max() - low + 1
+            key = stratum * span + (raw - low)
+            order = np.argsort(key, kind='stable')
+            key = key[order]
+            if (np.diff(key) == 0).any():
+                raise ValueError('%s 的常模表同一层中有重复的原始分' % self.score)
+            values = table[self.outputs].to_numpy(dtype=np.float64)[order]
+            self._compiled = (genders, bands, low, span, key, values)
+        return self._compiled
+
+    def lookup(self, raw, age=None, gender=None):
+        """按性别与年龄找到各被试所在的层，对整列原始分做一次 searchsorted，返回 {标准分名: 数组}；
+        原始分、年龄或性别缺失，或表中没有所在的层时为 NaN"""
+        genders, bands, low, span, key, values = self.compile()
+        raw = np.asarray(raw, dtype=np.float64)
+        valid = ~np.isnan(raw)
+        stratum = np.zeros(len(raw), dtype=np.int64)
+        if self.by_gender:
+            gender = np.asarray(gender, dtype=np.float64)
+            g = np.minimum(np.searchsorted(genders, gender), len(genders) - 1)
+            valid &= genders[g] == gender
+            stratum += g * len(bands)
+        if self.by_age:
+            age = np.asarray(age, dtype=np.float64)
+            a = np.maximum(np.searchsorted(bands[:, 0], age, side='right') - 1, 0)
+            valid &= (bands[a, 0] <= age) & (age <= bands[a, 1])
+            stratum += a
+        base = stratum * span
+        first = np.searchsorted(key, base)
+        valid &= first < len(key)
+        first = np.minimum(first, len(key) - 1)
+        valid &= key[first] < base + span
+        offset = np.clip(np.where(valid, raw, low) - low, 0, span - 1)
+        position = np.maximum(np.searchsorted(key, base + offset, side='right') - 1, first)
+        result = values[position]
+        result[~valid] = np.nan
+        return dict(zip(self.outputs, result.T))
+
+
+# 已登记的常模表：{原始分列名: NormTable}
+NORMS = {}
+
+
+def add_norms(score, table, **read_kwargs):
+    """登记原始分列 score 的常模表；table 为 DataFrame 或 CSV 文件路径（read_kwargs 传给 pd.read_csv），
+    列的含义见 NormTable。常模表只读取、编译一次，之后各次 standardize 共用"""
+    if isinstance(table, (str, os.PathLike)):
+        table = pd.read_csv(table, **read_kwargs)
+    NORMS[score] = NormTable(score, table)
+    return NORMS[score]
+
+
+def standardize(df, scores=None, age='age', gender='gender_number'):
+    """按已登记的常模表（NORMS）把 df 中的原始分换算为标准分，列名为“<原始分列名>_<标准分名>”（如 BDI_T、BDI_percentile）。
+    scores 缺省为 df 中有常模表的全部原始分列（原始分可先用 score_all 算出）；
+    年龄取 age 列，df 中没有该列时按 sub_time、birthday 计算（见 score_demographics）。不修改 df，返回与 df 同索引的 DataFrame"""
+    names = [name for name in NORMS if name in df.columns] if scores is None else list(scores)
+    ages = genders = None
+    data = {}
+    for name in names:
+        norm = NORMS[name]
+        if norm.by_age and ages is None:
+            ages = (df[age] if age in df.columns else score_demographics(df, ['age'])['age']).to_numpy(dtype=np.float64, na_value=np.nan)
+        if norm.by_gender and genders is None:
+            genders = df[gender].to_numpy(dtype=np.float64, na_value=np.nan)
+        raw = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        for col, values in norm.lookup(raw, ages, genders).items():
+            data[name + '_' + col] = values
+    return pd.DataFrame(data, index=df.index)
+
+
+def _chunks(data, chunksize):
+    """把 DataFrame 按 chunksize 行切块；已是分块迭代器（如 pd.read_csv(..., chunksize=...)）时原样返回"""
+    if isinstance(data, pd.DataFrame):
+        return (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+    return data
+
+
+def _item_covariances(data, names, chunksize=100000):
+    """逐块累积各量表（转换后）题目的协方差矩阵，返回 {量表名: (有效被试数, 协方差矩阵)}。
+    每个量表只用其题目全部作答的被试（成列删除）；各块的均值与离差平方和矩阵按 Chan 等人的并行公式合并，
+    内存只与块大小和题目数有关"""
+    stats = dict((name, (0, 0.0, 0.0)) for name in names)
+    for chunk in _chunks(data, chunksize):
+        for name in names:
+            columns, _, _, _, recodes, _ = _plan([name])
+            block, _ = _item_block(chunk, columns)
+            for j, low, table in recodes:
+                block[:, j] = _apply_lookup(block[:, j], low, table)
+            block = block[~np.isnan(block).any(axis=1)]
+            if not len(block):
+                continue
+            n, mean, m2 = stats[name]
+            n_chunk = len(block)
+            mean_chunk = block.mean(axis=0)
+            centered = block - mean_chunk
+            delta = mean_chunk - mean
+            m2 = m2 + centered.T @ centered + np.outer(delta, delta) * (n * n_chunk / (n + n_chunk))
+            stats[name] = (n + n_chunk, mean + delta * (n_chunk / (n + n_chunk)), m2)
+    return dict((name, (n, m2 / (n - 1) if n > 1 else None)) for name, (n, _, m2) in stats.items())
+
+
+def _alpha(cov):
+    """由（已乘上计分权重的）题目协方差矩阵计算 Cronbach's alpha、校正的题总相关与删除该题后的 alpha"""
+    k = len(cov)
+    variances = np.diag(cov)
+    total = cov.sum()
+    row = cov.sum(axis=1)
+    alpha = k / (k - 1) * (1 - variances.sum() / total) if k > 1 else np.nan
+    rest = total - 2 * row + variances
+    with np.errstate(divide='ignore', invalid='ignore'):
+        item_total = (row - variances) / np.sqrt(variances * rest)
+        alpha_if_deleted = (k - 1) / (k - 2) * (1 - (variances.sum() - variances) / rest) if k > 2 else np.full(k, np.nan)
+    return alpha, item_total, alpha_if_deleted
+
+
+def _omega(cov, iterations=100):
+    """单因素模型（主轴因子法）的 McDonald's omega；题目少于 3 道时为 NaN"""
+    k = len(cov)
+    sd = np.sqrt(np.diag(cov))
+    if k < 3 or not np.all(sd > 0):
+        return np.nan
+    corr = cov / np.outer(sd, sd)
+    # 以复相关平方为初始共同度，迭代求第一因子载荷
+    communality = 1 - 1 / np.diag(np.linalg.pinv(corr))
+    for _ in range(iterations):
+        reduced = corr.copy()
+        np.fill_diagonal(reduced, communality)
+        values, vectors = np.linalg.eigh(reduced)
+        loadings = vectors[:, -1] * np.sqrt(max(values[-1], 0))
+        updated = np.minimum(loadings ** 2, 1)
+        if np.allclose(updated, communality, atol=1e-6):
+            break
+        communality = updated
+    common = loadings.sum() ** 2
+    return common / (common + (1 - loadings ** 2).sum())
+
+
+def reliability(data, scales=None, chunksize=100000):
+    """按注册表中的题目构成计算各量表、分量表与总分的内部一致性。
+    data 为 DataFrame 或分块迭代器（如 pd.read_csv(..., chunksize=...)），逐块累积协方差矩阵，可用于数百万行的队列。
+    每个量表只需一个协方差矩阵：各分量表取其中用到的题目，按计分权重（反向计分题为负）换算后计算。
+    post 中并入分量表的题组（Scale.merged，如EDI的 ineffectiveness）按线性近似算入该分量表，这些行的 approximate 为 True。
+    返回 (summary, items) 两个 DataFrame：summary 每个分数一行（scale、score、n、n_items、alpha、omega、approximate）；
+    items 每个分数的每道题一行（scale、score、item、item_total_r 校正的题总相关、alpha_if_deleted）。
+    scales 缺省为注册表中的全部线性量表（PSQI、YFAS 等按 kernel 计分的量表没有题目权重，不计算）"""
+    names = [name for name in SCALES if SCALES[name].kernel is None] if scales is None else list(scales)
+    covariances = _item_covariances(data, names, chunksize)
+    summary, items = [], []
+    for name in names:
+        n, cov = covariances[name]
+        scale = SCALES[name]
+        columns, W = scale.compile()[:2]
+        for j, score in enumerate(scale.outputs):
+            if score.startswith('_'):
+                continue
+            weights = W[:, j].copy()
+            approximate = False
+            for group, (target, factor) in scale.merged.items():
+                if target == score:
+                    weights += W[:, scale.outputs.index(group)] * factor
+                    approximate = True
+            used = np.flatnonzero(weights)
+            if cov is None:
+                alpha, item_total, alpha_if_deleted, omega = np.nan, np.full(len(used), np.nan), np.full(len(used), np.nan), np.nan
+            else:
+                weighted = cov[np.ix_(used, used)] * np.outer(weights[used], weights[used])
+                alpha, item_total, alpha_if_deleted = _alpha(weighted)
+                omega = _omega(weighted)
+            summary.append((name, score, n, len(used), alpha, omega, approximate))
+            items.extend(zip([name] * len(used), [score] * len(used), [columns[i] for i in used], item_total, alpha_if_deleted))
+    summary = pd.DataFrame(summary, columns=['scale', 'score', 'n', 'n_items', 'alpha', 'omega', 'approximate'])
+    items = pd.DataFrame(items, columns=['scale', 'score', 'item', 'item_total_r', 'alpha_if_deleted'])
+    return summary, items
+
+
+def _bootstrap_moments(df, statistics):
+    """把各统计量换算成被试层面的“矩”列：每个重抽样样本的统计量只由各矩列的加权和（权重为被试被抽中的次数）决定。
+    返回 (矩矩阵, [(统计量名, 种类, 所用矩列的位置)])；需要的分数列 df 中没有时，用 score_all 一次算出"""
+    specs = dict((name, (spec,) if isinstance(spec, str) else tuple(spec)) for name, spec in statistics.items())
+    wanted = [spec[0] for spec in specs.values() if spec[0] != 'alpha' and spec[0] not in df.columns]
+    scales = [name for name, scale in SCALES.items()
+              if set(wanted) & set(scale.outputs + [c.name for c in scale.cutoffs] + [c.text_name for c in scale.cutoffs])]
+    scores = _score_all(df, scales) if wanted else None
+    columns, layout = [], []
+
+    def add(*arrays):
+        start = len(columns)
+        columns.extend(np.asarray(array, dtype=np.float64) for array in arrays)
+        return list(range(start, len(columns)))
+
+    for name, spec in specs.items():
+        if spec[0] == 'alpha':
+            scale = SCALES[spec[1]]
+            score = spec[2] if len(spec) > 2 else scale.outputs[-1]
+            item_columns, W, _, _, recodes, _ = _plan([spec[1]])
+            block, _ = _item_block(df, item_columns)
+            for j, low, table in recodes:
+                block[:, j] = _apply_lookup(block[:, j], low, table)
+            used = np.flatnonzero(W[:, scale.outputs.index(score)])
+            block = block[:, used] * W[used, scale.outputs.index(score)]
+            valid = ~np.isnan(block).any(axis=1)
+            block = np.where(valid[:, None], block, 0)
+            total = block.sum(axis=1)
+            layout.append((name, 'alpha', add(valid, *block.T, *(block ** 2).T, total, total ** 2)))
+        else:
+            values = df[spec[0]] if spec[0] in df.columns else scores[spec[0]]
+            values = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            if len(spec) > 1:
+                values = values == spec[1]
+            layout.append((name, 'mean', add(valid, np.where(valid, values, 0))))
+    return np.column_stack(columns), layout
+
+
+def _bootstrap_statistics(totals, layout):
+    """由各样本的矩列加权和（每行一个样本）计算各统计量，返回 样本数 × 统计量数 的矩阵"""
+    results = []
+    for name, kind, positions in layout:
+        sums = totals[:, positions]
+        n = sums[:, 0]
+        if kind == 'mean':
+            results.append(sums[:, 1] / n)
+        else:
+            k = (len(positions) - 3) // 2
+            means = sums[:, 1:k + 1] / n[:, None]
+            item_variance = (sums[:, k + 1:2 * k + 1] / n[:, None] - means ** 2).sum(axis=1)
+            total_variance = sums[:, -1] / n - (sums[:, -2] / n) ** 2
+            results.append(k / (k - 1) * (1 - item_variance / total_variance))
+    return np.column_stack(results)
+
+
+def _bootstrap_totals(moments, seed, size):
+    """生成 size 个重抽样样本：一次抽出 size × n 个被试编号，按样本计数成权重矩阵，与矩矩阵做一次矩阵乘法"""
+    rng = np.random.default_rng(seed)
+    n = len(moments)
+    draws = rng.integers(0, n, (size, n)) + (np.arange(size) * n)[:, None]
+    counts = np.bincount(draws.ravel(), minlength=size * n).reshape(size, n)
+    return counts.astype(np.float64) @ moments
+
+
+# 子进程中的矩矩阵：进程池初始化时发送一次，各批重抽样共用
+_BOOTSTRAP_MOMENTS = None
+
+
+def _bootstrap_init(moments):
+    global _BOOTSTRAP_MOMENTS
+    _BOOTSTRAP_MOMENTS = moments
+
+
+def _bootstrap_batch(args):
+    """并行重抽样的工作函数（须在模块顶层，以便进程池序列化）"""
+    seed, size = args
+    return _bootstrap_totals(_BOOTSTRAP_MOMENTS, seed, size)
+
+
+def bootstrap(df, statistics, n_boot=1000, level=0.95, seed=0, workers=None, batch_size=20, threads=False):
+    """统计量的自助法（bootstrap）百分位置信区间。
+    statistics 为 {名称: 规格}，规格可以是：列名（均值，如 'BDI'）；(列名, 取值)（取该值的比例，如
+    ('whether_numeric_depression', 1) 或 ('food_addiction', 1)；均值与比例都不计缺失）；('alpha', 量表名[, 分数名])（Cronbach's alpha，分数缺省为总分，df 须含题目列）。
+    分数只计算一次（df 中没有的分数列用 score_all 算出），之后只对被试编号重抽样：每批 batch_size 个样本
+    一次抽样、一次矩阵乘法，各批分发到 workers 个进程（threads=True 时为线程；缺省为 CPU 核数）。
+    每批使用由 seed 派生的独立随机数流，结果只与 seed 有关，与进程数无关。
+    返回以统计量名称为索引的 DataFrame：estimate（全样本估计）、se（自助标准误）、lower、upper"""
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    moments, layout = _bootstrap_moments(df, statistics)
+    estimate = _bootstrap_statistics(moments.sum(axis=0)[None, :], layout)[0]
+    sizes = [min(batch_size, n_boot - start) for start in range(0, n_boot, batch_size)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= 1:
+        totals = [_bootstrap_totals(moments, task_seed, size) for task_seed, size in tasks]
+    else:
+        executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+        with executor(max_workers=min(workers, len(tasks)), initializer=_bootstrap_init, initargs=(moments,)) as pool:
+            totals = list(pool.map(_bootstrap_batch, tasks))
+    replicates = _bootstrap_statistics(np.vstack(totals), layout)
+    tail = (1 - level) / 2 * 100
+    lower, upper = np.nanpercentile(replicates, [tail, 100 - tail], axis=0)
+    return pd.DataFrame({'estimate': estimate, 'se': np.nanstd(replicates, axis=0, ddof=1),
+                         'lower': lower, 'upper': upper}, index=[name for name, _, _ in layout])
+
+
+PSQI_ITEMS = (['PSQI1_1', 'PSQI1_2', 'PSQI2', 'PSQI3_1', 'PSQI3_2', 'PSQI4_1', 'PSQI4_2']
+              + ['PSQI5_%d' % i for i in range(1, 11)] + ['PSQI6', 'PSQI7', 'PSQI8', 'PSQI9'])
+PSQI_COMPONENTS = ['subjective_sleep_quality', 'sleep_latency', 'sleep_persistence', 'sleep_efficiency',
+                   'sleep_turbulence', 'use_sleep_medication', 'daytime_dysfunction']
+# 成分分箱：睡眠持续性 <5 小时为3分，5~6 小时（含）为2分，6~7 小时（含）为1分，>7 小时为0分；
+# 睡眠效率保留两位小数后 <0.65 为3分，0.65~0.74 为2分，0.75~0.84 为1分，>=0.85 为0分
+PSQI_CUTOFFS = [
+    Cutoff('sleep_latency', 'sleep_latency_transfer', [0, 2, 4], [0, 1, 2, 3]),
+    Cutoff('sleep_persistence', 'sleep_persistence_transfer', [np.nextafter(5, -np.inf), 6, 7], [3, 2, 1, 0]),
+    Cutoff('sleep_efficiency', 'sleep_efficiency_transfer', [0.65, 0.75, 0.85], [3, 2, 1, 0], right=False),
+    Cutoff('sleep_turbulence', 'sleep_turbulence_transfer', [0, 9, 18], [0, 1, 2, 3]),
+    Cutoff('daytime_dysfunction', 'daytime_dysfunction_transfer', [0, 2, 4], [0, 1, 2, 3]),
+]
+PSQI_LEVEL = Cutoff('sleep_quality_level', 'PSQI', [5, 10, 15], [1, 2, 3, 4], ['Good', 'Fair', 'Limited', 'Poor'],
+                    'sleep_quality_level_text')
+YFAS_ITEMS = ['YFAS%d' % i for i in range(1, 36)]
+YFAS_CRITERIA = ['1_longer_than_intend', '2_unsuccessful_attempts', '3_much_time', '4_given_up',
+                 '5_despite_adverse_consequences', '6_tolerance', '7_withdraw_symptoms',
+                 '8_despite_interpersonal_problems', '9_failure_role', '10_failure_role', '11_craving',
+                 '12_clinical_impairment']
+# 各题达标所需的最低频率（原始分）：
+# 2 = Once a month: #9, #10, #19, #27, #33, #35
+# 3 = Two to three times a month: #8, #18, #20, #21, #34
+# 4 = Once a week: #3, #11, #13, #14, #22, #28, #29
+# 5 = Two to three time's a week: #5, #12, #16, #17, #23, #24, #26, #30, #31, #32
+# 6 = Four to six times a week: #1, #2, #4, #6, #7, #15, #25
+YFAS_THRESHOLDS = np.zeros(35)
+for threshold, numbers in [(2, [9, 10, 19, 27, 33, 35]),
+                           (3, [8, 18, 20, 21, 34]),
+                           (4, [3, 11, 13, 14, 22, 28, 29]),
+                           (5, [5, 12, 16, 17, 23, 24, 26, 30, 31, 32]),
+                           (6, [1, 2, 4, 6, 7, 15, 25])]:
+    YFAS_THRESHOLDS[np.array(numbers) - 1] = threshold
+# 题目 × 症状标准的归属矩阵
+YFAS_MEMBERSHIP = np.zeros((35, len(YFAS_CRITERIA)))
+for j, numbers in enumerate([[1, 2, 3], [4, 25, 31, 32], [5, 6, 7], [8, 10, 18, 20], [22, 23], [24, 26],
+                             [11, 12, 13, 14, 15], [9, 21, 35], [19, 27], [28, 33, 34], [29, 30], [16, 17]]):
+    YFAS_MEMBERSHIP[np.array(numbers) - 1, j] = 1
+# 临界值定为2，需要根据中国地区的情况更新
+YFAS_DIAGNOSIS = Cutoff('food_addiction', 'food_addiction_score', [2], [0, 1], ['No Addiction', 'Addiction'],
+                        'food_addiction_text', right=False)
+
+
+def _clock_minutes(hour, minute, evening=False):
+    """把时、分题换算成一天中的分钟数（0~1439）。
+    evening=True 时按晚间时刻理解：1~12 点为下午/晚上（12 点即午夜），13~23 点按 24 小时制"""
+    if evening:
+        hour = np.where(hour > 12, hour, hour + 12)
+    minutes = hour * 60 + minute
+    return np.where(minutes >= 24 * 60, minutes - 24 * 60, minutes)
+
+
+def _psqi_scores(df):
+    """计算PSQI七个成分与总分（不修改 df），结果按题目列缓存。
+    题目只取一次成矩阵，时、分题先换算成分钟，各成分用数组运算与分界表一次算出"""
+    def compute():
+        # 成分都按列计算，逐列取成连续的 float64 数组
+        frame = df[PSQI_ITEMS]
+        item = dict((col, frame[col].to_numpy(dtype=np.float64, na_value=np.nan)) for col in PSQI_ITEMS)
+        # 上床时间（晚间）、起床时间（早上）与实际睡眠时长，单位为分钟；在床时间跨午夜
+        bed = _clock_minutes(item['PSQI1_1'], item['PSQI1_2'], evening=True)
+        rise = _clock_minutes(item['PSQI3_1'], item['PSQI3_2'])
+        stay_in_bed = rise - bed
+        stay_in_bed = np.where(stay_in_bed < 0, stay_in_bed + 24 * 60, stay_in_bed)
+        sleep_in_bed = item['PSQI4_1'] * 60 + item['PSQI4_2']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            efficiency = np.round(sleep_in_bed / stay_in_bed, 2)
+        transfer = {
+            'sleep_latency_transfer': item['PSQI2'] - 1 + item['PSQI5_1'] - 1,
+            'sleep_persistence_transfer': sleep_in_bed / 60,
+            'sleep_efficiency_transfer': efficiency,
+            'sleep_turbulence_transfer': sum(item['PSQI5_%d' % i] for i in range(2, 11)),
+            'daytime_dysfunction_transfer': item['PSQI8'] + item['PSQI9'],
+        }
+        data = {'subjective_sleep_quality': 5 - item['PSQI6'], 'use_sleep_medication': item['PSQI7']}
+        for cutoff in PSQI_CUTOFFS:
+            data[cutoff.name] = cutoff.numeric(transfer[cutoff.source])
+        data['PSQI'] = sum(data[col] for col in PSQI_COMPONENTS)
+        return pd.DataFrame(data, index=df.index, columns=PSQI_COMPONENTS + ['PSQI'])
+    return _memoize_frame(df, 'PSQI', PSQI_ITEMS, compute)
+
+
+def _yfas_scores(df):
+    """计算YFAS十二条症状标准、食物成瘾症状数与诊断（不修改 df），结果按题目列缓存。
+    35题的原始分与 YFAS_THRESHOLDS 一次比较得到各题是否达标，再与 YFAS_MEMBERSHIP 相乘得到各症状标准的达标题数"""
+    def compute():
+        block, _ = _item_block(df, YFAS_ITEMS)
+        missing = np.isnan(block)
+        hits = np.where(missing, np.nan, block >= YFAS_THRESHOLDS)
+        counts, _ = _linear_scores(hits, YFAS_MEMBERSHIP, np.zeros(len(YFAS_CRITERIA)))
+        d = pd.DataFrame(counts, index=df.index, columns=YFAS_CRITERIA)
+        #维度分转换：任一题达标即符合该症状标准，缺失按不符合计
+        d['food_addiction_score'] = (counts >= 1).sum(axis=1, dtype=np.float64)
+        #诊断
+        d['food_addiction'] = YFAS_DIAGNOSIS.numeric(d['food_addiction_score'])
+        d['food_addiction_text'] = YFAS_DIAGNOSIS.text(d['food_addiction_score'])
+        return d
+    return _memoize_frame(df, 'YFAS', YFAS_ITEMS, compute)
+
+
+# PSQI、YFAS 不是题目的线性组合，按 kernel 登记，与其他量表一样经 score_all / score_file / score_parallel 计分
+_register(
+    Scale('PSQI', 'PSQI', len(PSQI_ITEMS), columns=PSQI_ITEMS, kernel=_psqi_scores,
+          subscales=[(col, []) for col in PSQI_COMPONENTS], total='PSQI', cutoffs=[PSQI_LEVEL]),
+    Scale('YFAS', 'YFAS', len(YFAS_ITEMS), columns=YFAS_ITEMS, kernel=_yfas_scores,
+          subscales=[(col, []) for col in YFAS_CRITERIA], total='food_addiction_score', cutoffs=[YFAS_DIAGNOSIS]),
+)
+
+
+# 行为任务的试次参数（每名被试相同），建模数据按 被试 × 试次 展开
+# CRA：80个试次，前后两轮相同；每轮先是 5 种概率 × 5 种奖励的风险试次，再是 3 种模糊度 × 5 种奖励的模糊试次
+_CRA_ROUND_PROB = np.repeat([0.13, 0.25, 0.38, 0.5, 0.75, 0.5, 0.5, 0.5], 5)
+_CRA_ROUND_AMBIG = np.repeat([0, 0, 0, 0, 0, 0.24, 0.5, 0.74], 5)
+CRA_PARAMETERS = {'trial': np.arange(1, 81),
+                  'prob': np.tile(_CRA_ROUND_PROB, 2),
+                  'ambig': np.tile(_CRA_ROUND_AMBIG, 2),
+                  'reward_var': np.tile([35, 56, 140, 350, 875], 16),
+                  'reward_fix': np.full(80, 35)}
+# DDT：5 种延迟 × 10 种延迟奖励，即时奖励固定为 20
+DDT_PARAMETERS = {'trial': np.arange(1, 51),
+                  'delay_later': np.repeat([7, 15, 30, 60, 120], 10),
+                  'amount_later': np.array([21, 25, 28, 32, 36, 41, 45, 49, 54, 60, 21, 26, 32, 38, 44, 50, 56, 63, 79, 80,
+                                            21, 28, 36, 45, 54, 60, 72, 80, 89, 100, 22, 34, 42, 50, 56, 68, 80, 94, 105, 120,
+                                            24, 38, 50, 60, 72, 84, 98, 116, 135, 150]),
+                  'delay_sooner': np.zeros(50, dtype=np.int64),
+                  'amount_sooner': np.full(50, 20)}
+
+
+def _long_format(parameters, subjects, choices):
+    """把 被试 × 试次 的选择矩阵展开为长格式：每名被试依次列出全部试次，试次参数按被试数平铺"""
+    n_subjects, n_trials = choices.shape
+    data = dict((name, np.tile(values, n_subjects)) for name, values in parameters.items())
+    # pd.melt 把被试编号当作列标签展开，原输出的 subjID 为 object 列，这里保持一致
+    data['subjID'] = np.repeat(np.asarray(subjects, dtype=object), n_trials)
+    data['choice'] = choices.reshape(-1)
+    return pd.DataFrame(data)
+
+
+
+def _model_bundle(parameters, subjects, choices):
+    """建模用的 被试 × 试次 数组（hBayesDM 的布局）：每名被试的有效试次（选择不缺失）排在前面，
+    其后补 0；Tsubj 为各被试的有效试次数"""
+    choices = np.asarray(choices, dtype=np.float64)
+    valid = ~np.isnan(choices)
+    # 每行把有效试次稳定地移到前面
+    order = np.argsort(~valid, axis=1, kind='stable')
+    n_subjects = len(choices)
+    subjects = np.asarray(subjects)
+    if len(subjects) != n_subjects:
+        raise ValueError('被试编号有 %d 个，选择矩阵有 %d 行' % (len(subjects), n_subjects))
+    Tsubj = valid.sum(axis=1)
+    padding = np.arange(choices.shape[1]) >= Tsubj[:, None]
+    bundle = {'subjID': subjects.astype(str), 'Tsubj': Tsubj}
+    bundle['choice'] = np.where(padding, 0, np.take_along_axis(np.nan_to_num(choices), order, axis=1)).astype(np.int8)
+    for name, values in parameters.items():
+        grid = np.broadcast_to(np.asarray(values, dtype=np.float64), choices.shape)
+        bundle[name] = np.where(padding, 0, np.take_along_axis(grid, order, axis=1))
+    return bundle
+
+
+def save_model_bundle(bundle, path):
+    """保存建模数组：path 以 .npz 结尾时存为一个 npz 文件，否则存为目录，每个数组一个 .npy 文件（可内存映射读取）"""
+    if str(path).endswith('.npz'):
+        np.savez(path, **bundle)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name, values in bundle.items():
+        np.save(os.path.join(path, name + '.npy'), values)
+
+
+def load_model_bundle(path, mmap=True):
+    """读取 save_model_bundle 保存的建模数组，返回 {名称: 数组}；目录格式且 mmap=True 时以只读内存映射打开"""
+    if str(path).endswith('.npz'):
+        with np.load(path) as data:
+            return dict((name, data[name]) for name in data.files)
+    return dict((name[:-4], np.load(os.path.join(path, name), mmap_mode='r' if mmap else None))
+                for name in sorted(os.listdir(path)) if name.endswith('.npy'))
+
+
+# 行为任务导出的列布局：被试编号、注意检查题、各试次选择所在的列。
+# 每项可以是列名、列名列表、正则表达式（按表头顺序匹配的全部列）、列序号或 slice；
+# 默认沿用问卷星导出的列位置，表头不同时可直接修改，或在调用时用 columns 参数覆盖
+CRA_COLUMNS = {'subject': 9, 'checks': slice(12, 19), 'choices': slice(20, 100)}
+DDT_COLUMNS = {'subject': 9, 'choices': slice(12, 62)}
+# CRA 7道注意检查题的正确答案
+CRA_CHECK_ANSWERS = np.array([2, 3, 4, 4, 3, 2, 2])
+
+_COLUMN_INDEX = {}
+
+
+def _spec_key(spec):
+    if isinstance(spec, slice):
+        return ('slice', spec.start, spec.stop, spec.step)
+    if isinstance(spec, (list, tuple)):
+        return ('list', tuple(spec))
+    return (type(spec).__name__, spec)
+
+
+def resolve_columns(header, spec):
+    """把列说明 spec 解析为整数列位置数组；结果按 (表头, spec) 缓存，表头相同的文件直接复用"""
+    header = tuple(header)
+    key = (header, _spec_key(spec))
+    positions = _COLUMN_INDEX.get(key)
+    if positions is not None:
+        return positions
+    if isinstance(spec, slice):
+        positions = list(range(len(header)))[spec]
+    elif isinstance(spec, (list, tuple)):
+        positions = [p for item in spec for p in resolve_columns(header, item)]
+    elif isinstance(spec, (int, np.integer)):
+        positions = [range(len(header))[spec]]
+    elif spec in header:
+        positions = [header.index(spec)]
+    else:
+        pattern = re.compile(spec)
+        positions = [i for i, col in enumerate(header) if pattern.fullmatch(str(col))]
+        if not positions:
+            raise KeyError('没有与 %r 匹配的列' % (spec,))
+    positions = np.array(positions, dtype=np.intp)
+    _COLUMN_INDEX[key] = positions
+    return positions
+
+
+def _task_columns(df, layout, columns, expected):
+    """按布局（可被 columns 覆盖）解析任务各部分的列位置，并检查列数是否与试次数一致"""
+    layout = dict(layout, **(columns or {}))
+    positions = dict((role, resolve_columns(df.columns, spec)) for role, spec in layout.items())
+    for role, n in expected.items():
+        if len(positions[role]) != n:
+            raise ValueError('%s 应有 %d 列，按 %r 找到 %d 列' % (role, n, layout[role], len(positions[role])))
+    return positions
+
+
+def _task_choices(df, positions):
+    """取出各试次的选择（1/2）并转换为 0/1；出现其他取值说明列布局与导出文件不符"""
+    choice = df.iloc[:, positions].to_numpy() - 1
+    valid = pd.isna(choice) | (choice == 0) | (choice == 1)
+    if not valid.all():
+        bad = df.columns[positions[~valid.all(axis=0)]]
+        raise ValueError('选择列的取值应为1或2，请检查列布局：%s' % ', '.join(map(str, bad[:5])))
+    return choice
+
+
 # In[ ]:
 
 
 class PsyScales:
-    """此库包含袁逖飞实验室常用心理量表"""
+    """此库包含袁逖飞实验室常用心理量表。
+    各方法都不修改传入的 DataFrame：默认只返回结果；attach=True 时返回用一次 concat 附加了结果（包括中间列）的新 DataFrame，
+    如 df = PsyScales.get_BDI(df, attach=True)"""
     import numpy as np
     import pandas as pd
     import copy
     
     ########## 一、基本本人口学信息 ##########
-    def get_age(self):
-        """从问卷星中计算年龄：填写问卷时间-出生日期"""
-        import pandas as pd
-        self['sub_time'] = pd.to_datetime(self['sub_time'])
-        self['birthday'] = pd.to_datetime(self['birthday'])
-        self['age'] = ((self['sub_time']-self['birthday'])/365).astype('timedelta64[D]').astype(int)
-        return self['age']
+    def get_age(self, attach=False):
+        """从问卷星中计算年龄：填写问卷时间（sub_time）时的周岁，出生日期为 birthday"""
+        data = score_demographics(self, ['age'])
+        return _result(self, data, 'age', attach)
 
-    def get_gender_text(self):
+    def get_gender_text(self, attach=False):
         """数值型性别转换为文本型性别【1 = male；2 = female】"""
-        self['gender_text'] = (self['gender_number'])
-        self.gender_text.replace(1,'Male',inplace=True)
-        self.gender_text.replace(2,'Female',inplace=True)
-        return self['gender_text']
+        data = score_demographics(self, ['gender_text'])
+        return _result(self, data, 'gender_text', attach)
 
-    def get_education_years(self):
+    def get_education_years(self, attach=False):
         """yuanlab计算教育年限的方法为各个教育阶段的学习年数相加"""
-        self['education_years'] = self['primary_school'] + self['middle_school'] + self['high_school'] + self['college'] + self['postgradulate']
-        return self['education_years']
+        data = score_demographics(self, ['education_years'])
+        return _result(self, data, 'education_years', attach)
     
-    def get_BMI(self):
+    def get_BMI(self, attach=False):
         """身高单位是【cm】，体重单位是【公斤】"""
-        self['BMI'] = self['weight']/ pow(self['height']/100,2)
-        return self['BMI']
+        data = score_demographics(self, ['BMI'])
+        return _result(self, data, 'BMI', attach)
         
     ########## 二、神经心理量表 ##########
     
-    def get_BDI(self):
+    def get_BDI(self, attach=False):
         """计算BDI分数"""
-        self['BDI'] = self['BDI1'] + self['BDI2'] + self['BDI3'] + self['BDI4'] + self['BDI5'] + self['BDI6'] + self['BDI7'] + self['BDI8'] + self['BDI9'] + self['BDI10'] + self['BDI11'] + self['BDI12'] + self['BDI13'] + self['BDI14'] + self['BDI15'] + self['BDI16'] + self['BDI17'] + self['BDI18'] + self['BDI19'] + self['BDI20'] + self['BDI21']-21
-        return self['BDI']
+        scores = score_scale(self, 'BDI')
+        return _result(self, scores[['BDI']], 'BDI', attach)
     
-    def get_BDI_whether_numeric(self):
+    def get_BDI_whether_numeric(self, attach=False):
         """根据BDI量表分数判断是否抑郁【0 = 无抑郁；1 = 抑郁】"""
-        self['BDI'] = self['BDI1'] + self['BDI2'] + self['BDI3'] + self['BDI4'] + self['BDI5'] + self['BDI6'] + self['BDI7'] + self['BDI8'] + self['BDI9'] + self['BDI10'] + self['BDI11'] + self['BDI12'] + self['BDI13'] + self['BDI14'] + self['BDI15'] + self['BDI16'] + self['BDI17'] + self['BDI18'] + self['BDI19'] + self['BDI20'] + self['BDI21']-21
-        self['whether_numeric_depression']=(self['BDI'])
-        self.loc[self.BDI<=4,'whether_numeric_depression']=0
-        self.loc[self.BDI>4,'whether_numeric_depression']=1
-        return self['whether_numeric_depression']
+        data = score_scale(self, 'BDI')[['BDI']].copy()
+        data['whether_numeric_depression']=SCALES['BDI'].cutoff('whether_numeric_depression').numeric(data['BDI'])
+        return _result(self, data, 'whether_numeric_depression', attach)
     
-    def get_BDI_whether_text(self):
+    def get_BDI_whether_text(self, attach=False):
         """根据BDI量表分数判断是否抑郁【0 = 无抑郁；1 = 抑郁】"""
-        self['BDI'] = self['BDI1'] + self['BDI2'] + self['BDI3'] + self['BDI4'] + self['BDI5'] + self['BDI6'] + self['BDI7'] + self['BDI8'] + self['BDI9'] + self['BDI10'] + self['BDI11'] + self['BDI12'] + self['BDI13'] + self['BDI14'] + self['BDI15'] + self['BDI16'] + self['BDI17'] + self['BDI18'] + self['BDI19'] + self['BDI20'] + self['BDI21']-21
-        self['whether_text_depression']=(self['BDI'])
-        self.loc[self.BDI<=4,'whether_text_depression'] = 'Not Depressive'
-        self.loc[self.BDI>4,'whether_text_depression'] = 'Depressive'
-        return self['whether_text_depression']
+        data = score_scale(self, 'BDI')[['BDI']].copy()
+        data['whether_text_depression']=SCALES['BDI'].cutoff('whether_numeric_depression').text(data['BDI'])
+        return _result(self, data, 'whether_text_depression', attach)
         
-    def get_BDI_level_numeric(self):
+    def get_BDI_level_numeric(self, attach=False):
         """根据BDI量表分数判断抑郁严重程度【0 = 无抑郁；1 = 轻度抑郁； 2 = 中度抑郁；3 = 重度抑郁】"""
-        self['BDI'] = self['BDI1'] + self['BDI2'] + self['BDI3'] + self['BDI4'] + self['BDI5'] + self['BDI6'] + self['BDI7'] + self['BDI8'] + self['BDI9'] + self['BDI10'] + self['BDI11'] + self['BDI12'] + self['BDI13'] + self['BDI14'] + self['BDI15'] + self['BDI16'] + self['BDI17'] + self['BDI18'] + self['BDI19'] + self['BDI20'] + self['BDI21']-21
-        self['numeric_level_BDI']=(self['BDI'])
-        self.loc[self.BDI<=4,'numeric_level_BDI']=0             # 无抑郁
-        self.loc[self.BDI.between(5,7),'numeric_level_BDI']=1   # 轻度抑郁
-        self.loc[self.BDI.between(8,15),'numeric_level_BDI']=2  # 中度抑郁
-        self.loc[self.BDI>=16,'numeric_level_BDI']=3            # 重度抑郁
-        return self['numeric_level_BDI']
+        data = score_scale(self, 'BDI')[['BDI']].copy()
+        # 0~4 无抑郁；5~7 轻度抑郁；8~15 中度抑郁；16及以上 重度抑郁
+        data['numeric_level_BDI']=SCALES['BDI'].cutoff('numeric_level_BDI').numeric(data['BDI'])
+        return _result(self, data, 'numeric_level_BDI', attach)
     
-    def get_BDI_level_text(self):
+    def get_BDI_level_text(self, attach=False):
         """根据BDI量表分数判断抑郁严重程度"""
-        self['BDI'] = self['BDI1'] + self['BDI2'] + self['BDI3'] + self['BDI4'] + self['BDI5'] + self['BDI6'] + self['BDI7'] + self['BDI8'] + self['BDI9'] + self['BDI10'] + self['BDI11'] + self['BDI12'] + self['BDI13'] + self['BDI14'] + self['BDI15'] + self['BDI16'] + self['BDI17'] + self['BDI18'] + self['BDI19'] + self['BDI20'] + self['BDI21']-21
-        self['text_level_BDI']=(self['BDI'])
-        self.loc[self.BDI<=4,'text_level_BDI']='Not Depressive'                  # 无抑郁
-        self.loc[self.BDI.between(5,7),'text_level_BDI']='Mild Depressive'       # 轻度抑郁
-        self.loc[self.BDI.between(8,15),'text_level_BDI']='Moderate Depressive'  # 中度抑郁
-        self.loc[self.BDI>=16,'text_level_BDI']= 'Sever Depressive'              # 重度抑郁
-        return self['text_level_BDI']
+        data = score_scale(self, 'BDI')[['BDI']].copy()
+        data['text_level_BDI']=SCALES['BDI'].cutoff('numeric_level_BDI').text(data['BDI'])
+        return _result(self, data, 'text_level_BDI', attach)
     
-    def get_BAI(self):
+    def get_BAI(self, attach=False):
         """计算BAI总分"""
-        self['BAI'] = self['BAI1'] + self['BAI2'] + self['BAI3'] + self['BAI4'] + self['BAI5'] + self['BAI6'] + self['BAI7'] + self['BAI8'] + self['BAI9'] + self['BAI10'] + self['BAI11'] + self['BAI12'] + self['BAI13'] + self['BAI14'] + self['BAI15'] + self['BAI16'] + self['BAI17'] + self['BAI18'] + self['BAI19'] + self['BAI20'] + self['BAI21']-21
-        return self['BAI']
+        scores = score_scale(self, 'BAI')
+        return _result(self, scores[['BAI']], 'BAI', attach)
     
-    def get_BAI_level_numeric(self):
+    def get_BAI_level_numeric(self, attach=False):
         """根据BAI量表分数判断焦虑严重程度【0 = 低焦虑；1 = 中度焦虑；2 = 重度焦虑】"""
-        self['BAI'] = self['BAI1'] + self['BAI2'] + self['BAI3'] + self['BAI4'] + self['BAI5'] + self['BAI6'] + self['BAI7'] + self['BAI8'] + self['BAI9'] + self['BAI10'] + self['BAI11'] + self['BAI12'] + self['BAI13'] + self['BAI14'] + self['BAI15'] + self['BAI16'] + self['BAI17'] + self['BAI18'] + self['BAI19'] + self['BAI20'] + self['BAI21']-21
-        self['numeric_level_BAI']=(self['BAI'])
-        self.loc[self.BAI<=21,'numeric_level_BAI']=0             # 低焦虑
-        self.loc[self.BAI.between(22,35),'numeric_level_BAI']=1   # 中度焦虑
-        self.loc[self.BAI>=36,'numeric_level_BAI']=2            # 重度焦虑
-        return self['numeric_level_BAI']
+        data = score_scale(self, 'BAI')[['BAI']].copy()
+        # 0~21 低焦虑；22~35 中度焦虑；36及以上 重度焦虑
+        data['numeric_level_BAI']=SCALES['BAI'].cutoff('numeric_level_BAI').numeric(data['BAI'])
+        return _result(self, data, 'numeric_level_BAI', attach)
     
-    def get_BAI_level_text(self):
+    def get_BAI_level_text(self, attach=False):
         """根据BAI量表分数判断焦虑严重程度"""
-        self['BAI'] = self['BAI1'] + self['BAI2'] + self['BAI3'] + self['BAI4'] + self['BAI5'] + self['BAI6'] + self['BAI7'] + self['BAI8'] + self['BAI9'] + self['BAI10'] + self['BAI11'] + self['BAI12'] + self['BAI13'] + self['BAI14'] + self['BAI15'] + self['BAI16'] + self['BAI17'] + self['BAI18'] + self['BAI19'] + self['BAI20'] + self['BAI21']-21
-        self['text_level_BAI']=(self['BAI'])
-        self.loc[self.BAI<=21,'text_level_BAI']='Not Anxious'                  # 无焦虑
-        self.loc[self.BAI.between(22,35),'text_level_BAI']='Mild Anxious'       # 中度焦虑
-        self.loc[self.BAI>=36,'text_level_BAI']= 'Sever Anxious'              # 重度焦虑
-        return self['text_level_BAI']
+        data = score_scale(self, 'BAI')[['BAI']].copy()
+        data['text_level_BAI']=SCALES['BAI'].cutoff('numeric_level_BAI').text(data['BAI'])
+        return _result(self, data, 'text_level_BAI', attach)
 
     
-    def get_BIS_subscales(self):
+    def get_BIS_subscales(self, attach=False):
         """计算BIS所有分量表分数"""
-        import pandas as pd
-        # 计算分量表原始分
-        self['nonplan_impulsivity_primary']=(6-self['BIS1'])+(6-self['BIS4'])+(6-self['BIS7'])+(6-self['BIS10'])+(6-self['BIS13'])+(6-self['BIS16'])+(6-self['BIS19'])+(6-self['BIS22'])+(6-self['BIS25'])+(6-self['BIS28'])
-        self['motor_impulsivity_primary']=self['BIS2']+self['BIS5']+self['BIS8']+self['BIS11']+self['BIS14']+self['BIS17']+self['BIS20']+self['BIS23']+self['BIS26']+self['BIS29']
-        self['attention_impulsivity_primary']=(6-self['BIS3'])+(6-self['BIS6'])+(6-self['BIS9'])+(6-self['BIS12'])+(6-self['BIS15'])+(6-self['BIS18'])+(6-self['BIS21'])+(6-self['BIS24'])+(6-self['BIS27'])+(6-self['BIS30'])
-        #计算分量表100分制
-        self['nonplan_impulsivity']=((self['nonplan_impulsivity_primary']-10)/40)*100
-        self['motor_impulsivity']=((self['motor_impulsivity_primary']-10)/40)*100
-        self['attention_impulsivity']=((self['attention_impulsivity_primary']-10)/40)*100
-        data = pd.DataFrame(list(zip(self['nonplan_impulsivity'],self['motor_impulsivity'],self['attention_impulsivity'])))
-        data.columns = ['nonplan_impulsivity','motor_impulsivity','attention_impulsivity']
-        return data
+        # 计算分量表100分制
+        scores = score_scale(self, 'BIS')
+        columns = SCALES['BIS'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_BIS(self):
+    def get_BIS(self, attach=False):
         """计算BIS所有分量表分数以及总分"""
-        # 计算分量表原始分
-        self['nonplan_impulsivity_primary']=(6-self['BIS1'])+(6-self['BIS4'])+(6-self['BIS7'])+(6-self['BIS10'])+(6-self['BIS13'])+(6-self['BIS16'])+(6-self['BIS19'])+(6-self['BIS22'])+(6-self['BIS25'])+(6-self['BIS28'])
-        self['motor_impulsivity_primary']=self['BIS2']+self['BIS5']+self['BIS8']+self['BIS11']+self['BIS14']+self['BIS17']+self['BIS20']+self['BIS23']+self['BIS26']+self['BIS29']
-        self['attention_impulsivity_primary']=(6-self['BIS3'])+(6-self['BIS6'])+(6-self['BIS9'])+(6-self['BIS12'])+(6-self['BIS15'])+(6-self['BIS18'])+(6-self['BIS21'])+(6-self['BIS24'])+(6-self['BIS27'])+(6-self['BIS30'])
-        #计算分量表100分制
-        self['nonplan_impulsivity']=((self['nonplan_impulsivity_primary']-10)/40)*100
-        self['motor_impulsivity']=((self['motor_impulsivity_primary']-10)/40)*100
-        self['attention_impulsivity']=((self['attention_impulsivity_primary']-10)/40)*100
-        #计算BIS总分
-        self['BIS']=(self['nonplan_impulsivity']+self['motor_impulsivity']+self['attention_impulsivity'])/3
-        return self['BIS']
+        # 计算分量表100分制，以及BIS总分
+        scores = score_scale(self, 'BIS')
+        return _result(self, scores, 'BIS', attach)
     
-    def get_UPPS_P_subscales(self):
+    def get_UPPS_P_subscales(self, attach=False):
         """计算UPPS_P分量表分数，【简版】"""
-        import pandas as pd
-        self['negative_urgency']=self['UPPS_P6']+self['UPPS_P8']+self['UPPS_P13']+self['UPPS_P15']
-        self['positive_urgency']=self['UPPS_P3']+self['UPPS_P10']+self['UPPS_P17']+self['UPPS_P20']
-        self['lack_of_persistence']=(5-self['UPPS_P1'])+(5-self['UPPS_P4'])+(5-self['UPPS_P7'])+self['UPPS_P11']
-        self['lack_of_plan']=self['UPPS_P2']+(5-self['UPPS_P5'])+(5-self['UPPS_P12'])+self['UPPS_P19']
-        self['sensation_seeking']=self['UPPS_P9']+self['UPPS_P14']+self['UPPS_P16']+self['UPPS_P18']
-        data = pd.DataFrame(list(zip(self['negative_urgency'],self['positive_urgency'],self['lack_of_persistence'],self['lack_of_plan'],self['sensation_seeking'])))
-        data.columns = ['negative_urgency','positive_urgency','lack_of_persistence','lack_of_plan','sensation_seeking']
-        return data
+        scores = score_scale(self, 'UPPS_P')
+        columns = SCALES['UPPS_P'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_BIS_BAS_subscales(self):
-        import pandas as pd
-        self['BASR']=self['BAS4']+self['BAS5']+self['BAS7']+self['BAS14']+self['BAS18']+self['BAS23']
-        self['BASD']=self['BAS3']+self['BAS9']+self['BAS12']+self['BAS21']
-        self['BASF']=self['BAS10']+self['BAS15']+self['BAS16']+self['BAS20']
-        self['BIS']=self['BAS8']+self['BAS13']+self['BAS16']+self['BAS19']+self['BAS24']
-        data = pd.DataFrame(list(zip(self['BASR'],self['BASD'],self['BASF'],self['BIS'])))
-        data.columns = ['BASR','BASD','BASF','BIS']
-        return data
+    def get_BIS_BAS_subscales(self, attach=False):
+        scores = score_scale(self, 'BIS_BAS')
+        columns = SCALES['BIS_BAS'].subscale_names
+        return _result(self, scores[columns], columns, attach)
                  
-    def get_PSQI_subscales(self):
+    def get_PSQI_subscales(self, attach=False):
         """计算PSQI所有分量表"""
-        import pandas as pd
-        #主观睡眠质量
-        self['subjective_sleep_quality']=5-self['PSQI6']
-        #睡眠潜伏期
-        self['sleep_latency_transfer']=self['PSQI2']-1+self['PSQI5_1']-1
-        self['sleep_latency']=(self['sleep_latency_transfer'])
-        self.loc[self.sleep_latency_transfer<=0,'sleep_latency']=0
-        self.loc[self.sleep_latency_transfer.between(1,2),'sleep_latency']=1
-        self.loc[self.sleep_latency_transfer.between(3,4),'sleep_latency']=2
-        self.loc[self.sleep_latency_transfer.between(5,6),'sleep_latency']=3
-        # 睡眠持续性
-        self['sleep_persistence_transfer']=(self['PSQI4_1']*60+self['PSQI4_2'])/60
-        self['sleep_persistence']=(self['sleep_persistence_transfer'])
-        self.loc[self.sleep_persistence_transfer>7,'sleep_persistence']=0
-        self.loc[self.sleep_persistence_transfer.between(6,7),'sleep_persistence']=1
-        self.loc[self.sleep_persistence_transfer.between(5,6),'sleep_persistence']=2
-        self.loc[self.sleep_persistence_transfer<5,'sleep_persistence']=3
-        # 睡眠效率
-        self['stay_in_bed']=(12*60+self['PSQI3_1']*60+self['PSQI3_2'])-(self['PSQI1_1']*60+self['PSQI1_2'])
-        self['sleep_in_bed']=self['PSQI4_1']*60+self['PSQI4_2']
-        self['sleep_efficiency_transfer']=round(self['sleep_in_bed']/self['stay_in_bed'],2)
-        self['sleep_efficiency']=(self['sleep_efficiency_transfer'])
-        self.loc[self.sleep_efficiency_transfer>=0.85,'sleep_efficiency']=0
-        self.loc[self.sleep_efficiency_transfer.between(0.75,0.84),'sleep_efficiency']=1
-        self.loc[self.sleep_efficiency_transfer.between(0.65,0.74),'sleep_efficiency']=2
-        self.loc[self.sleep_efficiency_transfer<=0.64,'sleep_efficiency']=3
-        #睡眠紊乱
-        self['sleep_turbulence_transfer']=self['PSQI5_2']+self['PSQI5_3']+self['PSQI5_4']+self['PSQI5_5']+self['PSQI5_6']+self['PSQI5_7']+self['PSQI5_8']+self['PSQI5_9']+self['PSQI5_10']
-        self['sleep_turbulence']=(self['sleep_turbulence_transfer'])
-        self.loc[self.sleep_turbulence_transfer<=0,'sleep_turbulence']=0
-        self.loc[self.sleep_turbulence_transfer.between(1,9),'sleep_turbulence']=1
-        self.loc[self.sleep_turbulence_transfer.between(10,18),'sleep_turbulence']=2
-        self.loc[self.sleep_turbulence_transfer>=19,'sleep_turbulence']=3
-        #使用睡眠药物
-        self['use_sleep_medication']=self['PSQI7']
-        # 白天功能紊乱
-        self['daytime_dysfunction_transfer']=self['PSQI8']+self['PSQI9']
-        self['daytime_dysfunction']=(self['daytime_dysfunction_transfer'])
-        self.loc[self.daytime_dysfunction_transfer<=0,'daytime_dysfunction']=0
-        self.loc[self.daytime_dysfunction_transfer.between(1,2),'daytime_dysfunction']=1
-        self.loc[self.daytime_dysfunction_transfer.between(3,4),'daytime_dysfunction']=2
-        self.loc[self.daytime_dysfunction_transfer>=5,'daytime_dysfunction']=3
-        data = pd.DataFrame(list(zip(self['subjective_sleep_quality'],self['sleep_latency'], self['sleep_persistence'],self['sleep_efficiency'],self['sleep_turbulence'],self['use_sleep_medication'],self['daytime_dysfunction'])))
-        data.columns = ['subjective_sleep_quality','sleep_latency','sleep_persistence','sleep_efficiency','sleep_turbulence','use_sleep_medication','daytime_dysfunction']
-        return data
+        scores = _psqi_scores(self)
+        return _result(self, scores[PSQI_COMPONENTS], PSQI_COMPONENTS, attach)
         
-    def get_PSQI(self):
+    def get_PSQI(self, attach=False):
         """计算PSQI总分"""
-        #主观睡眠质量
-        self['subjective_sleep_quality']=5-self['PSQI6']
-        #睡眠潜伏期
-        self['sleep_latency_transfer']=self['PSQI2']-1+self['PSQI5_1']-1
-        self['sleep_latency']=(self['sleep_latency_transfer'])
-        self.loc[self.sleep_latency_transfer<=0,'sleep_latency']=0
-        self.loc[self.sleep_latency_transfer.between(1,2),'sleep_latency']=1
-        self.loc[self.sleep_latency_transfer.between(3,4),'sleep_latency']=2
-        self.loc[self.sleep_latency_transfer.between(5,6),'sleep_latency']=3
-        # 睡眠持续性
-        self['sleep_persistence_transfer']=(self['PSQI4_1']*60+self['PSQI4_2'])/60
-        self['sleep_persistence']=(self['sleep_persistence_transfer'])
-        self.loc[self.sleep_persistence_transfer>7,'sleep_persistence']=0
-        self.loc[self.sleep_persistence_transfer.between(6,7),'sleep_persistence']=1
-        self.loc[self.sleep_persistence_transfer.between(5,6),'sleep_persistence']=2
-        self.loc[self.sleep_persistence_transfer<5,'sleep_persistence']=3
-        # 睡眠效率
-        self['stay_in_bed']=(12*60+self['PSQI3_1']*60+self['PSQI3_2'])-(self['PSQI1_1']*60+self['PSQI1_2'])
-        self['sleep_in_bed']=self['PSQI4_1']*60+self['PSQI4_2']
-        self['sleep_efficiency_transfer']=round(self['sleep_in_bed']/self['stay_in_bed'],2)
-        self['sleep_efficiency']=(self['sleep_efficiency_transfer'])
-        self.loc[self.sleep_efficiency_transfer>=0.85,'sleep_efficiency']=0
-        self.loc[self.sleep_efficiency_transfer.between(0.75,0.84),'sleep_efficiency']=1
-        self.loc[self.sleep_efficiency_transfer.between(0.65,0.74),'sleep_efficiency']=2
-        self.loc[self.sleep_efficiency_transfer<=0.64,'sleep_efficiency']=3
-        #睡眠紊乱
-        self['sleep_turbulence_transfer']=self['PSQI5_2']+self['PSQI5_3']+self['PSQI5_4']+self['PSQI5_5']+self['PSQI5_6']+self['PSQI5_7']+self['PSQI5_8']+self['PSQI5_9']+self['PSQI5_10']
-        self['sleep_turbulence']=(self['sleep_turbulence_transfer'])
-        self.loc[self.sleep_turbulence_transfer<=0,'sleep_turbulence']=0
-        self.loc[self.sleep_turbulence_transfer.between(1,9),'sleep_turbulence']=1
-        self.loc[self.sleep_turbulence_transfer.between(10,18),'sleep_turbulence']=2
-        self.loc[self.sleep_turbulence_transfer>=19,'sleep_turbulence']=3
-        #使用睡眠药物
-        self['use_sleep_medication']=self['PSQI7']
-        # 白天功能紊乱
-        self['daytime_dysfunction_transfer']=self['PSQI8']+self['PSQI9']
-        self['daytime_dysfunction']=(self['daytime_dysfunction_transfer'])
-        self.loc[self.daytime_dysfunction_transfer<=0,'daytime_dysfunction']=0
-        self.loc[self.daytime_dysfunction_transfer.between(1,2),'daytime_dysfunction']=1
-        self.loc[self.daytime_dysfunction_transfer.between(3,4),'daytime_dysfunction']=2
-        self.loc[self.daytime_dysfunction_transfer>=5,'daytime_dysfunction']=3
-        #计算总分
-        self['PSQI']=self['subjective_sleep_quality']+self['sleep_latency']+self['sleep_persistence']+self['sleep_efficiency']+self['sleep_turbulence']+self['use_sleep_medication']+self['daytime_dysfunction']
-        return self['PSQI']
+        scores = _psqi_scores(self)
+        return _result(self, scores, 'PSQI', attach)
     
-    def get_PSQI_level_numeric(self):
+    def get_PSQI_level_numeric(self, attach=False):
         """计算数值型睡眠质量【1 = Good；2 = Fair；3 = Limited；4 = Poor】"""
-        #主观睡眠质量
-        self['subjective_sleep_quality']=5-self['PSQI6']
-        #睡眠潜伏期
-        self['sleep_latency_transfer']=self['PSQI2']-1+self['PSQI5_1']-1
-        self['sleep_latency']=(self['sleep_latency_transfer'])
-        self.loc[self.sleep_latency_transfer<=0,'sleep_latency']=0
-        self.loc[self.sleep_latency_transfer.between(1,2),'sleep_latency']=1
-        self.loc[self.sleep_latency_transfer.between(3,4),'sleep_latency']=2
-        self.loc[self.sleep_latency_transfer.between(5,6),'sleep_latency']=3
-        # 睡眠持续性
-        self['sleep_persistence_transfer']=(self['PSQI4_1']*60+self['PSQI4_2'])/60
-        self['sleep_persistence']=(self['sleep_persistence_transfer'])
-        self.loc[self.sleep_persistence_transfer>7,'sleep_persistence']=0
-        self.loc[self.sleep_persistence_transfer.between(6,7),'sleep_persistence']=1
-        self.loc[self.sleep_persistence_transfer.between(5,6),'sleep_persistence']=2
-        self.loc[self.sleep_persistence_transfer<5,'sleep_persistence']=3
-        # 睡眠效率
-        self['stay_in_bed']=(12*60+self['PSQI3_1']*60+self['PSQI3_2'])-(self['PSQI1_1']*60+self['PSQI1_2'])
-        self['sleep_in_bed']=self['PSQI4_1']*60+self['PSQI4_2']
-        self['sleep_efficiency_transfer']=round(self['sleep_in_bed']/self['stay_in_bed'],2)
-        self['sleep_efficiency']=(self['sleep_efficiency_transfer'])
-        self.loc[self.sleep_efficiency_transfer>=0.85,'sleep_efficiency']=0
-        self.loc[self.sleep_efficiency_transfer.between(0.75,0.84),'sleep_efficiency']=1
-        self.loc[self.sleep_efficiency_transfer.between(0.65,0.74),'sleep_efficiency']=2
-        self.loc[self.sleep_efficiency_transfer<=0.64,'sleep_efficiency']=3
-        #睡眠紊乱
-        self['sleep_turbulence_transfer']=self['PSQI5_2']+self['PSQI5_3']+self['PSQI5_4']+self['PSQI5_5']+self['PSQI5_6']+self['PSQI5_7']+self['PSQI5_8']+self['PSQI5_9']+self['PSQI5_10']
-        self['sleep_turbulence']=(self['sleep_turbulence_transfer'])
-        self.loc[self.sleep_turbulence_transfer<=0,'sleep_turbulence']=0
-        self.loc[self.sleep_turbulence_transfer.between(1,9),'sleep_turbulence']=1
-        self.loc[self.sleep_turbulence_transfer.between(10,18),'sleep_turbulence']=2
-        self.loc[self.sleep_turbulence_transfer>=19,'sleep_turbulence']=3
-        #使用睡眠药物
-        self['use_sleep_medication']=self['PSQI7']
-        # 白天功能紊乱
-        self['daytime_dysfunction_transfer']=self['PSQI8']+self['PSQI9']
-        self['daytime_dysfunction']=(self['daytime_dysfunction_transfer'])
-        self.loc[self.daytime_dysfunction_transfer<=0,'daytime_dysfunction']=0
-        self.loc[self.daytime_dysfunction_transfer.between(1,2),'daytime_dysfunction']=1
-        self.loc[self.daytime_dysfunction_transfer.between(3,4),'daytime_dysfunction']=2
-        self.loc[self.daytime_dysfunction_transfer>=5,'daytime_dysfunction']=3
-        #计算总分
-        self['PSQI']=self['subjective_sleep_quality']+self['sleep_latency']+self['sleep_persistence']+self['sleep_efficiency']+self['sleep_turbulence']+self['use_sleep_medication']+self['daytime_dysfunction']
+        data = _psqi_scores(self).copy()
         #分层
-        self['sleep_quality_level']=(self['PSQI'])
-        self.loc[self.PSQI.between(0,5),'sleep_quality_level']=1     # 睡眠质量好
-        self.loc[self.PSQI.between(6,10),'sleep_quality_level']=2    # 睡眠质量还行
-        self.loc[self.PSQI.between(11,15),'sleep_quality_level']=3   # 睡眠质量一般
-        self.loc[self.PSQI.between(16,21),'sleep_quality_level']=4   # 睡眠质量差
-        return self['sleep_quality_level']
+        # 0~5 睡眠质量好；6~10 还行；11~15 一般；16~21 差
+        data['sleep_quality_level']=PSQI_LEVEL.numeric(data['PSQI'])
+        return _result(self, data, 'sleep_quality_level', attach)
     
     
-    def get_PSQI_level_text(self):
+    def get_PSQI_level_text(self, attach=False):
         """计算文本型型睡眠质量"""
-        #主观睡眠质量
-        self['subjective_sleep_quality']=5-self['PSQI6']
-        #睡眠潜伏期
-        self['sleep_latency_transfer']=self['PSQI2']-1+self['PSQI5_1']-1
-        self['sleep_latency']=(self['sleep_latency_transfer'])
-        self.loc[self.sleep_latency_transfer<=0,'sleep_latency']=0
-        self.loc[self.sleep_latency_transfer.between(1,2),'sleep_latency']=1
-        self.loc[self.sleep_latency_transfer.between(3,4),'sleep_latency']=2
-        self.loc[self.sleep_latency_transfer.between(5,6),'sleep_latency']=3
-        # 睡眠持续性
-        self['sleep_persistence_transfer']=(self['PSQI4_1']*60+self['PSQI4_2'])/60
-        self['sleep_persistence']=(self['sleep_persistence_transfer'])
-        self.loc[self.sleep_persistence_transfer>7,'sleep_persistence']=0
-        self.loc[self.sleep_persistence_transfer.between(6,7),'sleep_persistence']=1
-        self.loc[self.sleep_persistence_transfer.between(5,6),'sleep_persistence']=2
-        self.loc[self.sleep_persistence_transfer<5,'sleep_persistence']=3
-        # 睡眠效率
-        self['stay_in_bed']=(12*60+self['PSQI3_1']*60+self['PSQI3_2'])-(self['PSQI1_1']*60+self['PSQI1_2'])
-        self['sleep_in_bed']=self['PSQI4_1']*60+self['PSQI4_2']
-        self['sleep_efficiency_transfer']=round(self['sleep_in_bed']/self['stay_in_bed'],2)
-        self['sleep_efficiency']=(self['sleep_efficiency_transfer'])
-        self.loc[self.sleep_efficiency_transfer>=0.85,'sleep_efficiency']=0
-        self.loc[self.sleep_efficiency_transfer.between(0.75,0.84),'sleep_efficiency']=1
-        self.loc[self.sleep_efficiency_transfer.between(0.65,0.74),'sleep_efficiency']=2
-        self.loc[self.sleep_efficiency_transfer<=0.64,'sleep_efficiency']=3
-        #睡眠紊乱
-        self['sleep_turbulence_transfer']=self['PSQI5_2']+self['PSQI5_3']+self['PSQI5_4']+self['PSQI5_5']+self['PSQI5_6']+self['PSQI5_7']+self['PSQI5_8']+self['PSQI5_9']+self['PSQI5_10']
-        self['sleep_turbulence']=(self['sleep_turbulence_transfer'])
-        self.loc[self.sleep_turbulence_transfer<=0,'sleep_turbulence']=0
-        self.loc[self.sleep_turbulence_transfer.between(1,9),'sleep_turbulence']=1
-        self.loc[self.sleep_turbulence_transfer.between(10,18),'sleep_turbulence']=2
-        self.loc[self.sleep_turbulence_transfer>=19,'sleep_turbulence']=3
-        #使用睡眠药物
-        self['use_sleep_medication']=self['PSQI7']
-        # 白天功能紊乱
-        self['daytime_dysfunction_transfer']=self['PSQI8']+self['PSQI9']
-        self['daytime_dysfunction']=(self['daytime_dysfunction_transfer'])
-        self.loc[self.daytime_dysfunction_transfer<=0,'daytime_dysfunction']=0
-        self.loc[self.daytime_dysfunction_transfer.between(1,2),'daytime_dysfunction']=1
-        self.loc[self.daytime_dysfunction_transfer.between(3,4),'daytime_dysfunction']=2
-        self.loc[self.daytime_dysfunction_transfer>=5,'daytime_dysfunction']=3
-        #计算总分
-        self['PSQI']=self['subjective_sleep_quality']+self['sleep_latency']+self['sleep_persistence']+self['sleep_efficiency']+self['sleep_turbulence']+self['use_sleep_medication']+self['daytime_dysfunction']
+        data = _psqi_scores(self).copy()
         #分层
-        self['sleep_quality_level']=(self['PSQI'])
-        self.loc[self.PSQI.between(0,5),'sleep_quality_level']= 'Good'      # 睡眠质量好
-        self.loc[self.PSQI.between(6,10),'sleep_quality_level']= 'Fair'     # 睡眠质量还行
-        self.loc[self.PSQI.between(11,15),'sleep_quality_level']= 'Limited' # 睡眠质量一般
-        self.loc[self.PSQI.between(16,21),'sleep_quality_level']= 'Poor'    # 睡眠质量差
-        return self['sleep_quality_level']
+        data['sleep_quality_level']=PSQI_LEVEL.text(data['PSQI'])
+        return _result(self, data, 'sleep_quality_level', attach)
         
     ########## 三、个人特质 ##########
-    def get_Mini_K(self):
-        self['life_strategy']=(self['mini1']+self['mini2']+self['mini3']+self['mini4']+self['mini5']+self['mini6']+self['mini7']++self['mini8']+self['mini9']+self['mini10']+self['mini11']+self['mini12']+self['mini13']+self['mini14']+self['mini15']+self['mini16']+self['mini17']+self['mini18']+self['mini19'])/19
-        return self['life_strategy']
+    def get_Mini_K(self, attach=False):
+        scores = score_scale(self, 'Mini_K')
+        return _result(self, scores[['life_strategy']], 'life_strategy', attach)
     
     
-    def get_LPQ_subscales(self):
+    def get_LPQ_subscales(self, attach=False):
         """计算LPQ量表分量表分数"""
-        import pandas as pd
         # 维度
-        self['event_load'] = self['LPQ1']+self['LPQ2']+self['LPQ3']+self['LPQ4']+self['LPQ5']+self['LPQ6']+self['LPQ7']+self['LPQ8']+self['LPQ9']+self['LPQ10']
-        self['individual_vulnerability'] = self['LPQ11']+self['LPQ12']+self['LPQ13']+self['LPQ14']+self['LPQ15']+self['LPQ16']+self['LPQ17']+self['LPQ18']+self['LPQ19']+self['LPQ20']+self['LPQ21']+self['LPQ22']
-        data = pd.DataFrame(list(zip(self['event_load'],self['individual_load'])))
-        data.columns = ['event_load','individual_load']
-        return data
+        scores = score_scale(self, 'LPQ')
+        columns = SCALES['LPQ'].subscale_names
+        return _result(self, scores[columns], columns, attach)
         
-    def get_LPQ_type_numeric(self):
+    def get_LPQ_type_numeric(self, attach=False):
         """计算LPQ量表分型【1 = ; 2 = ; 3 = ; 4 = 】"""
         # 维度
-        self['event_load'] = self['LPQ1']+self['LPQ2']+self['LPQ3']+self['LPQ4']+self['LPQ5']+self['LPQ6']+self['LPQ7']+self['LPQ8']+self['LPQ9']+self['LPQ10']
-        self['individual_vulnerability'] = self['LPQ11']+self['LPQ12']+self['LPQ13']+self['LPQ14']+self['LPQ15']+self['LPQ16']+self['LPQ17']+self['LPQ18']+self['LPQ19']+self['LPQ20']+self['LPQ21']+self['LPQ22']
+        data = score_scale(self, 'LPQ')[['event_load','individual_vulnerability']].copy()
         # 分型
-        self['LPQ_type']=(self['individual_vulnerability'])
-        self.loc[(self['individual_vulnerability'].between(12,36))&(self['event_load'].between(10,30)),'LPQ_type']=1 # 低压力
-        self.loc[(self['individual_vulnerability'].between(37,60))&(self['event_load'].between(10,30)),'LPQ_type']=2 # 易感性
-        self.loc[(self['individual_vulnerability'].between(12,36))&(self['event_load'].between(31,50)),'LPQ_type']=3 # 冲击性
-        self.loc[(self['individual_vulnerability'].between(37,60))&(self['event_load'].between(31,50)),'LPQ_type']=4 # 高压力
-        return self['individual_vulnerability']
+        data['LPQ_type']=(data['individual_vulnerability'])
+        data.loc[(data['individual_vulnerability'].between(12,36))&(data['event_load'].between(10,30)),'LPQ_type']=1 # 低压力
+        data.loc[(data['individual_vulnerability'].between(37,60))&(data['event_load'].between(10,30)),'LPQ_type']=2 # 易感性
+        data.loc[(data['individual_vulnerability'].between(12,36))&(data['event_load'].between(31,50)),'LPQ_type']=3 # 冲击性
+        data.loc[(data['individual_vulnerability'].between(37,60))&(data['event_load'].between(31,50)),'LPQ_type']=4 # 高压力
+        return _result(self, data, 'individual_vulnerability', attach)
     
-    def get_LPQ_type_text(self):
+    def get_LPQ_type_text(self, attach=False):
         """计算LPQ量表分型"""
         # 维度
-        self['event_load'] = self['LPQ1']+self['LPQ2']+self['LPQ3']+self['LPQ4']+self['LPQ5']+self['LPQ6']+self['LPQ7']+self['LPQ8']+self['LPQ9']+self['LPQ10']
-        self['individual_vulnerability'] = self['LPQ11']+self['LPQ12']+self['LPQ13']+self['LPQ14']+self['LPQ15']+self['LPQ16']+self['LPQ17']+self['LPQ18']+self['LPQ19']+self['LPQ20']+self['LPQ21']+self['LPQ22']
+        data = score_scale(self, 'LPQ')[['event_load','individual_vulnerability']].copy()
         # 分型
-        self['LPQ_type']=(self['individual_vulnerability'])
-        self.loc[(self['individual_vulnerability'].between(12,36))&(self['event_load'].between(10,30)),'LPQ_type']=1 # 低压力
-        self.loc[(self['individual_vulnerability'].between(37,60))&(self['event_load'].between(10,30)),'LPQ_type']=2 # 易感性
-        self.loc[(self['individual_vulnerability'].between(12,36))&(self['event_load'].between(31,50)),'LPQ_type']=3 # 冲击性
-        self.loc[(self['individual_vulnerability'].between(37,60))&(self['event_load'].between(31,50)),'LPQ_type']=4 # 高压力
-        return self['individual_vulnerability']
+        data['LPQ_type']=(data['individual_vulnerability'])
+        data.loc[(data['individual_vulnerability'].between(12,36))&(data['event_load'].between(10,30)),'LPQ_type']=1 # 低压力
+        data.loc[(data['individual_vulnerability'].between(37,60))&(data['event_load'].between(10,30)),'LPQ_type']=2 # 易感性
+        data.loc[(data['individual_vulnerability'].between(12,36))&(data['event_load'].between(31,50)),'LPQ_type']=3 # 冲击性
+        data.loc[(data['individual_vulnerability'].between(37,60))&(data['event_load'].between(31,50)),'LPQ_type']=4 # 高压力
+        return _result(self, data, 'individual_vulnerability', attach)
     
-    def get_BAS_subscales(self):
-        import pandas as pd
-        self['BASR']=self['BAS4']+self['BAS5']+self['BAS7']+self['BAS14']+self['BAS18']+self['BAS23']
-        self['BASD']=self['BAS3']+self['BAS9']+self['BAS12']+self['BAS21']
-        self['BASF']=self['BAS10']+self['BAS15']+self['BAS16']+self['BAS20']
-        self['BIS']=self['BAS8']+self['BAS13']+self['BAS16']+self['BAS19']+self['BAS24']
-        data = pd.DataFrame(list(zip(self['BASR'],self['BASD'],self['BASF'],self['BIS'])))
-        data.columns = ['BASR','BASD','BASF','BIS']
-        return data
+    def get_BAS_subscales(self, attach=False):
+        scores = score_scale(self, 'BIS_BAS')
+        columns = SCALES['BIS_BAS'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_TAS_subscales(self):
-        import pandas as pd
+    def get_TAS_subscales(self, attach=False):
         #计算TAS维度
-        self['difficult_to_recognize_feeling']=self['TAS1']+self['TAS3']+self['TAS6']+self['TAS7']+self['TAS9']+self['TAS13']+self['TAS14']
-        self['difficult_to_describe_feeling']=self['TAS2']+self['TAS4']+self['TAS11']+self['TAS12']+self['TAS17']
-        self['extraversion_thought']=self['TAS5']+self['TAS8']+self['TAS10']+self['TAS15']+self['TAS16']+self['TAS18']+self['TAS19']+self['TAS20']
-        data = pd.DataFrame(list(zip(self['difficult_to_recognize_feeling'],self['difficult_to_describe_feeling'],self['extraversion_thought'])))
-        data.columns = ['difficult_to_recognize_feeling','difficult_to_describe_feeling','extraversion_thought']
-        return data
+        scores = score_scale(self, 'TAS')
+        columns = SCALES['TAS'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_TAS(self):
+    def get_TAS(self, attach=False):
         
-        #计算TAS维度
-        self['difficult_to_recognize_feeling']=self['TAS1']+self['TAS3']+self['TAS6']+self['TAS7']+self['TAS9']+self['TAS13']+self['TAS14']
-        self['difficult_to_describe_feeling']=self['TAS2']+self['TAS4']+self['TAS11']+self['TAS12']+self['TAS17']
-        self['extraversion_thought']=self['TAS5']+self['TAS8']+self['TAS10']+self['TAS15']+self['TAS16']+self['TAS18']+self['TAS19']+self['TAS20']
-        #计算TAS总分
-        self['TAS']=self['difficult_to_recognize_feeling']+self['difficult_to_describe_feeling']+self['extraversion_thought']
-        return self['TAS']
+        #计算TAS维度与总分
+        scores = score_scale(self, 'TAS')
+        return _result(self, scores, 'TAS', attach)
     
-    def get_ERQ_subscales(self):
+    def get_ERQ_subscales(self, attach=False):
         """计算ERQ分数"""
-        import pandas as pd
-        self['cognitive_reappraisal']=self['ERQ1']+self['ERQ3']+self['ERQ4']+self['ERQ5']+self['ERQ7']+self['ERQ8']
-        self['expression_inhibition']=self['ERQ2']+self['ERQ4']+self['ERQ6']+self['ERQ9']
-        data = pd.DataFrame(list(zip(self['cognitive_reappraisal'],self['expression_inhibition'])))
-        data.columns = ['cognitive_reappraisal','expression_inhibition']
-        return data
+        scores = score_scale(self, 'ERQ')
+        columns = SCALES['ERQ'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_BPAQ_subscales(self):
+    def get_BPAQ_subscales(self, attach=False):
         """使用Buss_Perry中文22题修订版，《中文版大学生Buss-Perry攻击性量表的修订与信效度分析，心理卫生评估，2013》"""
-        import pandas as pd
-        self['hostility'] = self['BPAQ18']+self['BPAQ15']+self['BPAQ4']+self['BPAQ21']+self['BPAQ11']+self['BPAQ16']+self['BPAQ7']+self['BPAQ19']
-        self['physical_aggression'] = self['BPAQ17']+self['BPAQ13']+self['BPAQ12']+self['BPAQ22']+self['BPAQ9']
-        self['impulsivity'] = self['BPAQ10']+self['BPAQ6']+self['BPAQ14']+self['BPAQ8']+self['BPAQ2']+self['BPAQ3']
-        self['anger'] = self['BPAQ1']+self['BPAQ20']+self['BPAQ5']
-        data = pd.DataFrame(list(zip(self['hostility'],self['physical_aggression'],self['impulsivity'],self['anger'])))
-        data.columns = ['hostility','physical_aggression','impulsivity','anger']
-        return data
+        scores = score_scale(self, 'BPAQ')
+        columns = SCALES['BPAQ'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_EQ(self):
+    def get_EQ(self, attach=False):
         """计算共情量表得分
         参考文献：
         [1] The Empathy Quotient: An Investigation of Adults with Asperger Syndrome or High Functioning Autism, and Normal Sex Differences
         [2] Measuring empathy: reliability and validity of the Empathy Quotient
         [3] https://www.autismresearchcentre.com/tests/empathy-quotient-eq-for-adults/"""
-        # 正向计分
-        def forward(a):
-            if a >= 3:
-                b = a-2
-            else:
-                b = 0
-            return b
-        def reverse(a):
-            if a >= 3:
-                b = 0
-            elif a == 2:
-                b = 1
-            else:
-                b = 2
-            return b
-        
-        self['empathy_forward'] = self['EQ1'].apply(forward)+self['EQ6'].apply(forward)+self['EQ19'].apply(forward)+self['EQ22'].apply(forward)+self['EQ25'].apply(forward)+self['EQ26'].apply(forward)+self['EQ35'].apply(forward)+self['EQ36'].apply(forward)+self['EQ37'].apply(forward)+self['EQ38'].apply(forward)+self['EQ41'].apply(forward)+self['EQ42'].apply(forward)+self['EQ43'].apply(forward)+self['EQ44'].apply(forward)+self['EQ52'].apply(forward)+self['EQ54'].apply(forward)+self['EQ55'].apply(forward)+self['EQ57'].apply(forward)+self['EQ58'].apply(forward)+self['EQ59'].apply(forward)+self['EQ60'].apply(forward)        
-        self['empathy_reverse'] = self['EQ4'].apply(reverse)+self['EQ8'].apply(reverse)+self['EQ10'].apply(reverse)+self['EQ11'].apply(reverse)+self['EQ12'].apply(reverse)+self['EQ14'].apply(reverse)+self['EQ15'].apply(reverse)+self['EQ18'].apply(reverse)+self['EQ21'].apply(reverse)+self['EQ27'].apply(reverse)+self['EQ28'].apply(reverse)+self['EQ29'].apply(reverse)+self['EQ32'].apply(reverse)+self['EQ34'].apply(reverse)+self['EQ39'].apply(reverse)+self['EQ46'].apply(reverse)+self['EQ48'].apply(reverse)+self['EQ49'].apply(reverse)+self['EQ50'].apply(reverse)
-        self['empathy'] = self['empathy_forward'] + self ['empathy_reverse']
-        return self['empathy']
+        scores = score_scale(self, 'EQ')
+        return _result(self, scores, 'empathy', attach)
     
     #def get_EQ_subscales(self):
 
     ########## 四、社会环境 ##########
-    def get_CTQ_subscales(self):
-        import pandas as pd
-        self['emotional_abuse']=self['CTQ3']+self['CTQ8']+self['CTQ14']+self['CTQ18']+self['CTQ25']
-        self['physical_abuse']=self['CTQ9']+self['CTQ11']+self['CTQ12']+self['CTQ15']+self['CTQ17']
-        self['sexual_abuse']=self['CTQ20']+self['CTQ21']+self['CTQ23']+self['CTQ24']+self['CTQ27']
-        self['emotional_neglect']=(6-self['CTQ5'])+(6-self['CTQ7'])+(6-self['CTQ12'])+(6-self['CTQ15'])+(6-self['CTQ17'])
-        self['physical_neglect']=self['CTQ1']+6-self['CTQ2']+self['CTQ4']+self['CTQ6']+6-self['CTQ26']
-        data = pd.DataFrame(list(zip(self['emotional_abuse'],self['physical_abuse'],self['sexual_abuse'],self['emotional_neglect'],self['physical_neglect'])))
-        data.columns = ['emotional_abuse','physical_abuse','sexual_abuse','emotional_neglect','physical_neglect']
-        return data
+    def get_CTQ_subscales(self, attach=False):
+        scores = score_scale(self, 'CTQ')
+        columns = SCALES['CTQ'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_CTQ(self):
-        self['emotional_abuse']=self['CTQ3']+self['CTQ8']+self['CTQ14']+self['CTQ18']+self['CTQ25']
-        self['physical_abuse']=self['CTQ9']+self['CTQ11']+self['CTQ12']+self['CTQ15']+self['CTQ17']
-        seldeff['sexual_abuse']=self['CTQ20']+self['CTQ21']+self['CTQ23']+self['CTQ24']+self['CTQ27']
-        self['emotional_neglect']=(6-self['CTQ5'])+(6-self['CTQ7'])+(6-self['CTQ12'])+(6-self['CTQ15'])+(6-self['CTQ17'])
-        self['physical_neglect']=self['CTQ1']+6-self['CTQ2']+self['CTQ4']+self['CTQ6']+6-self['CTQ26']
-        self['CTQ']=self['emotional_abuse']+self['physical_abuse']+self['sexual_abuse']+self['emotional_neglect']+self['physical_neglect']
-        return self['CTQ']
+    def get_CTQ(self, attach=False):
+        scores = score_scale(self, 'CTQ')
+        return _result(self, scores, 'CTQ', attach)
     
-    def get_CTQ_whether_numeric(self):
+    def get_CTQ_whether_numeric(self, attach=False):
         """判断各方面的童年虐待是否存在【1 = 构成童年虐待；0 = 不构成童年虐待】"""
-        self['whether_emotional_abuse']=(self['emotional_abuse'])
-        self.loc[self.emotional_abuse>=13,'whether_emotional_abuse']= 1
-        self.loc[self.emotional_abuse<13,'whether_emotional_abuse']=0
-        self['whether_physical_abuse']=(self['physical_abuse'])
-        self.loc[self.physical_abuse>=10,'whether_physical_abuse']= 1
-        self.loc[self.physical_abuse<10,'whether_physical_abuse']= 0
-        self['whether_sexual_abuse']=(self['sexual_abuse'])
-        self.loc[self.sexual_abuse>=8,'whether_sexual_abuse']=1
-        self.loc[self.sexual_abuse<8,'whether_sexual_abuse']=0 
-        self['whether_emotional_neglect']=(self['emotional_neglect'])
-        self.loc[self.emotional_neglect>=15,'whether_emotional_neglect']=1
-        self.loc[self.emotional_neglect<15,'whether_emotional_neglect']=0
-        self['whether_physical_neglect']=(self['physical_neglect'])
-        self.loc[self.physical_neglect>=15,'whether_physical_neglect']=1
-        self.loc[self.physical_neglect<15,'whether_physical_neglect']=0
-        return self['whether_emotional_abuse'],self['whether_physical_abuse','whether_sexual_abuse','whether_emotional_neglect','whether_physical_neglect']
+        # 情感虐待>=13，躯体虐待>=10，性虐待>=8，情感忽视>=15，躯体忽视>=15
+        scores = score_scale(self, 'CTQ')
+        data = pd.DataFrame(dict((cutoff.name, cutoff.numeric(scores[cutoff.source])) for cutoff in SCALES['CTQ'].cutoffs), index=self.index)
+        return _result(self, data, ['whether_emotional_abuse','whether_physical_abuse','whether_sexual_abuse','whether_emotional_neglect','whether_physical_neglect'], attach)
 
     
     
@@ -546,698 +1754,118 @@ class PsyScales:
         #self['SSQ_2']=self['SSQ2']+self['SSQ4']+self['SSQ6']+self['SSQ8']+self['SSQ10']+self['SSQ12']
         
         
-    def get_SSQ(self):
+    def get_SSQ(self, attach=False):
         """计算社会支持总分"""
-        self['SSQ_1']=self['SSQ1']+self['SSQ3']+self['SSQ5']+self['SSQ7']+self['SSQ9']+self['SSQ11']
-        self['SSQ_2']=self['SSQ2']+self['SSQ4']+self['SSQ6']+self['SSQ8']+self['SSQ10']+self['SSQ12']
-        self['SSQ']=self['SSQ_1']+self['SSQ_2']
-        return self['SSQ']
+        scores = score_scale(self, 'SSQ')
+        return _result(self, scores, 'SSQ', attach)
 
     ######### 五、症状评估 ##########
         
-    def get_AUDIT(self):
-        self['AUDIT9_transfer']=(self['AUDIT9'])
-        self['AUDIT10_transfer']=(self['AUDIT10'])
-        self.loc[self.AUDIT9<=1,'AUDIT9_transfer']=0
-        self.loc[self.AUDIT10<=1,'AUDIT10_transfer']=0
-        self.loc[self.AUDIT9>=4,'AUDIT9_transfer']=3
-        self.loc[self.AUDIT10>=4,'AUDIT10_transfer']=3
-        self['AUDIT']=self['AUDIT1']+self['AUDIT2']+self['AUDIT3']+self['AUDIT4']+self['AUDIT5']+self['AUDIT6']+self['AUDIT7']+self['AUDIT8']+self['AUDIT9_transfer']+self['AUDIT10_transfer']-8
-        return self['AUDIT']
+    def get_AUDIT(self, attach=False):
+        scores = score_scale(self, 'AUDIT')
+        return _result(self, scores, 'AUDIT', attach)
     
-    def get_FTND(self):
-        self['FTND']=self['FTND1']+self['FTND2']+self['FTND3']+self['FTND4']+self['FTND5']+self['FTND6']-6
-        return self['FTND']
+    def get_FTND(self, attach=False):
+        scores = score_scale(self, 'FTND')
+        return _result(self, scores[['FTND']], 'FTND', attach)
     
-    def get_FTND_whether_numeric(self):
-        self['FTND_whether']=(self['FTND'])
-        self.loc[self.FTND>=6,'FTND_whether']=1
-        self.loc[self.FTND<6,'FTND_whether']=0
-        return self['FTND_whether']
+    def get_FTND_whether_numeric(self, attach=False):
+        data = score_scale(self, 'FTND')[['FTND']].copy()
+        data['FTND_whether']=SCALES['FTND'].cutoff('FTND_whether').numeric(data['FTND'])
+        return _result(self, data, 'FTND_whether', attach)
     
     
-    def get_EDI_subscales(self):
-        import pandas as pd
+    def get_EDI_subscales(self, attach=False):
         """计算EDI得分，来自陈珏老师组"""
-        def transfer(a):
-            if a <= 2:
-                b=0
-            else:
-                b=a-2
-            return b
-        self['drive_for_thinness']=((self['EDI1']-1).apply(transfer)+(self['EDI7']-1).apply(transfer)+(self['EDI11']-1).apply(transfer)+(self['EDI16']-1).apply(transfer)+(self['EDI25']-1).apply(transfer)+(self['EDI32']-1).apply(transfer)+(self['EDI49']-1).apply(transfer))/7
-        self['bulimia']=((self['EDI4']-1).apply(transfer)+(self['EDI5']-1).apply(transfer)+(self['EDI28']-1).apply(transfer)+(self['EDI38']-1).apply(transfer)+(self['EDI46']-1).apply(transfer)+(self['EDI53']-1).apply(transfer)+(self['EDI61']-1).apply(transfer))/7
-        self['body_dissatisfaction']=((self['EDI2']-1).apply(transfer)+(self['EDI9']-1).apply(transfer)+(3-(self['EDI12']-1).apply(transfer))+3-((self['EDI19']-1).apply(transfer))+abs(3-(self['EDI31']-1).apply(transfer))+(self['EDI45']-1).apply(transfer).apply(transfer)+abs(3-(self['EDI55']-1)).apply(transfer)+(self['EDI59']-1).apply(transfer)+abs(3-(self['EDI62']-1).apply(transfer)))/9
-        self['ineffectiveness']=((self['EDI10']-1).apply(transfer)+(self['EDI18']-1).apply(transfer)+abs(3-(self['EDI20']-1).apply(transfer))+(self['EDI24']-1).apply(transfer)+(self['EDI27']-1).apply(transfer)+abs(3-(self['EDI37']-1).apply(transfer))+(self['EDI41']-1+(self['EDI42']-1).apply(transfer)+abs(3-(self['EDI50']-1).apply(transfer))+(self['EDI56']-1).apply(transfer)).apply(transfer))/10
-        self['perfectionism']=((self['EDI13']-1).apply(transfer)+(self['EDI29']-1).apply(transfer)+(self['EDI36']-1).apply(transfer)+(self['EDI43']-1).apply(transfer)+(self['EDI52']-1).apply(transfer)+(self['EDI63']-1).apply(transfer))/6
-        self['interpersonal_distrust']=(abs(3-(self['EDI15']-1).apply(transfer))+abs(3-(self['EDI17']-1).apply(transfer))+abs(3-(self['EDI23']-1).apply(transfer))+abs(3-(self['EDI30']-1).apply(transfer))+(self['EDI34']-1).apply(transfer)+(self['EDI54']-1).apply(transfer)+abs(3-(self['EDI57']-1).apply(transfer)))/7
-        self['interoceptive_awareness']=((self['EDI8']-1).apply(transfer)+(self['EDI21']-1).apply(transfer)+abs(3-(self['EDI26']-1).apply(transfer))+(self['EDI33']-1).apply(transfer)+(self['EDI40']-1).apply(transfer)+(self['EDI44']-1).apply(transfer)+(self['EDI47']-1).apply(transfer)+(self['EDI51']-1).apply(transfer)+(self['EDI60']-1).apply(transfer)+(self['EDI64']-1).apply(transfer))/10
-        self['maturity_fears']=((self['EDI3']-1).apply(transfer)+(self['EDI6']-1).apply(transfer)+(self['EDI14']-1).apply(transfer)+abs(3-(self['EDI22']-1).apply(transfer))+(self['EDI35']-1).apply(transfer)+abs(3-(self['EDI39']-1).apply(transfer))+(self['EDI48']-1).apply(transfer)+abs(3-(self['EDI58']-1).apply(transfer)))/8
-        self['asceticism_subscale']=((self['EDI66']-1).apply(transfer)+(self['EDI68']-1).apply(transfer)+abs(3-(self['EDI71']-1).apply(transfer))+(self['EDI75']-1).apply(transfer)+(self['EDI78']-1).apply(transfer)+(self['EDI82']-1).apply(transfer)+(self['EDI86']-1+(self['EDI88']-1).apply(transfer)).apply(transfer))/8
-        self['impulse_regulation_subscale']=((self['EDI65']-1).apply(transfer)+(self['EDI67']-1).apply(transfer)+(self['EDI70']-1).apply(transfer)+(self['EDI72']-1).apply(transfer)+(self['EDI74']-1).apply(transfer)+(self['EDI77']-1).apply(transfer)+(self['EDI79']-1+(self['EDI81']-1).apply(transfer)+(self['EDI83']-1).apply(transfer)+(self['EDI85']-1).apply(transfer)+(self['EDI90']-1).apply(transfer)).apply(transfer))/11
-        self['social_insecurity_subscale']=(abs(3-(self['EDI69']-1).apply(transfer))+abs(3-(self['EDI73']-1).apply(transfer))+abs(3-(self['EDI76']-1).apply(transfer))+abs(3-(self['EDI80']-1).apply(transfer))+(self['EDI84']-1).apply(transfer)+(self['EDI87']-1).apply(transfer)+abs(3-(self['EDI89']-1).apply(transfer))+abs(3-(self['EDI91']-1).apply(transfer)))/8
-        self['social_insecurity_subscale_false']=((self['EDI69']-1).apply(transfer)+(self['EDI73']-1).apply(transfer)+(self['EDI76']-1).apply(transfer)+(self['EDI80']-1).apply(transfer)+(self['EDI84']-1).apply(transfer)+(self['EDI87']-1).apply(transfer)+(self['EDI89']-1).apply(transfer))/7
-        data = pd.DataFrame(list(zip(self['drive_for_thinness'],self['bulimia'],self['body_dissatisfaction'],self['ineffectiveness'],self['perfectionism'],self['interpersonal_distrust'],self['interoceptive_awareness'],self['maturity_fears'],self['asceticism_subscale'],self['impulse_regulation_subscale'],self['social_insecurity_subscale'],self['social_insecurity_subscale_false'])))
-        data.columns = ['drive_for_thinness','bulimia','body_dissatisfaction','ineffectiveness','perfectionism','interpersonal_distrust','interoceptive_awareness','maturity_fears','asceticism_subscale','impulse_regulation_subscale','social_insecurity_subscale','social_insecurity_subscale_false']
-        return data
+        scores = score_scale(self, 'EDI')
+        columns = SCALES['EDI'].subscale_names
+        return _result(self, scores[columns], columns, attach)
     
-    def get_YFAS_subscales(self):
-        import pandas as pd
+    def get_YFAS_subscales(self, attach=False):
         """计算YFAS耶鲁食物成瘾量表各分量表分数"""
-        # 复制原始数值
-        self['YFAS_1']=(self['YFAS1'])
-        self['YFAS_2']=(self['YFAS2'])
-        self['YFAS_3']=(self['YFAS3'])
-        self['YFAS_4']=(self['YFAS4'])
-        self['YFAS_5']=(self['YFAS5'])
-        self['YFAS_6']=(self['YFAS6'])
-        self['YFAS_7']=(self['YFAS7'])
-        self['YFAS_8']=(self['YFAS8'])
-        self['YFAS_9']=(self['YFAS9'])
-        self['YFAS_10']=(self['YFAS10'])
-        self['YFAS_11']=(self['YFAS11'])
-        self['YFAS_12']=(self['YFAS12'])
-        self['YFAS_13']=(self['YFAS13'])
-        self['YFAS_14']=(self['YFAS14'])
-        self['YFAS_15']=(self['YFAS15'])
-        self['YFAS_16']=(self['YFAS16'])
-        self['YFAS_17']=(self['YFAS17'])
-        self['YFAS_18']=(self['YFAS18'])
-        self['YFAS_19']=(self['YFAS19'])
-        self['YFAS_20']=(self['YFAS20'])
-        self['YFAS_21']=(self['YFAS21'])
-        self['YFAS_22']=(self['YFAS22'])
-        self['YFAS_23']=(self['YFAS23'])
-        self['YFAS_24']=(self['YFAS24'])
-        self['YFAS_25']=(self['YFAS25'])
-        self['YFAS_26']=(self['YFAS26'])
-        self['YFAS_27']=(self['YFAS27'])
-        self['YFAS_28']=(self['YFAS28'])
-        self['YFAS_29']=(self['YFAS29'])
-        self['YFAS_30']=(self['YFAS30'])
-        self['YFAS_31']=(self['YFAS31'])
-        self['YFAS_32']=(self['YFAS32'])
-        self['YFAS_33']=(self['YFAS33'])
-        self['YFAS_34']=(self['YFAS34'])
-        self['YFAS_35']=(self['YFAS35'])
-
-        #题目分数转换
-        #1)	Once a month: #9, #10, #19, #27, #33, #35
-        self.loc[(self['YFAS9'])>=2,'YFAS_9']=1
-        self.loc[(self['YFAS9'])<2,'YFAS_9']=0
-        self.loc[(self['YFAS10'])>=2,'YFAS_10']=1
-        self.loc[(self['YFAS10'])<2,'YFAS_10']=0
-        self.loc[(self['YFAS19'])>=2,'YFAS_19']=1
-        self.loc[(self['YFAS19'])<2,'YFAS_19']=0
-        self.loc[(self['YFAS27'])>=2,'YFAS_27']=1
-        self.loc[(self['YFAS27'])<2,'YFAS_27']=0
-        self.loc[(self['YFAS33'])>=2,'YFAS_33']=1
-        self.loc[(self['YFAS33'])<2,'YFAS_33']=0
-        self.loc[(self['YFAS35'])>=2,'YFAS_35']=1
-        self.loc[(self['YFAS35'])<2,'YFAS_35']=0
-        #2)	Two to three times a month: #8, #18, #20, #21, #34
-        self.loc[(self['YFAS8'])>=3,'YFAS_8']=1
-        self.loc[(self['YFAS8'])<3,'YFAS_8']=0
-        self.loc[(self['YFAS18'])>=3,'YFAS_18']=1
-        self.loc[(self['YFAS18'])<3,'YFAS_18']=0
-        self.loc[(self['YFAS20'])>=3,'YFAS_20']=1
-        self.loc[(self['YFAS20'])<3,'YFAS_20']=0
-        self.loc[(self['YFAS21'])>=3,'YFAS_21']=1
-        self.loc[(self['YFAS21'])<3,'YFAS_21']=0
-        self.loc[(self['YFAS34'])>=3,'YFAS_34']=1
-        self.loc[(self['YFAS34'])<3,'YFAS_34']=0
-        #3)	Once a week: #3, #11, #13, #14, #22, #28, #29
-        self.loc[(self['YFAS3'])>=4,'YFAS_3']=1
-        self.loc[(self['YFAS3'])<4,'YFAS_3']=0
-        self.loc[(self['YFAS11'])>=4,'YFAS_11']=1
-        self.loc[(self['YFAS11'])<4,'YFAS_11']=0
-        self.loc[(self['YFAS13'])>=4,'YFAS_13']=1
-        self.loc[(self['YFAS13'])<4,'YFAS_13']=0
-        self.loc[(self['YFAS14'])>=4,'YFAS_14']=1
-        self.loc[(self['YFAS14'])<4,'YFAS_14']=0
-        self.loc[(self['YFAS22'])>=4,'YFAS_22']=1
-        self.loc[(self['YFAS22'])<4,'YFAS_22']=0
-        self.loc[(self['YFAS28'])>=4,'YFAS_28']=1
-        self.loc[(self['YFAS28'])<4,'YFAS_28']=0
-        self.loc[(self['YFAS29'])>=4,'YFAS_29']=1
-        self.loc[(self['YFAS29'])<4,'YFAS_29']=0
-        #4)	Two to three time's a week: #5, #12, #16, #17, #23, #24, #26, #30, #31, #32
-        self.loc[(self['YFAS5'])>=5,'YFAS_5']=1
-        self.loc[(self['YFAS5'])<5,'YFAS_5']=0
-        self.loc[(self['YFAS12'])>=5,'YFAS_12']=1
-        self.loc[(self['YFAS12'])<5,'YFAS_12']=0
-        self.loc[(self['YFAS16'])>=5,'YFAS_16']=1
-        self.loc[(self['YFAS16'])<5,'YFAS_16']=0
-        self.loc[(self['YFAS17'])>=5,'YFAS_17']=1
-        self.loc[(self['YFAS17'])<5,'YFAS_17']=0
-        self.loc[(self['YFAS23'])>=5,'YFAS_23']=1
-        self.loc[(self['YFAS23'])<5,'YFAS_23']=0
-        self.loc[(self['YFAS24'])>=5,'YFAS_24']=1
-        self.loc[(self['YFAS24'])<5,'YFAS_24']=0
-        self.loc[(self['YFAS26'])>=5,'YFAS_26']=1
-        self.loc[(self['YFAS26'])<5,'YFAS_26']=0
-        self.loc[(self['YFAS30'])>=5,'YFAS_30']=1
-        self.loc[(self['YFAS30'])<5,'YFAS_30']=0
-        self.loc[(self['YFAS31'])>=5,'YFAS_31']=1
-        self.loc[(self['YFAS31'])<5,'YFAS_31']=0
-        self.loc[(self['YFAS32'])>=5,'YFAS_32']=1
-        self.loc[(self['YFAS32'])<5,'YFAS_32']=0
-        #5)	Four to six times a week: #1, #2, #4, #6, #7, #15, #25
-        self.loc[(self['YFAS1'])>=6,'YFAS_1']=1
-        self.loc[(self['YFAS1'])<6,'YFAS_1']=0
-        self.loc[(self['YFAS2'])>=6,'YFAS_2']=1
-        self.loc[(self['YFAS2'])<6,'YFAS_2']=0
-        self.loc[(self['YFAS4'])>=6,'YFAS_4']=1
-        self.loc[(self['YFAS4'])<6,'YFAS_4']=0
-        self.loc[(self['YFAS6'])>=6,'YFAS_6']=1
-        self.loc[(self['YFAS6'])<6,'YFAS_6']=0
-        self.loc[(self['YFAS7'])>=6,'YFAS_7']=1
-        self.loc[(self['YFAS7'])<6,'YFAS_7']=0
-        self.loc[(self['YFAS15'])>=6,'YFAS_15']=1
-        self.loc[(self['YFAS15'])<6,'YFAS_15']=0
-        self.loc[(self['YFAS25'])>=6,'YFAS_25']=1
-        self.loc[(self['YFAS25'])<6,'YFAS_25']=0
+        scores = _yfas_scores(self)
         #维度分
-        self['1_longer_than_intend'] = self['YFAS_1'] + self['YFAS_2'] + self['YFAS_3']
-        self['2_unsuccessful_attempts'] = self['YFAS_4'] + self['YFAS_25'] + self['YFAS_31'] + self['YFAS_32']
-        self['3_much_time'] = self['YFAS_5'] + self['YFAS_6'] + self['YFAS_7']
-        self['4_given_up'] = self['YFAS_8'] + self['YFAS_10'] + self['YFAS_18'] + self['YFAS_20']
-        self['5_despite_adverse_consequences'] = self['YFAS_22'] + self['YFAS_23']
-        self['6_tolerance'] = self['YFAS_24'] + self['YFAS_26']
-        self['7_withdraw_symptoms'] = self['YFAS_11'] + self['YFAS_12']+ self['YFAS_13']+ self['YFAS_14']+ self['YFAS_15']
-        self['8_despite_interpersonal_problems'] = self['YFAS_9'] + self['YFAS_21']+ self['YFAS_35']
-        self['9_failure_role'] = self['YFAS_19'] + self['YFAS_27']
-        self['10_failure_role'] = self['YFAS_28'] + self['YFAS_33']+ self['YFAS_34']
-        self['11_craving'] = self['YFAS_29'] + self['YFAS_30']
-        self['12_clinical_impairment'] = self['YFAS_16'] + self['YFAS_17']
-        data = pd.DataFrame(list(zip(self['1_longer_than_intend'],self['2_unsuccessful_attempts'],self['3_much_time'],self['4_given_up'],self['5_despite_adverse_consequences'],self['6_tolerance'],self['7_withdraw_symptoms'],self['8_despite_interpersonal_problems'],self['9_failure_role'],self['10_failure_role'],self['11_craving'],self['12_clinical_impairment'])))
-        data.columns = ['1_longer_than_intend','2_unsuccessful_attempts','3_much_time','4_given_up','5_despite_adverse_consequences','6_tolerance','7_withdraw_symptoms','8_despite_interpersonal_problems','9_failure_role','10_failure_role','11_craving','12_clinical_impairment']
-        return data
+        return _result(self, scores[YFAS_CRITERIA], YFAS_CRITERIA, attach)
     
-    def get_YFAS(self):
+    def get_YFAS(self, attach=False):
         """计算YFAS耶鲁食物成瘾量表总分"""
-        import numpy as np
-        # 复制原始数值
-        self['YFAS_1']=(self['YFAS1'])
-        self['YFAS_2']=(self['YFAS2'])
-        self['YFAS_3']=(self['YFAS3'])
-        self['YFAS_4']=(self['YFAS4'])
-        self['YFAS_5']=(self['YFAS5'])
-        self['YFAS_6']=(self['YFAS6'])
-        self['YFAS_7']=(self['YFAS7'])
-        self['YFAS_8']=(self['YFAS8'])
-        self['YFAS_9']=(self['YFAS9'])
-        self['YFAS_10']=(self['YFAS10'])
-        self['YFAS_11']=(self['YFAS11'])
-        self['YFAS_12']=(self['YFAS12'])
-        self['YFAS_13']=(self['YFAS13'])
-        self['YFAS_14']=(self['YFAS14'])
-        self['YFAS_15']=(self['YFAS15'])
-        self['YFAS_16']=(self['YFAS16'])
-        self['YFAS_17']=(self['YFAS17'])
-        self['YFAS_18']=(self['YFAS18'])
-        self['YFAS_19']=(self['YFAS19'])
-        self['YFAS_20']=(self['YFAS20'])
-        self['YFAS_21']=(self['YFAS21'])
-        self['YFAS_22']=(self['YFAS22'])
-        self['YFAS_23']=(self['YFAS23'])
-        self['YFAS_24']=(self['YFAS24'])
-        self['YFAS_25']=(self['YFAS25'])
-        self['YFAS_26']=(self['YFAS26'])
-        self['YFAS_27']=(self['YFAS27'])
-        self['YFAS_28']=(self['YFAS28'])
-        self['YFAS_29']=(self['YFAS29'])
-        self['YFAS_30']=(self['YFAS30'])
-        self['YFAS_31']=(self['YFAS31'])
-        self['YFAS_32']=(self['YFAS32'])
-        self['YFAS_33']=(self['YFAS33'])
-        self['YFAS_34']=(self['YFAS34'])
-        self['YFAS_35']=(self['YFAS35'])
-
-        #题目分数转换
-        #1)	Once a month: #9, #10, #19, #27, #33, #35
-        self.loc[(self['YFAS9'])>=2,'YFAS_9']=1
-        self.loc[(self['YFAS9'])<2,'YFAS_9']=0
-        self.loc[(self['YFAS10'])>=2,'YFAS_10']=1
-        self.loc[(self['YFAS10'])<2,'YFAS_10']=0
-        self.loc[(self['YFAS19'])>=2,'YFAS_19']=1
-        self.loc[(self['YFAS19'])<2,'YFAS_19']=0
-        self.loc[(self['YFAS27'])>=2,'YFAS_27']=1
-        self.loc[(self['YFAS27'])<2,'YFAS_27']=0
-        self.loc[(self['YFAS33'])>=2,'YFAS_33']=1
-        self.loc[(self['YFAS33'])<2,'YFAS_33']=0
-        self.loc[(self['YFAS35'])>=2,'YFAS_35']=1
-        self.loc[(self['YFAS35'])<2,'YFAS_35']=0
-        #2)	Two to three times a month: #8, #18, #20, #21, #34
-        self.loc[(self['YFAS8'])>=3,'YFAS_8']=1
-        self.loc[(self['YFAS8'])<3,'YFAS_8']=0
-        self.loc[(self['YFAS18'])>=3,'YFAS_18']=1
-        self.loc[(self['YFAS18'])<3,'YFAS_18']=0
-        self.loc[(self['YFAS20'])>=3,'YFAS_20']=1
-        self.loc[(self['YFAS20'])<3,'YFAS_20']=0
-        self.loc[(self['YFAS21'])>=3,'YFAS_21']=1
-        self.loc[(self['YFAS21'])<3,'YFAS_21']=0
-        self.loc[(self['YFAS34'])>=3,'YFAS_34']=1
-        self.loc[(self['YFAS34'])<3,'YFAS_34']=0
-        #3)	Once a week: #3, #11, #13, #14, #22, #28, #29
-        self.loc[(self['YFAS3'])>=4,'YFAS_3']=1
-        self.loc[(self['YFAS3'])<4,'YFAS_3']=0
-        self.loc[(self['YFAS11'])>=4,'YFAS_11']=1
-        self.loc[(self['YFAS11'])<4,'YFAS_11']=0
-        self.loc[(self['YFAS13'])>=4,'YFAS_13']=1
-        self.loc[(self['YFAS13'])<4,'YFAS_13']=0
-        self.loc[(self['YFAS14'])>=4,'YFAS_14']=1
-        self.loc[(self['YFAS14'])<4,'YFAS_14']=0
-        self.loc[(self['YFAS22'])>=4,'YFAS_22']=1
-        self.loc[(self['YFAS22'])<4,'YFAS_22']=0
-        self.loc[(self['YFAS28'])>=4,'YFAS_28']=1
-        self.loc[(self['YFAS28'])<4,'YFAS_28']=0
-        self.loc[(self['YFAS29'])>=4,'YFAS_29']=1
-        self.loc[(self['YFAS29'])<4,'YFAS_29']=0
-        #4)	Two to three time's a week: #5, #12, #16, #17, #23, #24, #26, #30, #31, #32
-        self.loc[(self['YFAS5'])>=5,'YFAS_5']=1
-        self.loc[(self['YFAS5'])<5,'YFAS_5']=0
-        self.loc[(self['YFAS12'])>=5,'YFAS_12']=1
-        self.loc[(self['YFAS12'])<5,'YFAS_12']=0
-        self.loc[(self['YFAS16'])>=5,'YFAS_16']=1
-        self.loc[(self['YFAS16'])<5,'YFAS_16']=0
-        self.loc[(self['YFAS17'])>=5,'YFAS_17']=1
-        self.loc[(self['YFAS17'])<5,'YFAS_17']=0
-        self.loc[(self['YFAS23'])>=5,'YFAS_23']=1
-        self.loc[(self['YFAS23'])<5,'YFAS_23']=0
-        self.loc[(self['YFAS24'])>=5,'YFAS_24']=1
-        self.loc[(self['YFAS24'])<5,'YFAS_24']=0
-        self.loc[(self['YFAS26'])>=5,'YFAS_26']=1
-        self.loc[(self['YFAS26'])<5,'YFAS_26']=0
-        self.loc[(self['YFAS30'])>=5,'YFAS_30']=1
-        self.loc[(self['YFAS30'])<5,'YFAS_30']=0
-        self.loc[(self['YFAS31'])>=5,'YFAS_31']=1
-        self.loc[(self['YFAS31'])<5,'YFAS_31']=0
-        self.loc[(self['YFAS32'])>=5,'YFAS_32']=1
-        self.loc[(self['YFAS32'])<5,'YFAS_32']=0
-        #5)	Four to six times a week: #1, #2, #4, #6, #7, #15, #25
-        self.loc[(self['YFAS1'])>=6,'YFAS_1']=1
-        self.loc[(self['YFAS1'])<6,'YFAS_1']=0
-        self.loc[(self['YFAS2'])>=6,'YFAS_2']=1
-        self.loc[(self['YFAS2'])<6,'YFAS_2']=0
-        self.loc[(self['YFAS4'])>=6,'YFAS_4']=1
-        self.loc[(self['YFAS4'])<6,'YFAS_4']=0
-        self.loc[(self['YFAS6'])>=6,'YFAS_6']=1
-        self.loc[(self['YFAS6'])<6,'YFAS_6']=0
-        self.loc[(self['YFAS7'])>=6,'YFAS_7']=1
-        self.loc[(self['YFAS7'])<6,'YFAS_7']=0
-        self.loc[(self['YFAS15'])>=6,'YFAS_15']=1
-        self.loc[(self['YFAS15'])<6,'YFAS_15']=0
-        self.loc[(self['YFAS25'])>=6,'YFAS_25']=1
-        self.loc[(self['YFAS25'])<6,'YFAS_25']=0
-        #维度分
-        self['1_longer_than_intend'] = self['YFAS_1'] + self['YFAS_2'] + self['YFAS_3']
-        self['2_unsuccessful_attempts'] = self['YFAS_4'] + self['YFAS_25'] + self['YFAS_31'] + self['YFAS_32']
-        self['3_much_time'] = self['YFAS_5'] + self['YFAS_6'] + self['YFAS_7']
-        self['4_given_up'] = self['YFAS_8'] + self['YFAS_10'] + self['YFAS_18'] + self['YFAS_20']
-        self['5_despite_adverse_consequences'] = self['YFAS_22'] + self['YFAS_23']
-        self['6_tolerance'] = self['YFAS_24'] + self['YFAS_26']
-        self['7_withdraw_symptoms'] = self['YFAS_11'] + self['YFAS_12']+ self['YFAS_13']+ self['YFAS_14']+ self['YFAS_15']
-        self['8_despite_interpersonal_problems'] = self['YFAS_9'] + self['YFAS_21']+ self['YFAS_35']
-        self['9_failure_role'] = self['YFAS_19'] + self['YFAS_27']
-        self['10_failure_role'] = self['YFAS_28'] + self['YFAS_33']+ self['YFAS_34']
-        self['11_craving'] = self['YFAS_29'] + self['YFAS_30']
-        self['12_clinical_impairment'] = self['YFAS_16'] + self['YFAS_17']
-        #维度分转换
-        self['food_addiction_1']= np.where(self['1_longer_than_intend']>=1,1,0)
-        self['food_addiction_2']= np.where(self['2_unsuccessful_attempts']>=1,1,0)
-        self['food_addiction_3']= np.where(self['3_much_time']>=1,1,0)
-        self['food_addiction_4']= np.where(self['4_given_up']>=1,1,0)
-        self['food_addiction_5']= np.where(self['5_despite_adverse_consequences']>=1,1,0)
-        self['food_addiction_6']= np.where(self['6_tolerance']>=1,1,0)
-        self['food_addiction_7']= np.where(self['7_withdraw_symptoms']>=1,1,0)
-        self['food_addiction_8']= np.where(self['8_despite_interpersonal_problems']>=1,1,0)
-        self['food_addiction_9']= np.where(self['9_failure_role']>=1,1,0)
-        self['food_addiction_10']= np.where(self['10_failure_role']>=1,1,0)
-        self['food_addiction_11']= np.where(self['11_craving']>=1,1,0)
-        self['food_addiction_12']= np.where(self['12_clinical_impairment']>=1,1,0)
-        
+        scores = _yfas_scores(self)
         #总分计算
-        self['food_addiction_score']= self['food_addiction_1']+self['food_addiction_2']+self['food_addiction_3']+self['food_addiction_4']+self['food_addiction_5']+self['food_addiction_6']+self['food_addiction_7']+self['food_addiction_8']+self['food_addiction_9']+self['food_addiction_10']+self['food_addiction_11']+self['food_addiction_12'] 
-        return self['food_addiction_score']
+        return _result(self, scores[['food_addiction_score']], 'food_addiction_score', attach)
     
-    def get_YFAS_whether_numberic(self):
+    def get_YFAS_whether_numberic(self, attach=False):
         """根据YFAS耶鲁食物成瘾量表总分诊断是否食物成瘾【这里临界值定为2，需要根据中国地区的情况更新】"""
-        import numpy as np
-        # 复制原始数值
-        self['YFAS_1']=(self['YFAS1'])
-        self['YFAS_2']=(self['YFAS2'])
-        self['YFAS_3']=(self['YFAS3'])
-        self['YFAS_4']=(self['YFAS4'])
-        self['YFAS_5']=(self['YFAS5'])
-        self['YFAS_6']=(self['YFAS6'])
-        self['YFAS_7']=(self['YFAS7'])
-        self['YFAS_8']=(self['YFAS8'])
-        self['YFAS_9']=(self['YFAS9'])
-        self['YFAS_10']=(self['YFAS10'])
-        self['YFAS_11']=(self['YFAS11'])
-        self['YFAS_12']=(self['YFAS12'])
-        self['YFAS_13']=(self['YFAS13'])
-        self['YFAS_14']=(self['YFAS14'])
-        self['YFAS_15']=(self['YFAS15'])
-        self['YFAS_16']=(self['YFAS16'])
-        self['YFAS_17']=(self['YFAS17'])
-        self['YFAS_18']=(self['YFAS18'])
-        self['YFAS_19']=(self['YFAS19'])
-        self['YFAS_20']=(self['YFAS20'])
-        self['YFAS_21']=(self['YFAS21'])
-        self['YFAS_22']=(self['YFAS22'])
-        self['YFAS_23']=(self['YFAS23'])
-        self['YFAS_24']=(self['YFAS24'])
-        self['YFAS_25']=(self['YFAS25'])
-        self['YFAS_26']=(self['YFAS26'])
-        self['YFAS_27']=(self['YFAS27'])
-        self['YFAS_28']=(self['YFAS28'])
-        self['YFAS_29']=(self['YFAS29'])
-        self['YFAS_30']=(self['YFAS30'])
-        self['YFAS_31']=(self['YFAS31'])
-        self['YFAS_32']=(self['YFAS32'])
-        self['YFAS_33']=(self['YFAS33'])
-        self['YFAS_34']=(self['YFAS34'])
-        self['YFAS_35']=(self['YFAS35'])
-
-        #题目分数转换
-        #1)	Once a month: #9, #10, #19, #27, #33, #35
-        self.loc[(self['YFAS9'])>=2,'YFAS_9']=1
-        self.loc[(self['YFAS9'])<2,'YFAS_9']=0
-        self.loc[(self['YFAS10'])>=2,'YFAS_10']=1
-        self.loc[(self['YFAS10'])<2,'YFAS_10']=0
-        self.loc[(self['YFAS19'])>=2,'YFAS_19']=1
-        self.loc[(self['YFAS19'])<2,'YFAS_19']=0
-        self.loc[(self['YFAS27'])>=2,'YFAS_27']=1
-        self.loc[(self['YFAS27'])<2,'YFAS_27']=0
-        self.loc[(self['YFAS33'])>=2,'YFAS_33']=1
-        self.loc[(self['YFAS33'])<2,'YFAS_33']=0
-        self.loc[(self['YFAS35'])>=2,'YFAS_35']=1
-        self.loc[(self['YFAS35'])<2,'YFAS_35']=0
-        #2)	Two to three times a month: #8, #18, #20, #21, #34
-        self.loc[(self['YFAS8'])>=3,'YFAS_8']=1
-        self.loc[(self['YFAS8'])<3,'YFAS_8']=0
-        self.loc[(self['YFAS18'])>=3,'YFAS_18']=1
-        self.loc[(self['YFAS18'])<3,'YFAS_18']=0
-        self.loc[(self['YFAS20'])>=3,'YFAS_20']=1
-        self.loc[(self['YFAS20'])<3,'YFAS_20']=0
-        self.loc[(self['YFAS21'])>=3,'YFAS_21']=1
-        self.loc[(self['YFAS21'])<3,'YFAS_21']=0
-        self.loc[(self['YFAS34'])>=3,'YFAS_34']=1
-        self.loc[(self['YFAS34'])<3,'YFAS_34']=0
-        #3)	Once a week: #3, #11, #13, #14, #22, #28, #29
-        self.loc[(self['YFAS3'])>=4,'YFAS_3']=1
-        self.loc[(self['YFAS3'])<4,'YFAS_3']=0
-        self.loc[(self['YFAS11'])>=4,'YFAS_11']=1
-        self.loc[(self['YFAS11'])<4,'YFAS_11']=0
-        self.loc[(self['YFAS13'])>=4,'YFAS_13']=1
-        self.loc[(self['YFAS13'])<4,'YFAS_13']=0
-        self.loc[(self['YFAS14'])>=4,'YFAS_14']=1
-        self.loc[(self['YFAS14'])<4,'YFAS_14']=0
-        self.loc[(self['YFAS22'])>=4,'YFAS_22']=1
-        self.loc[(self['YFAS22'])<4,'YFAS_22']=0
-        self.loc[(self['YFAS28'])>=4,'YFAS_28']=1
-        self.loc[(self['YFAS28'])<4,'YFAS_28']=0
-        self.loc[(self['YFAS29'])>=4,'YFAS_29']=1
-        self.loc[(self['YFAS29'])<4,'YFAS_29']=0
-        #4)	Two to three time's a week: #5, #12, #16, #17, #23, #24, #26, #30, #31, #32
-        self.loc[(self['YFAS5'])>=5,'YFAS_5']=1
-        self.loc[(self['YFAS5'])<5,'YFAS_5']=0
-        self.loc[(self['YFAS12'])>=5,'YFAS_12']=1
-        self.loc[(self['YFAS12'])<5,'YFAS_12']=0
-        self.loc[(self['YFAS16'])>=5,'YFAS_16']=1
-        self.loc[(self['YFAS16'])<5,'YFAS_16']=0
-        self.loc[(self['YFAS17'])>=5,'YFAS_17']=1
-        self.loc[(self['YFAS17'])<5,'YFAS_17']=0
-        self.loc[(self['YFAS23'])>=5,'YFAS_23']=1
-        self.loc[(self['YFAS23'])<5,'YFAS_23']=0
-        self.loc[(self['YFAS24'])>=5,'YFAS_24']=1
-        self.loc[(self['YFAS24'])<5,'YFAS_24']=0
-        self.loc[(self['YFAS26'])>=5,'YFAS_26']=1
-        self.loc[(self['YFAS26'])<5,'YFAS_26']=0
-        self.loc[(self['YFAS30'])>=5,'YFAS_30']=1
-        self.loc[(self['YFAS30'])<5,'YFAS_30']=0
-        self.loc[(self['YFAS31'])>=5,'YFAS_31']=1
-        self.loc[(self['YFAS31'])<5,'YFAS_31']=0
-        self.loc[(self['YFAS32'])>=5,'YFAS_32']=1
-        self.loc[(self['YFAS32'])<5,'YFAS_32']=0
-        #5)	Four to six times a week: #1, #2, #4, #6, #7, #15, #25
-        self.loc[(self['YFAS1'])>=6,'YFAS_1']=1
-        self.loc[(self['YFAS1'])<6,'YFAS_1']=0
-        self.loc[(self['YFAS2'])>=6,'YFAS_2']=1
-        self.loc[(self['YFAS2'])<6,'YFAS_2']=0
-        self.loc[(self['YFAS4'])>=6,'YFAS_4']=1
-        self.loc[(self['YFAS4'])<6,'YFAS_4']=0
-        self.loc[(self['YFAS6'])>=6,'YFAS_6']=1
-        self.loc[(self['YFAS6'])<6,'YFAS_6']=0
-        self.loc[(self['YFAS7'])>=6,'YFAS_7']=1
-        self.loc[(self['YFAS7'])<6,'YFAS_7']=0
-        self.loc[(self['YFAS15'])>=6,'YFAS_15']=1
-        self.loc[(self['YFAS15'])<6,'YFAS_15']=0
-        self.loc[(self['YFAS25'])>=6,'YFAS_25']=1
-        self.loc[(self['YFAS25'])<6,'YFAS_25']=0
-        #维度分
-        self['1_longer_than_intend'] = self['YFAS_1'] + self['YFAS_2'] + self['YFAS_3']
-        self['2_unsuccessful_attempts'] = self['YFAS_4'] + self['YFAS_25'] + self['YFAS_31'] + self['YFAS_32']
-        self['3_much_time'] = self['YFAS_5'] + self['YFAS_6'] + self['YFAS_7']
-        self['4_given_up'] = self['YFAS_8'] + self['YFAS_10'] + self['YFAS_18'] + self['YFAS_20']
-        self['5_despite_adverse_consequences'] = self['YFAS_22'] + self['YFAS_23']
-        self['6_tolerance'] = self['YFAS_24'] + self['YFAS_26']
-        self['7_withdraw_symptoms'] = self['YFAS_11'] + self['YFAS_12']+ self['YFAS_13']+ self['YFAS_14']+ self['YFAS_15']
-        self['8_despite_interpersonal_problems'] = self['YFAS_9'] + self['YFAS_21']+ self['YFAS_35']
-        self['9_failure_role'] = self['YFAS_19'] + self['YFAS_27']
-        self['10_failure_role'] = self['YFAS_28'] + self['YFAS_33']+ self['YFAS_34']
-        self['11_craving'] = self['YFAS_29'] + self['YFAS_30']
-        self['12_clinical_impairment'] = self['YFAS_16'] + self['YFAS_17']
-        #维度分转换
-        self['food_addiction_1']= np.where(self['1_longer_than_intend']>=1,1,0)
-        self['food_addiction_2']= np.where(self['2_unsuccessful_attempts']>=1,1,0)
-        self['food_addiction_3']= np.where(self['3_much_time']>=1,1,0)
-        self['food_addiction_4']= np.where(self['4_given_up']>=1,1,0)
-        self['food_addiction_5']= np.where(self['5_despite_adverse_consequences']>=1,1,0)
-        self['food_addiction_6']= np.where(self['6_tolerance']>=1,1,0)
-        self['food_addiction_7']= np.where(self['7_withdraw_symptoms']>=1,1,0)
-        self['food_addiction_8']= np.where(self['8_despite_interpersonal_problems']>=1,1,0)
-        self['food_addiction_9']= np.where(self['9_failure_role']>=1,1,0)
-        self['food_addiction_10']= np.where(self['10_failure_role']>=1,1,0)
-        self['food_addiction_11']= np.where(self['11_craving']>=1,1,0)
-        self['food_addiction_12']= np.where(self['12_clinical_impairment']>=1,1,0)
-        #总分计算
-        self['food_addiction_score']= self['food_addiction_1']+self['food_addiction_2']+self['food_addiction_3']+self['food_addiction_4']+self['food_addiction_5']+self['food_addiction_6']+self['food_addiction_7']+self['food_addiction_8']+self['food_addiction_9']+self['food_addiction_10']+self['food_addiction_11']+self['food_addiction_12'] 
-        #诊断
-        self['food_addiction']=(self['food_addiction_score'])
-        self.loc[self['food_addiction_score']>=2,'food_addiction']=1
-        self.loc[self['food_addiction_score']<2,'food_addiction']=0
-        
-    def get_YFAS_whether_text(self): 
+        scores = _yfas_scores(self)
+        #总分计算与诊断
+        return _result(self, scores[['food_addiction_score', 'food_addiction']], 'food_addiction', attach)
+
+    def get_YFAS_whether_text(self, attach=False): 
         """根据YFAS耶鲁食物成瘾量表总分诊断是否食物成瘾【这里临界值定为2，需要根据中国地区的情况更新】"""
-        import numpy as np
-        # 复制原始数值
-        self['YFAS_1']=(self['YFAS1'])
-        self['YFAS_2']=(self['YFAS2'])
-        self['YFAS_3']=(self['YFAS3'])
-        self['YFAS_4']=(self['YFAS4'])
-        self['YFAS_5']=(self['YFAS5'])
-        self['YFAS_6']=(self['YFAS6'])
-        self['YFAS_7']=(self['YFAS7'])
-        self['YFAS_8']=(self['YFAS8'])
-        self['YFAS_9']=(self['YFAS9'])
-        self['YFAS_10']=(self['YFAS10'])
-        self['YFAS_11']=(self['YFAS11'])
-        self['YFAS_12']=(self['YFAS12'])
-        self['YFAS_13']=(self['YFAS13'])
-        self['YFAS_14']=(self['YFAS14'])
-        self['YFAS_15']=(self['YFAS15'])
-        self['YFAS_16']=(self['YFAS16'])
-        self['YFAS_17']=(self['YFAS17'])
-        self['YFAS_18']=(self['YFAS18'])
-        self['YFAS_19']=(self['YFAS19'])
-        self['YFAS_20']=(self['YFAS20'])
-        self['YFAS_21']=(self['YFAS21'])
-        self['YFAS_22']=(self['YFAS22'])
-        self['YFAS_23']=(self['YFAS23'])
-        self['YFAS_24']=(self['YFAS24'])
-        self['YFAS_25']=(self['YFAS25'])
-        self['YFAS_26']=(self['YFAS26'])
-        self['YFAS_27']=(self['YFAS27'])
-        self['YFAS_28']=(self['YFAS28'])
-        self['YFAS_29']=(self['YFAS29'])
-        self['YFAS_30']=(self['YFAS30'])
-        self['YFAS_31']=(self['YFAS31'])
-        self['YFAS_32']=(self['YFAS32'])
-        self['YFAS_33']=(self['YFAS33'])
-        self['YFAS_34']=(self['YFAS34'])
-        self['YFAS_35']=(self['YFAS35'])
-
-        #题目分数转换
-        #1)	Once a month: #9, #10, #19, #27, #33, #35
-        self.loc[(self['YFAS9'])>=2,'YFAS_9']=1
-        self.loc[(self['YFAS9'])<2,'YFAS_9']=0
-        self.loc[(self['YFAS10'])>=2,'YFAS_10']=1
-        self.loc[(self['YFAS10'])<2,'YFAS_10']=0
-        self.loc[(self['YFAS19'])>=2,'YFAS_19']=1
-        self.loc[(self['YFAS19'])<2,'YFAS_19']=0
-        self.loc[(self['YFAS27'])>=2,'YFAS_27']=1
-        self.loc[(self['YFAS27'])<2,'YFAS_27']=0
-        self.loc[(self['YFAS33'])>=2,'YFAS_33']=1
-        self.loc[(self['YFAS33'])<2,'YFAS_33']=0
-        self.loc[(self['YFAS35'])>=2,'YFAS_35']=1
-        self.loc[(self['YFAS35'])<2,'YFAS_35']=0
-        #2)	Two to three times a month: #8, #18, #20, #21, #34
-        self.loc[(self['YFAS8'])>=3,'YFAS_8']=1
-        self.loc[(self['YFAS8'])<3,'YFAS_8']=0
-        self.loc[(self['YFAS18'])>=3,'YFAS_18']=1
-        self.loc[(self['YFAS18'])<3,'YFAS_18']=0
-        self.loc[(self['YFAS20'])>=3,'YFAS_20']=1
-        self.loc[(self['YFAS20'])<3,'YFAS_20']=0
-        self.loc[(self['YFAS21'])>=3,'YFAS_21']=1
-        self.loc[(self['YFAS21'])<3,'YFAS_21']=0
-        self.loc[(self['YFAS34'])>=3,'YFAS_34']=1
-        self.loc[(self['YFAS34'])<3,'YFAS_34']=0
-        #3)	Once a week: #3, #11, #13, #14, #22, #28, #29
-        self.loc[(self['YFAS3'])>=4,'YFAS_3']=1
-        self.loc[(self['YFAS3'])<4,'YFAS_3']=0
-        self.loc[(self['YFAS11'])>=4,'YFAS_11']=1
-        self.loc[(self['YFAS11'])<4,'YFAS_11']=0
-        self.loc[(self['YFAS13'])>=4,'YFAS_13']=1
-        self.loc[(self['YFAS13'])<4,'YFAS_13']=0
-        self.loc[(self['YFAS14'])>=4,'YFAS_14']=1
-        self.loc[(self['YFAS14'])<4,'YFAS_14']=0
-        self.loc[(self['YFAS22'])>=4,'YFAS_22']=1
-        self.loc[(self['YFAS22'])<4,'YFAS_22']=0
-        self.loc[(self['YFAS28'])>=4,'YFAS_28']=1
-        self.loc[(self['YFAS28'])<4,'YFAS_28']=0
-        self.loc[(self['YFAS29'])>=4,'YFAS_29']=1
-        self.loc[(self['YFAS29'])<4,'YFAS_29']=0
-        #4)	Two to three time's a week: #5, #12, #16, #17, #23, #24, #26, #30, #31, #32
-        self.loc[(self['YFAS5'])>=5,'YFAS_5']=1
-        self.loc[(self['YFAS5'])<5,'YFAS_5']=0
-        self.loc[(self['YFAS12'])>=5,'YFAS_12']=1
-        self.loc[(self['YFAS12'])<5,'YFAS_12']=0
-        self.loc[(self['YFAS16'])>=5,'YFAS_16']=1
-        self.loc[(self['YFAS16'])<5,'YFAS_16']=0
-        self.loc[(self['YFAS17'])>=5,'YFAS_17']=1
-        self.loc[(self['YFAS17'])<5,'YFAS_17']=0
-        self.loc[(self['YFAS23'])>=5,'YFAS_23']=1
-        self.loc[(self['YFAS23'])<5,'YFAS_23']=0
-        self.loc[(self['YFAS24'])>=5,'YFAS_24']=1
-        self.loc[(self['YFAS24'])<5,'YFAS_24']=0
-        self.loc[(self['YFAS26'])>=5,'YFAS_26']=1
-        self.loc[(self['YFAS26'])<5,'YFAS_26']=0
-        self.loc[(self['YFAS30'])>=5,'YFAS_30']=1
-        self.loc[(self['YFAS30'])<5,'YFAS_30']=0
-        self.loc[(self['YFAS31'])>=5,'YFAS_31']=1
-        self.loc[(self['YFAS31'])<5,'YFAS_31']=0
-        self.loc[(self['YFAS32'])>=5,'YFAS_32']=1
-        self.loc[(self['YFAS32'])<5,'YFAS_32']=0
-        #5)	Four to six times a week: #1, #2, #4, #6, #7, #15, #25
-        self.loc[(self['YFAS1'])>=6,'YFAS_1']=1
-        self.loc[(self['YFAS1'])<6,'YFAS_1']=0
-        self.loc[(self['YFAS2'])>=6,'YFAS_2']=1
-        self.loc[(self['YFAS2'])<6,'YFAS_2']=0
-        self.loc[(self['YFAS4'])>=6,'YFAS_4']=1
-        self.loc[(self['YFAS4'])<6,'YFAS_4']=0
-        self.loc[(self['YFAS6'])>=6,'YFAS_6']=1
-        self.loc[(self['YFAS6'])<6,'YFAS_6']=0
-        self.loc[(self['YFAS7'])>=6,'YFAS_7']=1
-        self.loc[(self['YFAS7'])<6,'YFAS_7']=0
-        self.loc[(self['YFAS15'])>=6,'YFAS_15']=1
-        self.loc[(self['YFAS15'])<6,'YFAS_15']=0
-        self.loc[(self['YFAS25'])>=6,'YFAS_25']=1
-        self.loc[(self['YFAS25'])<6,'YFAS_25']=0
-        #维度分
-        self['1_longer_than_intend'] = self['YFAS_1'] + self['YFAS_2'] + self['YFAS_3']
-        self['2_unsuccessful_attempts'] = self['YFAS_4'] + self['YFAS_25'] + self['YFAS_31'] + self['YFAS_32']
-        self['3_much_time'] = self['YFAS_5'] + self['YFAS_6'] + self['YFAS_7']
-        self['4_given_up'] = self['YFAS_8'] + self['YFAS_10'] + self['YFAS_18'] + self['YFAS_20']
-        self['5_despite_adverse_consequences'] = self['YFAS_22'] + self['YFAS_23']
-        self['6_tolerance'] = self['YFAS_24'] + self['YFAS_26']
-        self['7_withdraw_symptoms'] = self['YFAS_11'] + self['YFAS_12']+ self['YFAS_13']+ self['YFAS_14']+ self['YFAS_15']
-        self['8_despite_interpersonal_problems'] = self['YFAS_9'] + self['YFAS_21']+ self['YFAS_35']
-        self['9_failure_role'] = self['YFAS_19'] + self['YFAS_27']
-        self['10_failure_role'] = self['YFAS_28'] + self['YFAS_33']+ self['YFAS_34']
-        self['11_craving'] = self['YFAS_29'] + self['YFAS_30']
-        self['12_clinical_impairment'] = self['YFAS_16'] + self['YFAS_17']
-        #维度分转换
-        self['food_addiction_1']= np.where(self['1_longer_than_intend']>=1,1,0)
-        self['food_addiction_2']= np.where(self['2_unsuccessful_attempts']>=1,1,0)
-        self['food_addiction_3']= np.where(self['3_much_time']>=1,1,0)
-        self['food_addiction_4']= np.where(self['4_given_up']>=1,1,0)
-        self['food_addiction_5']= np.where(self['5_despite_adverse_consequences']>=1,1,0)
-        self['food_addiction_6']= np.where(self['6_tolerance']>=1,1,0)
-        self['food_addiction_7']= np.where(self['7_withdraw_symptoms']>=1,1,0)
-        self['food_addiction_8']= np.where(self['8_despite_interpersonal_problems']>=1,1,0)
-        self['food_addiction_9']= np.where(self['9_failure_role']>=1,1,0)
-        self['food_addiction_10']= np.where(self['10_failure_role']>=1,1,0)
-        self['food_addiction_11']= np.where(self['11_craving']>=1,1,0)
-        self['food_addiction_12']= np.where(self['12_clinical_impairment']>=1,1,0)
-        #总分计算
-        self['food_addiction_score']= self['food_addiction_1']+self['food_addiction_2']+self['food_addiction_3']+self['food_addiction_4']+self['food_addiction_5']+self['food_addiction_6']+self['food_addiction_7']+self['food_addiction_8']+self['food_addiction_9']+self['food_addiction_10']+self['food_addiction_11']+self['food_addiction_12'] 
-        #诊断
-        self['food_addiction']=(self['food_addiction_score'])
-        self.loc[self['food_addiction_score']>=2,'food_addiction']= 'Addiction'
-        self.loc[self['food_addiction_score']<2,'food_addiction']= 'No Addiction'
-        
-    def get_SSI(self):
+        scores = _yfas_scores(self)
+        #总分计算与诊断
+        data = scores[['food_addiction_score', 'food_addiction_text']].rename(columns={'food_addiction_text': 'food_addiction'})
+        return _result(self, data, 'food_addiction', attach)
+
+    def get_SSI(self, attach=False):
         """计算贝克自杀意念：是否有自杀意念，自杀意念分数，自杀危险"""
         import pandas as pd
         import numpy as np
-        self['whether_suicide_ideation_text'] = np.where((self['SSI4']+self['SSI5'])>2,'Suicide Ideation','No Suicid Ideation')
-        self['whether_suicide_ideation_numeric'] = np.where((self['SSI4']+self['SSI5'])>2,1,0)
-        self['suicide_ideation'] = np.mean(self['SSI1']+self['SSI2']+self['SSI3']+self['SSI4']+self['SSI5'])
-        self['suicide_risk'] = (((self['SSI6']-1)+(self['SSI7']-1)+self['SSI8']+self['SSI9']+self['SSI10']+(self['SSI11']-1)+self['SSI12']+(self['SSI13']-1)+self['SSI14']+self['SSI15']+self['SSI16']+self['SSI17']+self['SSI18']+(self['SSI19']-1)-9)/33)*100
-        self.loc[(self['whether_suicide_ideation_numeric'])==0,'suicide_risk'] = np.nan
-        data = pd.DataFrame(list(zip( self['whether_suicide_ideation_numeric'],self['suicide_risk'])))
-        data.columns = ['whether_suicide_ideation_numeric','suicide_risk']
-        return data
+        scores = score_scale(self, 'SSI')
+        # 是否有自杀意念与 score_all 共用注册表中的分界表（筛查分 > 2）
+        screen = SCALES['SSI'].cutoff('whether_suicide_ideation_numeric')
+        data = pd.DataFrame({'whether_suicide_ideation_text': screen.text(scores['suicide_ideation_screen']),
+                             'whether_suicide_ideation_numeric': screen.numeric(scores['suicide_ideation_screen']),
+                             'suicide_ideation': np.mean(scores['suicide_ideation']),
+                             # 无自杀意念者的自杀危险已在计分时置为缺失
+                             'suicide_risk': scores['suicide_risk']}, index=self.index)
+        columns = ['whether_suicide_ideation_numeric','suicide_risk']
+        return _result(self, data, columns, attach)
 
     ##########六、问卷实现行为学###############
-    def get_CRA_quality(self):
+    def get_CRA_quality(self, attach=False, columns=None):
+        """CRA注意检查题的正确率（百分制）；columns 可覆盖 CRA_COLUMNS 中的列布局"""
         import numpy as np
         import pandas as pd
-        self['test1'] = np.where(self.iloc[:,[12]]==2,1,0)
-        self['test2'] = np.where(self.iloc[:,[13]]==3,1,0)
-        self['test3'] = np.where(self.iloc[:,[14]]==4,1,0)
-        self['test4'] = np.where(self.iloc[:,[15]]==4,1,0)
-        self['test5'] = np.where(self.iloc[:,[16]]==3,1,0)
-        self['test6'] = np.where(self.iloc[:,[17]]==2,1,0)
-        self['test7'] = np.where(self.iloc[:,[18]]==2,1,0)
-        self['score'] = (self['test1']+self['test2']+self['test3']+self['test4']+self['test5']+self['test6']+self['test7'])/7 * 100
-        quality = (self.iloc[:,[9]]).join(self['score'])
+        positions = _task_columns(self, CRA_COLUMNS, columns, {'subject': 1, 'checks': len(CRA_CHECK_ANSWERS)})
+        tests = self.iloc[:,positions['checks']].to_numpy() == CRA_CHECK_ANSWERS
+        data = pd.DataFrame(tests.astype(np.int64), index=self.index, columns=['test%d' % (i + 1) for i in range(tests.shape[1])])
+        data['score'] = tests.sum(axis=1)/len(CRA_CHECK_ANSWERS) * 100
+        if attach:
+            return _result(self, data, 'score', attach)
+        quality = (self.iloc[:,positions['subject']]).join(data['score'])
         return quality
     
-    def get_CRA_for_modeling(self):
+    def get_CRA_for_modeling(self, bundle=None, columns=None):
+        """生成CRA建模用的长格式数据；给出 bundle 路径时同时保存建模用的 被试 × 试次 数组（见 save_model_bundle）；
+        columns 可覆盖 CRA_COLUMNS 中的列布局"""
         import numpy as np
         import pandas as pd
-        CRA_parameter = pd.DataFrame({'trial':[1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,71,72,73,74,75,76,77,78,79,80],
-                              'prob':[0.13,0.13,0.13,0.13,0.13,0.25,0.25,0.25,0.25,0.25,0.38,0.38,0.38,0.38,0.38,0.5,0.5,0.5,0.5,0.5,0.75,0.75,0.75,0.75,0.75,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.13,0.13,0.13,0.13,0.13,0.25,0.25,0.25,0.25,0.25,0.38,0.38,0.38,0.38,0.38,0.5,0.5,0.5,0.5,0.5,0.75,0.75,0.75,0.75,0.75,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5,0.5],
-                              'ambig':[0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0.24,0.24,0.24,0.24,0.24,0.5,0.5,0.5,0.5,0.5,0.74,0.74,0.74,0.74,0.74,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0.24,0.24,0.24,0.24,0.24,0.5,0.5,0.5,0.5,0.5,0.74,0.74,0.74,0.74,0.74],
-                              'reward_var':[35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875,35,56,140,350,875],
-                              'reward_fix':[35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35]})
-        choice = (self.iloc[:,[20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,90,91,92,93,94,95,96,97,98,99]]-1).T
-        choice.index = [0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,71,72,73,74,75,76,77,78,79]
-        subjID = self.iloc[:,9]
-        choice.columns = subjID
-        CRA = CRA_parameter.join(choice)
-        CRA = pd.melt(CRA, id_vars=['trial','prob','ambig','reward_var','reward_fix'], value_vars=None, var_name='subjID', value_name='choice', col_level=None)
+        positions = _task_columns(self, CRA_COLUMNS, columns, {'subject': 1, 'choices': len(CRA_PARAMETERS['trial'])})
+        # 80个试次的选择（1/2），转换为 0/1
+        choice = _task_choices(self, positions['choices'])
+        subjID = self.iloc[:,positions['subject'][0]]
+        CRA = _long_format(CRA_PARAMETERS, subjID, choice)
+        if bundle is not None:
+            # 同时保存建模用的 被试 × 试次 数组，重复拟合时直接读取
+            parameters = dict((name, values) for name, values in CRA_PARAMETERS.items() if name != 'trial')
+            save_model_bundle(_model_bundle(parameters, subjID, choice), bundle)
         return CRA
         
     
-    def get_DDT_single_trial_for_modeling(self):
+    def get_DDT_single_trial_for_modeling(self, bundle=None, columns=None):
+        """生成DDT建模用的长格式数据；给出 bundle 路径时同时保存建模用的 被试 × 试次 数组（见 save_model_bundle）；
+        columns 可覆盖 DDT_COLUMNS 中的列布局"""
         import numpy as np
         import pandas as pd
-        DDT_questionnaire_parameter = pd.DataFrame({'trial':[1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50],
-                                            'delay_later':[7,7,7,7,7,7,7,7,7,7,15,15,15,15,15,15,15,15,15,15,30,30,30,30,30,30,30,30,30,30,60,60,60,60,60,60,60,60,60,60,120,120,120,120,120,120,120,120,120,120],
-                                            'amount_later':[21,25,28,32,36,41,45,49,54,60,21,26,32,38,44,50,56,63,79,80,21,28,36,45,54,60,72,80,89,100,22,34,42,50,56,68,80,94,105,120,24,38,50,60,72,84,98,116,135,150],
-                                            'delay_sooner':[0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-                                            'amount_sooner':[20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20]})
-        choice = (self.iloc[:,[12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61]]-1).T
-        choice.index = [0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,47,48,49]
-        subjID = self.iloc[:,9]
-        choice.columns = subjID
-        DDT = DDT_questionnaire_parameter.join(choice)
-        DDT = pd.melt(DDT, id_vars=['trial','delay_later','amount_later','delay_sooner','amount_sooner'], value_vars=None, var_name='subjID', value_name='choice', col_level=None)
+        positions = _task_columns(self, DDT_COLUMNS, columns, {'subject': 1, 'choices': len(DDT_PARAMETERS['trial'])})
+        # 50个试次的选择（1/2），转换为 0/1
+        choice = _task_choices(self, positions['choices'])
+        subjID = self.iloc[:,positions['subject'][0]]
+        DDT = _long_format(DDT_PARAMETERS, subjID, choice)
+        if bundle is not None:
+            # 同时保存建模用的 被试 × 试次 数组，重复拟合时直接读取
+            parameters = dict((name, values) for name, values in DDT_PARAMETERS.items() if name != 'trial')
+            save_model_bundle(_model_bundle(parameters, subjID, choice), bundle)
         return DDT
     
 #    def get_DDT_double_trial_for_modeling(self):
@@ -1255,3 +1883,138 @@ class PsyScales:
 #        DDT = DDT_questionnaire_parameter.join(choice)
 #        DDT = pd.melt(DDT, id_vars=['trial','delay_later','amount_later','delay_sooner','amount_sooner'], value_vars=None, var_name='subjID', value_name='choice', col_level=None)
 #        return DDT
+
+
+# In[ ]:
+
+
+# # 计分调用的计时与统计（可选）
+# * 默认关闭，不影响计分速度；add_hook 注册回调后，每次调用 PsyScales 的 get_* 方法以及 score_all、score_parallel、score_file、score_incremental
+#   都会生成一条记录：调用名、耗时、处理行数、分配的内存、在传入的 DataFrame 上新增的列数
+# * 回调可以是任意接收记录 dict 的函数，例如 log_hook、Collector、PrometheusTextfile
+
+_HOOKS = []
+# 当前线程中正在记录的调用层数：外层调用已在记录时，内层调用不再记录，以免重置内存峰值、重复计算行数
+_ACTIVE = threading.local()
+
+
+def add_hook(callback, memory=False):
+    """注册回调 callback(record)。memory=True 时用 tracemalloc 统计每次调用分配的内存峰值（会拖慢计分）"""
+    _HOOKS.append((callback, memory))
+
+
+def remove_hook(callback):
+    """注销回调"""
+    _HOOKS[:] = [(hook, memory) for hook, memory in _HOOKS if hook is not callback]
+
+
+def _instrumented(func, name):
+    """包装计分函数：有回调时记录耗时、行数、内存与新增列数，没有回调时直接调用"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _HOOKS or getattr(_ACTIVE, 'depth', 0):
+            return func(*args, **kwargs)
+        df = args[0] if args and isinstance(args[0], pd.DataFrame) else None
+        n_columns = None if df is None else len(df.columns)
+        memory = any(memory for _, memory in _HOOKS)
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        error = result = None
+        _ACTIVE.depth = 1
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            error = '%s: %s' % (type(e).__name__, e)
+            raise
+        finally:
+            _ACTIVE.depth = 0
+            seconds = time.perf_counter() - start
+            allocated = tracemalloc.get_traced_memory()[1] - base if memory else None
+            if started_tracing:
+                tracemalloc.stop()
+            record = {'call': name, 'seconds': seconds,
+                      'rows': len(df) if df is not None else result if isinstance(result, int) else None,
+                      'bytes_allocated': allocated,
+                      'columns_added': None if df is None else len(df.columns) - n_columns,
+                      'error': error}
+            for hook, _ in list(_HOOKS):
+                hook(record)
+        return result
+    return wrapper
+
+
+def log_hook(record):
+    """把记录写入 logging（logger 名为 psyscales）"""
+    logging.getLogger('psyscales').info(
+        '%(call)s rows=%(rows)s seconds=%(seconds).4f bytes=%(bytes_allocated)s columns_added=%(columns_added)s', record)
+
+
+class Collector(object):
+    """在内存中收集记录；summary() 按调用名汇总，用于查找耗时最多的量表"""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def summary(self):
+        records = pd.DataFrame(self.records, columns=['call', 'seconds', 'rows', 'bytes_allocated', 'columns_added', 'error'])
+        summary = records.groupby('call').agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'), rows=('rows', 'sum'),
+                                              bytes_allocated=('bytes_allocated', 'sum'), columns_added=('columns_added', 'sum'))
+        return summary.sort_values('seconds', ascending=False)
+
+
+class PrometheusTextfile(object):
+    """按调用名累计次数、耗时与行数，每次调用后整体改写 path（供 node_exporter 的 textfile collector 读取）"""
+
+    def __init__(self, path, prefix='psyscales'):
+        self.path = path
+        self.prefix = prefix
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self._update(record)
+
+    def _update(self, record):
+        totals = self.totals.setdefault(record['call'], {'calls': 0, 'seconds': 0.0, 'rows': 0, 'errors': 0})
+        totals['calls'] += 1
+        totals['seconds'] += record['seconds']
+        totals['rows'] += record['rows'] or 0
+        totals['errors'] += record['error'] is not None
+        lines = []
+        for metric, key, help_text in [('calls_total', 'calls', '计分调用次数'),
+                                       ('seconds_total', 'seconds', '计分耗时（秒）'),
+                                       ('rows_total', 'rows', '处理行数'),
+                                       ('errors_total', 'errors', '出错次数')]:
+            lines.append('# HELP %s_%s %s' % (self.prefix, metric, help_text))
+            lines.append('# TYPE %s_%s counter' % (self.prefix, metric))
+            for call, values in sorted(self.totals.items()):
+                lines.append('%s_%s{call="%s"} %s' % (self.prefix, metric, call, values[key]))
+        # 先写同目录下的唯一临时文件再替换，避免读到写了一半的文件，多个写入者也互不干扰
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+# 包装前的 score_all，供 score_parallel 的子任务、score_file 等内部调用，不在子任务中触发回调
+_score_all = score_all
+for _name in [name for name in vars(PsyScales) if name.startswith('get_')]:
+    setattr(PsyScales, _name, _instrumented(getattr(PsyScales, _name), _name))
+score_all = _instrumented(score_all, 'score_all')
+score_parallel = _instrumented(score_parallel, 'score_parallel')
+score_file = _instrumented(score_file, 'score_file')
+score_incremental = _instrumented(score_incremental, 'score_incremental')
+standardize = _instrumented(standardize, 'standardize')
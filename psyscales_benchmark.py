@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # PsyScales 性能基准
+# * 为每个量表生成合法的模拟作答（BDI 至 YFAS，以及 CRA、DDT 行为任务），按 1k、100k、1M 名被试计时
+# * 逐个计时 PsyScales 的 get_* 方法，以及一次计算全部量表（score_all，含 PSQI、YFAS）的路径
+# * 报告耗时、吞吐量（行/秒）、单次调用的内存峰值与进程峰值 RSS（每个数据规模在单独的子进程中运行，RSS 按规模分别记录），
+#   结果写入 JSON，可与旧版本的结果比较
+#
+# 用法：
+#
+#     python psyscales_benchmark.py --sizes 1000 100000 1000000 --output bench.json
+#     python psyscales_benchmark.py --compare bench_old.json --output bench_new.json
+
+# In[ ]:
+
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import psyscales_
+from psyscales_ import PsyScales, SCALES, PSQI_ITEMS, YFAS_ITEMS
+
+
+# 未在注册表中声明选项范围的量表
+RESPONSES = {'SSQ': (1, 6), 'AUDIT': (1, 5)}
+
+
+# In[ ]:
+
+
+def make_responses(n, seed=0):
+    """生成 n 名被试的问卷作答：注册表中全部量表、PSQI、YFAS 与人口学信息；题目以 int8 存储"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, scale in SCALES.items():
+        if scale.kernel is not None:
+            continue
+        low, high = scale.responses or RESPONSES[name]
+        for col in scale.items:
+            columns.setdefault(col, rng.integers(low, high + 1, n, dtype=np.int8))
+    # PSQI：上床时间（晚上时、分），入睡分钟档，起床时间（早上时、分），睡眠时长（时、分），其余题目 0~3；
+    # 时间题在计分时要换算成分钟，以 int16 存储
+    for col in PSQI_ITEMS:
+        columns[col] = rng.integers(0, 4, n, dtype=np.int8)
+    columns['PSQI1_1'] = rng.integers(9, 12, n, dtype=np.int16)
+    columns['PSQI1_2'] = rng.integers(0, 60, n, dtype=np.int16)
+    columns['PSQI2'] = rng.integers(1, 5, n, dtype=np.int8)
+    columns['PSQI3_1'] = rng.integers(6, 9, n, dtype=np.int16)
+    columns['PSQI3_2'] = rng.integers(0, 60, n, dtype=np.int16)
+    columns['PSQI4_1'] = rng.integers(4, 9, n, dtype=np.int16)
+    columns['PSQI4_2'] = rng.integers(0, 60, n, dtype=np.int16)
+    columns['PSQI5_1'] = rng.integers(1, 5, n, dtype=np.int8)
+    columns['PSQI6'] = rng.integers(1, 5, n, dtype=np.int8)
+    # YFAS：频率 0~7
+    for col in YFAS_ITEMS:
+        columns[col] = rng.integers(0, 8, n, dtype=np.int8)
+    # 人口学信息
+    birthday = pd.Timestamp('1970-01-01') + pd.to_timedelta(rng.integers(0, 365 * 40, n), unit='D')
+    columns['birthday'] = birthday
+    columns['sub_time'] = birthday + pd.to_timedelta(rng.integers(365 * 18, 365 * 60, n), unit='D')
+    columns['gender_number'] = rng.integers(1, 3, n, dtype=np.int8)
+    for col in ['primary_school', 'middle_school', 'high_school', 'college', 'postgradulate']:
+        columns[col] = rng.integers(0, 7, n, dtype=np.int8)
+    columns['height'] = rng.normal(168, 8, n)
+    columns['weight'] = rng.normal(62, 10, n)
+    return pd.DataFrame(columns)
+
+
+def make_task(n, n_trials, first, seed=0):
+    """生成行为任务（CRA、DDT）导出：第 10 列为被试编号，第 first 列起为各试次的选择（1/2）"""
+    rng = np.random.default_rng(seed)
+    columns = {'col%d' % i: np.zeros(n, dtype=np.int8) for i in range(first)}
+    columns['col9'] = np.arange(n)
+    for i in range(n_trials):
+        columns['trial%d' % (i + 1)] = rng.integers(1, 3, n, dtype=np.int8)
+    frame = pd.DataFrame(columns)
+    if first > 12:
+        # CRA：第 13~19 列为注意检查题
+        for i, answer in zip(range(12, 19), [2, 3, 4, 4, 3, 2, 2]):
+            frame.iloc[:, i] = np.where(rng.random(n) < 0.9, answer, 1).astype(np.int8)
+    return frame
+
+
+def whole_battery(df):
+    """一次计算全部量表（含 PSQI、YFAS）的路径"""
+    return psyscales_.score_all(df)
+
+
+# In[ ]:
+
+
+def _measure(func, frame, repeat):
+    """在新的浅复制上调用 func（避免命中上一次调用的缓存），返回 (最短耗时, 内存峰值字节数, 错误)"""
+    times = []
+    try:
+        for _ in range(repeat):
+            target = frame.copy(deep=False)
+            start = time.perf_counter()
+            func(target)
+            times.append(time.perf_counter() - start)
+        target = frame.copy(deep=False)
+        tracemalloc.start()
+        func(target)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    except Exception as error:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return None, None, '%s: %s' % (type(error).__name__, error)
+    return min(times), peak, None
+
+
+def _peak_rss():
+    """本进程的峰值 RSS（字节）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def run_size(n, repeat=3, methods=None):
+    """对 n 名被试计时各 get_* 方法与全量表路径，返回结果记录列表；每条记录带上本进程的峰值 RSS"""
+    names = sorted(name for name in dir(PsyScales) if name.startswith('get_'))
+    if methods:
+        names = [name for name in names if name in methods]
+    records = []
+    frames = {'survey': make_responses(n),
+              'CRA': make_task(n, 80, 20),
+              'DDT': make_task(n, 50, 12)}
+    cases = [(name, getattr(PsyScales, name)) for name in names]
+    if not methods or 'whole_battery' in methods:
+        cases.append(('whole_battery', whole_battery))
+    for name, func in cases:
+        frame = frames['CRA'] if '_CRA_' in name else frames['DDT'] if '_DDT_' in name else frames['survey']
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            seconds, peak, error = _measure(func, frame, repeat)
+        record = {'method': name, 'rows': n, 'seconds': seconds,
+                  'rows_per_second': n / seconds if seconds else None,
+                  'peak_bytes': peak, 'error': error}
+        records.append(record)
+        print('%-36s %9d rows  %s' % (name, n, error or '%.4f s  %.3g rows/s  peak %.1f MB'
+                                      % (seconds, record['rows_per_second'], peak / 2 ** 20)))
+    rss = _peak_rss()
+    for record in records:
+        record['peak_rss_bytes'] = rss
+    return records
+
+
+def run(sizes, repeat=3, methods=None):
+    """每个数据规模在一个新的子进程中运行 run_size，使各规模的峰值 RSS 互不影响，返回全部结果记录"""
+    records = []
+    context = multiprocessing.get_context('spawn')
+    for n in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            records.extend(pool.submit(run_size, n, repeat, methods).result())
+    return records
+
+
+def environment():
+    """记录运行环境，便于跨版本比较"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(records, baseline, threshold):
+    """与旧结果比较，返回耗时增加超过 threshold 倍的 (方法, 行数, 旧耗时, 新耗时)"""
+    old = dict(((r['method'], r['rows']), r['seconds']) for r in baseline['results'] if r['seconds'])
+    regressions = []
+    for r in records:
+        before = old.get((r['method'], r['rows']))
+        if before and r['seconds'] and r['seconds'] > before * threshold:
+            regressions.append((r['method'], r['rows'], before, r['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PsyScales 性能基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000], help='被试数')
+    parser.add_argument('--repeat', type=int, default=3, help='每项计时重复次数，取最短耗时')
+    parser.add_argument('--methods', nargs='+', help='只运行这些方法（可含 whole_battery）')
+    parser.add_argument('--output', default='bench_output.json', help='结果 JSON 文件')
+    parser.add_argument('--compare', help='与之比较的旧结果 JSON 文件')
+    parser.add_argument('--threshold', type=float, default=1.2, help='耗时超过旧结果多少倍视为退化')
+    args = parser.parse_args(argv)
+
+    records = run(args.sizes, args.repeat, args.methods)
+    result = {'environment': environment(), 'results': records}
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(records, json.load(f), args.threshold)
+        for method, rows, before, after in regressions:
+            print('退化：%s（%d 行）%.4f s -> %.4f s' % (method, rows, before, after))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
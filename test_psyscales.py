@@ -0,0 +1,228 @@
+"""psyscales_ 的回归测试：注册表与矩阵计分引擎的结果与基线版本的逐题公式一致，
+并覆盖缺失题目、反向计分、折算、并入分量表的题组与输出类型"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from psyscales_ import SCALES, PsyScales, score_all, score_scale
+
+# 各量表题目的取值范围（最低, 最高）
+RANGES = {'BDI': (1, 4), 'BAI': (1, 4), 'BIS': (1, 5), 'UPPS_P': (1, 4), 'BIS_BAS': (1, 4), 'Mini_K': (1, 7),
+          'LPQ': (1, 5), 'TAS': (1, 5), 'ERQ': (1, 7), 'BPAQ': (1, 5), 'CTQ': (1, 5), 'SSQ': (1, 6), 'FTND': (1, 4),
+          'SSI': (1, 3), 'EQ': (1, 4), 'AUDIT': (1, 5), 'EDI': (1, 6), 'YFAS': (0, 7)}
+# PSQI 各题的 (最低, 取值个数)；上床时间取 9~12 点
+PSQI_RANGES = {'PSQI1_1': (9, 4), 'PSQI1_2': (0, 60), 'PSQI2': (1, 4), 'PSQI3_1': (6, 3), 'PSQI3_2': (0, 60),
+               'PSQI4_1': (4, 5), 'PSQI4_2': (0, 60), 'PSQI6': (1, 4), 'PSQI7': (0, 4), 'PSQI8': (0, 4),
+               'PSQI9': (0, 4), 'PSQI5_1': (1, 4)}
+PSQI_RANGES.update(('PSQI5_%d' % i, (0, 4)) for i in range(2, 11))
+
+
+def make_responses(rows):
+    """按行号确定的作答：第 r 行第 i 题在取值范围内按 (7r + 3i + ri) 循环取值"""
+    cols = {}
+    for name, (low, high) in RANGES.items():
+        for i, col in enumerate(SCALES[name].items):
+            cols[col] = [low + (r * 7 + i * 3 + r * i) % (high - low + 1) for r in rows]
+    for i, (col, (low, span)) in enumerate(PSQI_RANGES.items()):
+        cols[col] = [low + (r * 5 + i * 2 + r * i) % span for r in rows]
+    return pd.DataFrame(cols)
+
+
+# make_responses([1, 2, 3]) 的各输出，由基线版本（逐题相加的 get_* 方法）算出；
+# 基线版本的 suicide_ideation 误用了全列均值，这里为 SSI1~5 逐行相加
+BASELINE = {
+    'BDI': [63, 32, 41],
+    'whether_numeric_depression': [1, 1, 1],
+    'numeric_level_BDI': [3, 3, 3],
+    'BAI': [63, 32, 41],
+    'numeric_level_BAI': [2, 1, 2],
+    'nonplan_impulsivity': [50, 0, 50],
+    'motor_impulsivity': [50, 100, 50],
+    'attention_impulsivity': [50, 0, 50],
+    'BIS': [50, 33.333333333333336, 50],
+    'negative_urgency': [16, 10, 12],
+    'positive_urgency': [16, 10, 12],
+    'lack_of_persistence': [7, 10, 9],
+    'lack_of_plan': [10, 10, 10],
+    'sensation_seeking': [16, 13, 14],
+    'BASR': [24, 15, 18],
+    'BASD': [16, 9, 10],
+    'BASF': [16, 9, 14],
+    'BIS_BAS_BIS': [20, 10, 16],
+    'life_strategy': [3.8421052631578942, 3.9999999999999996, 4.157894736842105],
+    'event_load': [30, 50, 30],
+    'individual_vulnerability': [35, 60, 35],
+    'difficult_to_recognize_feeling': [20, 35, 25],
+    'difficult_to_describe_feeling': [14, 25, 16],
+    'extraversion_thought': [26, 40, 19],
+    'TAS': [60, 100, 60],
+    'cognitive_reappraisal': [17, 18, 19],
+    'expression_inhibition': [23, 19, 22],
+    'hostility': [26, 40, 24],
+    'physical_aggression': [12, 25, 18],
+    'impulsivity': [16, 30, 19],
+    'anger': [11, 15, 4],
+    'emotional_abuse': [12, 25, 18],
+    'physical_abuse': [16, 25, 14],
+    'sexual_abuse': [15, 25, 15],
+    'emotional_neglect': [16, 5, 19],
+    'physical_neglect': [18, 17, 16],
+    'CTQ': [77, 97, 82],
+    'whether_emotional_abuse': [0, 1, 1],
+    'whether_physical_abuse': [1, 1, 1],
+    'whether_sexual_abuse': [1, 1, 1],
+    'whether_emotional_neglect': [1, 0, 1],
+    'whether_physical_neglect': [1, 1, 1],
+    'SSQ_1': [24, 18, 24],
+    'SSQ_2': [24, 24, 24],
+    'SSQ': [48, 42, 48],
+    'FTND': [18, 11, 12],
+    'FTND_whether': [1, 1, 1],
+    'suicide_ideation': [11, 11, 5],
+    'suicide_ideation_screen': [5, 5, 2],
+    'suicide_risk': [39.393939393939405, 42.424242424242436, np.nan],
+    'whether_suicide_ideation_numeric': [1, 1, 0],
+    'empathy_forward': [42, 19, 22],
+    'empathy_reverse': [0, 14, 7],
+    'empathy': [42, 33, 29],
+    'AUDIT': [19, 38, 19],
+    'drive_for_thinness': [0.8571428571428571, 0.7142857142857142, 0.9999999999999998],
+    'bulimia': [1.2857142857142856, 1.8571428571428572, 0.9999999999999998],
+    'body_dissatisfaction': [1.6666666666666665, 1.4444444444444444, 1.222222222222222],
+    'ineffectiveness': [1.3, 1.7000000000000002, 1.3000000000000003],
+    'perfectionism': [0.8333333333333333, 1, 0.9999999999999999],
+    'interpersonal_distrust': [1, 2, 1.7142857142857142],
+    'interoceptive_awareness': [1.3, 1.2000000000000002, 1.1],
+    'maturity_fears': [2.125, 0.875, 1.375],
+    'asceticism_subscale': [1.125, 1, 1.125],
+    'impulse_regulation_subscale': [1.2727272727272727, 1, 1],
+    'social_insecurity_subscale': [1.625, 1.75, 1.75],
+    'social_insecurity_subscale_false': [1.2857142857142856, 0.8571428571428571, 1],
+    'subjective_sleep_quality': [2, 2, 2],
+    'sleep_latency': [3, 2, 2],
+    'sleep_persistence': [3, 3, 3],
+    'sleep_efficiency': [3, 3, 1],
+    'sleep_turbulence': [2, 2, 2],
+    'use_sleep_medication': [1, 2, 3],
+    'daytime_dysfunction': [2, 2, 1],
+    'PSQI': [16, 16, 14],
+    'sleep_quality_level': [4, 4, 3],
+    '1_longer_than_intend': [2, 1, 0],
+    '2_unsuccessful_attempts': [2, 1, 2],
+    '3_much_time': [2, 1, 1],
+    '4_given_up': [4, 3, 4],
+    '5_despite_adverse_consequences': [1, 1, 0],
+    '6_tolerance': [0, 0, 1],
+    '7_withdraw_symptoms': [3, 2, 2],
+    '8_despite_interpersonal_problems': [3, 1, 2],
+    '9_failure_role': [2, 0, 0],
+    '10_failure_role': [2, 3, 3],
+    '11_craving': [1, 1, 1],
+    '12_clinical_impairment': [1, 1, 2],
+    'food_addiction_score': [11, 10, 9],
+    'food_addiction': [1, 1, 1],
+}
+
+
+def test_scores_match_baseline():
+    scores = score_all(make_responses([1, 2, 3]))
+    for col, expected in BASELINE.items():
+        np.testing.assert_allclose(scores[col].to_numpy(), expected, rtol=1e-12, err_msg=col)
+
+
+def _recoded(scale, number, values):
+    """逐题转换（Scale.recode）的参考实现：逐个查表，缺失或超出表范围时为 NaN"""
+    if number not in scale.recode:
+        return values
+    low, table = scale.recode[number]
+    return values.map(lambda a: table[int(a) - low] if a == a and 0 <= a - low < len(table) else np.nan)
+
+
+def _item_sum(scale, df, numbers):
+    """带符号题号的逐题相加，负题号反向计分（reverse_max - 原始分）；任一题缺失时为 NaN"""
+    total = pd.Series(0.0, index=df.index)
+    for number in numbers:
+        values = _recoded(scale, abs(number), df[scale.prefix + str(abs(number))].astype(float))
+        total = total + (scale.reverse_max - values if number < 0 else values)
+    return total
+
+
+def reference_scores(scale, df):
+    """不用矩阵乘法、按 Scale 的定义逐题计算各输出，作为计分引擎的参考"""
+    outputs = {}
+    for subscale in scale.subscales:
+        factor = subscale[2] if len(subscale) > 2 else scale.sub_factor
+        outputs[subscale[0]] = ((_item_sum(scale, df, subscale[1]) + scale.sub_offset) * factor).to_numpy()
+    if scale.total is not None:
+        if scale.total_items is not None:
+            raw = _item_sum(scale, df, scale.total_items).to_numpy()
+        elif scale.subscales:
+            raw = sum(outputs.values())
+        else:
+            raw = _item_sum(scale, df, range(1, scale.n_items + 1)).to_numpy()
+        outputs[scale.total] = (raw + scale.offset) * scale.factor
+    if scale.post is not None:
+        scale.post(outputs)
+    return outputs
+
+
+def with_missing(df):
+    """在前几行挖去若干题（包括反向计分题与并入分量表的题组中的题）"""
+    df = df.astype(float)
+    for row, col in enumerate(['BDI3', 'BIS1', 'CTQ5', 'UPPS_P1', 'EQ6', 'AUDIT9', 'EDI41', 'EDI86', 'SSI4', 'TAS2']):
+        df.loc[row, col] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('name', [name for name, scale in SCALES.items() if scale.kernel is None])
+def test_engine_matches_item_sums(name):
+    df = with_missing(make_responses(range(12)))
+    scores = score_scale(df, name)
+    for col, expected in reference_scores(SCALES[name], df).items():
+        if not col.startswith('_'):
+            np.testing.assert_allclose(scores[col].to_numpy(), expected, rtol=1e-12, err_msg=col)
+
+
+def test_missing_counts_and_prorate():
+    df = with_missing(make_responses(range(12)))
+    scores = score_all(df, ['BDI', 'EDI'], missing=True)
+    assert np.isnan(scores['BDI'][0]) and scores['BDI_n_missing'][0] == 1
+    # EDI41 属于并入 ineffectiveness 的题组，缺失计入该分量表
+    assert np.isnan(scores['ineffectiveness'][6]) and scores['ineffectiveness_n_missing'][6] == 1
+    assert scores['ineffectiveness_n_missing'].sum() == 1
+    prorated = score_all(df, ['BDI', 'EDI'], missing=True, prorate=1)
+    items = df[SCALES['BDI'].items].iloc[0]
+    assert prorated['BDI'][0] == pytest.approx(items.sum() * 21 / 20 - 21)
+    assert not np.isnan(prorated['ineffectiveness'][6]) and prorated['ineffectiveness_n_missing'][6] == 1
+    # 按次折算不修改注册表
+    assert SCALES['BDI'].prorate is None
+    assert score_scale(df, 'BDI', prorate=1)['BDI'][0] == prorated['BDI'][0]
+    assert np.isnan(score_scale(df, 'BDI')['BDI'][0])
+
+
+def test_output_dtypes_do_not_depend_on_missing():
+    clean = score_all(make_responses(range(12)), missing=True)
+    missing = score_all(with_missing(make_responses(range(12))), missing=True)
+    pd.testing.assert_series_equal(clean.dtypes, missing.dtypes)
+    numeric = [col for col in clean.columns if not isinstance(clean[col].dtype, pd.CategoricalDtype)]
+    assert all(clean[col].dtype == (np.int64 if col.endswith('_n_missing') else np.float64) for col in numeric)
+
+
+def test_kernel_scales_in_score_all():
+    df = make_responses(range(12))
+    scores = score_all(df, ['PSQI', 'YFAS'])
+    pd.testing.assert_series_equal(scores['PSQI'], PsyScales.get_PSQI(df))
+    pd.testing.assert_series_equal(scores['food_addiction_score'], PsyScales.get_YFAS(df))
+    # 缓存的结果随 df 当前的索引返回
+    df.index = ['s%d' % i for i in range(12)]
+    assert list(PsyScales.get_YFAS(df).index) == list(df.index)
+    assert PsyScales.get_YFAS(df, attach=True)['food_addiction_score'].notna().all()
+
+
+def test_attach_returns_new_frame():
+    df = make_responses(range(12))
+    columns = list(df.columns)
+    attached = PsyScales.get_EDI_subscales(df, attach=True)
+    assert list(df.columns) == columns
+    assert list(attached.columns[:len(columns)]) == columns
+    assert set(SCALES['EDI'].subscale_names) <= set(attached.columns)